@@ -1,73 +1,295 @@
+import os
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from concurrent.futures import ProcessPoolExecutor
+
+
+def precision_recall_score(scores, relevant_docs, top_k=10, beta=1.0):
+    """
+    F-beta score of the top_k documents ranked by each row of scores.
+    
+    Args:
+        scores: (..., n_docs) score array, e.g. (n_queries, n_particles, n_docs)
+        relevant_docs: Boolean (..., n_docs) mask of the relevant documents,
+            broadcastable against scores (e.g. (n_queries, 1, n_docs))
+        top_k: Number of retrieved documents per ranking
+        beta: Weight of recall with respect to precision (1 for F1)
+        
+    Returns:
+        Array with the F-beta score of every ranking (shape scores.shape[:-1])
+    """
+    scores = np.asarray(scores)
+    relevant_docs = np.broadcast_to(relevant_docs, scores.shape)
+    k = min(top_k, scores.shape[-1])
+    
+    # Retrieved documents of every ranking (order inside the top_k is irrelevant)
+    retrieved = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    hits = np.take_along_axis(relevant_docs, retrieved, axis=-1).sum(axis=-1)
+    
+    precision = hits / k
+    recall = hits / np.maximum(relevant_docs.sum(axis=-1), 1)
+    denominator = beta ** 2 * precision + recall
+    return np.divide(
+        (1 + beta ** 2) * precision * recall, denominator,
+        out=np.zeros(hits.shape), where=denominator > 0
+    )
+
+
+# Retrieval problem of the worker processes of a multi-swarm run
+_WORKER_RETRIEVAL = None
+
+
+def _init_worker(retrieval):
+    """
+    Receive the retrieval problem once per worker process.
+    """
+    global _WORKER_RETRIEVAL
+    _WORKER_RETRIEVAL = retrieval
+
+
+def _evolve_swarm(state, query, relevant_docs, n_iterations):
+    """
+    Evolve one swarm of a multi-swarm run (runs in a worker process).
+    """
+    return _WORKER_RETRIEVAL.evolve(state, query, relevant_docs, n_iterations)
+
 
 class PSODocumentRetrieval:
-    def __init__(self, documents, n_particles=20, iterations=50):
+    def __init__(self, documents, n_particles=20, iterations=50, top_k=10, beta=1.0,
+                 v_max=0.2, bounds=(0.0, 1.0), patience=10, tol=1e-6, random_state=None):
+        # Document feature vectors (n_docs x n_features), one weight per feature
         self.documents = documents
+        self.document_vectors = np.asarray(documents, dtype=np.float64)
         self.n_particles = n_particles
         self.iterations = iterations
-        self.dimensions = 10  # Feature weights dimensions
+        self.dimensions = self.document_vectors.shape[1]  # Feature weights dimensions
+        self.top_k = top_k
+        self.beta = beta
+        self.v_max = v_max  # Velocity clamping (per dimension)
+        self.bounds = bounds  # Range of the feature weights
+        self.patience = patience  # Iterations without improvement before stopping
+        self.tol = tol  # Minimum fitness gain counted as an improvement
+        self.random_state = random_state
+        self.rng = np.random.default_rng(random_state)
+        self.iterations_run = 0
         
-    def initialize_swarm(self):
+        # Squared features, for the norms of the weighted documents
+        self._squared_vectors = self.document_vectors ** 2
+        
+    def initialize_swarm(self, rng=None):
         # Initialize particles with random positions and velocities
-        positions = np.random.random((self.n_particles, self.dimensions))
-        velocities = np.random.random((self.n_particles, self.dimensions)) * 0.1
+        rng = rng or self.rng
+        low, high = self.bounds
+        positions = low + (high - low) * rng.random((self.n_particles, self.dimensions))
+        velocities = rng.random((self.n_particles, self.dimensions)) * 0.1
         return positions, velocities
         
+    def similarity_scores(self, weights, query_vectors):
+        """
+        Cosine similarity between every query and every document weighted by
+        every particle, in one tensor operation.
+        
+        cos(q, w * d) = sum(q * w * d) / (|q| |w * d|), where the numerators
+        are ((Q x 1 x F) * (P x F)) @ D^T and the squared norms of the
+        weighted documents are W^2 @ (D^2)^T.
+        
+        Args:
+            weights: (n_particles x n_features) or (n_features,) weights
+            query_vectors: (n_queries x n_features) or (n_features,) queries
+            
+        Returns:
+            (n_queries x n_particles x n_docs) similarity array
+        """
+        weights = np.atleast_2d(weights)
+        query_vectors = np.atleast_2d(query_vectors)
+        
+        dots = (query_vectors[:, np.newaxis, :] * weights) @ self.document_vectors.T
+        doc_norms = np.sqrt(weights ** 2 @ self._squared_vectors.T)
+        query_norms = np.linalg.norm(query_vectors, axis=1)[:, np.newaxis, np.newaxis]
+        
+        norms = query_norms * doc_norms
+        return np.divide(dots, norms, out=np.zeros(dots.shape), where=norms > 0)
+        
+    def _relevance_mask(self, relevant_docs, n_queries):
+        # (n_queries x 1 x n_docs) mask of the relevant documents of each query
+        if n_queries == 1 and (len(relevant_docs) == 0 or np.isscalar(relevant_docs[0])):
+            relevant_docs = [relevant_docs]
+        mask = np.zeros((n_queries, 1, len(self.document_vectors)), dtype=bool)
+        for query_idx, docs in enumerate(relevant_docs):
+            mask[query_idx, 0, np.asarray(docs, dtype=np.int64)] = True
+        return mask
+        
     def fitness_function(self, weights, query_vector, relevant_docs):
-        # Apply weights to document vectors
-        weighted_docs = [doc_vector * weights for doc_vector in self.document_vectors]
+        """
+        Retrieval quality (F-beta of the top_k documents, averaged over the
+        queries) of one weight vector or of a whole swarm.
         
-        # Calculate similarity scores
-        scores = [cosine_similarity(query_vector.reshape(1, -1), 
-                                  doc.reshape(1, -1))[0][0] for doc in weighted_docs]
-                                  
-        # Calculate precision/recall against known relevant documents
-        # Return fitness score (higher is better)
-        return precision_recall_score(scores, relevant_docs)
+        Args:
+            weights: (n_features,) weights or (n_particles x n_features) swarm
+            query_vector: (n_features,) query or (n_queries x n_features) queries
+            relevant_docs: Relevant document IDs of the query, or one list per query
+            
+        Returns:
+            Fitness (higher is better), one value per particle for a swarm
+        """
+        query_vectors = np.atleast_2d(query_vector)
+        scores = self.similarity_scores(weights, query_vectors)
+        mask = self._relevance_mask(relevant_docs, len(query_vectors))
+        fitness = precision_recall_score(scores, mask, self.top_k, self.beta).mean(axis=0)
+        return fitness if np.ndim(weights) == 2 else float(fitness[0])
         
     def update_position(self, positions, velocities):
-        # PSO position update rules
-        return positions + velocities
+        # PSO position update rules, keeping the weights inside their bounds
+        return np.clip(positions + velocities, *self.bounds)
         
-    def update_velocity(self, positions, velocities, p_best, g_best):
+    def update_velocity(self, positions, velocities, p_best, g_best, rng=None):
         # PSO velocity update with inertia, cognitive and social components
         w = 0.7  # Inertia weight
         c1 = 1.5  # Cognitive parameter
         c2 = 1.5  # Social parameter
         
-        r1, r2 = np.random.random(2)
+        # Independent random coefficients per particle and dimension
+        rng = rng or self.rng
+        r1, r2 = rng.random((2,) + positions.shape)
         
         new_velocities = (w * velocities + 
                           c1 * r1 * (p_best - positions) + 
                           c2 * r2 * (g_best - positions))
-        return new_velocities
+        return np.clip(new_velocities, -self.v_max, self.v_max)
         
-    def optimize(self, query, relevant_docs):
-        # Main PSO optimization loop
-        positions, velocities = self.initialize_swarm()
-        p_best = positions.copy()
-        p_best_fitness = np.zeros(self.n_particles)
-        g_best = None
-        g_best_fitness = -np.inf
-        
-        for iteration in range(self.iterations):
-            # Evaluate fitness for each particle
-            for i in range(self.n_particles):
-                fitness = self.fitness_function(positions[i], query, relevant_docs)
-                
-                # Update personal best
-                if fitness > p_best_fitness[i]:
-                    p_best_fitness[i] = fitness
-                    p_best[i] = positions[i].copy()
-                
-                # Update global best
-                if fitness > g_best_fitness:
-                    g_best_fitness = fitness
-                    g_best = positions[i].copy()
+    def new_swarm(self, rng=None):
+        """
+        Create the state of a swarm (positions, velocities, personal and
+        global bests, random generator and stagnation counter).
+        """
+        rng = rng or self.rng
+        positions, velocities = self.initialize_swarm(rng)
+        return {
+            'positions': positions,
+            'velocities': velocities,
+            'p_best': positions.copy(),
+            'p_best_fitness': np.full(self.n_particles, -np.inf),
+            'g_best': None,
+            'g_best_fitness': -np.inf,
+            'stagnant': 0,
+            'iterations': 0,
+            'rng': rng,
+        }
+        
+    def evolve(self, state, query, relevant_docs, n_iterations):
+        """
+        Run up to n_iterations of PSO on a swarm, stopping early once the
+        global best has not improved by more than `tol` for `patience`
+        iterations.
+        
+        Args:
+            state: Swarm state (see new_swarm), updated in place
+            query: Query feature vector, or matrix of queries
+            relevant_docs: Relevant document IDs (one list per query)
+            n_iterations: Maximum number of iterations
             
+        Returns:
+            The swarm state
+        """
+        rng = state['rng']
+        for iteration in range(n_iterations):
+            if state['stagnant'] >= self.patience:
+                break
+            positions = state['positions']
+            
+            # Evaluate fitness for the whole swarm at once
+            fitness = self.fitness_function(positions, query, relevant_docs)
+            
+            # Update personal bests
+            improved = fitness > state['p_best_fitness']
+            state['p_best_fitness'][improved] = fitness[improved]
+            state['p_best'][improved] = positions[improved]
+            
+            # Update global best
+            best = int(np.argmax(fitness))
+            if fitness[best] > state['g_best_fitness'] + self.tol:
+                state['stagnant'] = 0
+            else:
+                state['stagnant'] += 1
+            if fitness[best] > state['g_best_fitness']:
+                state['g_best_fitness'] = float(fitness[best])
+                state['g_best'] = positions[best].copy()
+                
             # Update velocities and positions
-            velocities = self.update_velocity(positions, velocities, p_best, g_best)
-            positions = self.update_position(positions, velocities)
+            state['velocities'] = self.update_velocity(
+                positions, state['velocities'], state['p_best'], state['g_best'], rng
+            )
+            state['positions'] = self.update_position(positions, state['velocities'])
+            state['iterations'] += 1
             
-        return g_best, g_best_fitness
\ No newline at end of file
+        return state
+        
+    def optimize(self, query, relevant_docs):
+        # Main PSO optimization loop. query is a query feature vector (or a
+        # matrix of queries with one list of relevant documents each)
+        state = self.evolve(self.new_swarm(), query, relevant_docs, self.iterations)
+        self.iterations_run = state['iterations']
+        return state['g_best'], state['g_best_fitness']
+        
+    def optimize_multi_swarm(self, query, relevant_docs, n_swarms=None, migration_interval=10, n_jobs=None):
+        """
+        Run independent swarms in a process pool, migrating the global best
+        between them every `migration_interval` iterations.
+        
+        At each migration the best position found by any swarm replaces the
+        worst particle of every other swarm and becomes its global best.
+        The run stops after `iterations` iterations, or as soon as an epoch
+        brings no improvement and every swarm has stagnated.
+        
+        Args:
+            query: Query feature vector, or matrix of queries
+            relevant_docs: Relevant document IDs (one list per query)
+            n_swarms: Number of swarms (None for one per core)
+            migration_interval: Iterations between migrations
+            n_jobs: Number of worker processes (None uses all cores)
+            
+        Returns:
+            Tuple of (best weights, best fitness)
+        """
+        n_swarms = n_swarms or os.cpu_count() or 1
+        seeds = np.random.SeedSequence(self.random_state).spawn(n_swarms)
+        states = [self.new_swarm(np.random.default_rng(seed)) for seed in seeds]
+        
+        g_best, g_best_fitness = None, -np.inf
+        executor = None
+        if n_jobs != 1 and n_swarms > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=min(n_jobs or n_swarms, n_swarms),
+                initializer=_init_worker, initargs=(self,)
+            )
+        try:
+            iterations = 0
+            while iterations < self.iterations:
+                n_iterations = min(migration_interval, self.iterations - iterations)
+                args = ([query] * n_swarms, [relevant_docs] * n_swarms, [n_iterations] * n_swarms)
+                if executor is None:
+                    states = [self.evolve(state, query, relevant_docs, n_iterations) for state in states]
+                else:
+                    states = list(executor.map(_evolve_swarm, states, *args))
+                iterations += n_iterations
+                
+                # Migration of the global best
+                best = max(states, key=lambda state: state['g_best_fitness'])
+                improved = best['g_best_fitness'] > g_best_fitness + self.tol
+                if best['g_best_fitness'] > g_best_fitness:
+                    g_best, g_best_fitness = best['g_best'].copy(), best['g_best_fitness']
+                if not improved and all(state['stagnant'] >= self.patience for state in states):
+                    break
+                for state in states:
+                    if state['g_best_fitness'] < g_best_fitness:
+                        worst = int(np.argmin(state['p_best_fitness']))
+                        state['positions'][worst] = g_best
+                        state['p_best'][worst] = g_best
+                        state['p_best_fitness'][worst] = g_best_fitness
+                        state['g_best'], state['g_best_fitness'] = g_best.copy(), g_best_fitness
+                        state['stagnant'] = 0
+        finally:
+            if executor is not None:
+                executor.shutdown()
+                
+        self.iterations_run = iterations
+        return g_best, g_best_fitness
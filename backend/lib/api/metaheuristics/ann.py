@@ -0,0 +1,293 @@
+"""
+Approximate nearest-neighbor indexes for dense document vectors.
+This module provides the vector indexes used by the LSI model to search
+L2-normalized document vectors by inner product (cosine similarity) without
+scanning the whole BOE corpus on every query.
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+
+
+def top_k_rows(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Get the column indices of the top_k highest scores of each row, sorted by
+    decreasing score.
+    
+    Uses partial selection (argpartition) so only the selected columns are
+    fully sorted.
+    
+    Args:
+        scores: (n_queries x n_candidates) score matrix
+        top_k: Number of indices to return per row
+        
+    Returns:
+        (n_queries x min(top_k, n_candidates)) array of column indices
+    """
+    k = min(max(top_k, 0), scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    if k < scores.shape[1]:
+        top_indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top_indices = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    top_scores = np.take_along_axis(scores, top_indices, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top_indices, order, axis=1)
+
+
+class ExactIndex:
+    """
+    Brute-force inner product index. Used as the exact fallback of the
+    approximate indexes and as the reference to measure their recall.
+    
+    The index keeps a reference to the document matrix, never a copy.
+    Quantized matrices (int8 codes with one scale per document, as stored by
+    LSIModel(quantize=True)) are decoded only for the rows being scored.
+    """
+    
+    # Number of documents decoded at a time by exhaustive scans
+    chunk_size = 65536
+    
+    def __init__(self):
+        self.vectors = None
+        self.scales = None
+        
+    def build(self, vectors: np.ndarray, scales: Optional[np.ndarray] = None):
+        """
+        Index a matrix of (L2-normalized) document vectors.
+        
+        Args:
+            vectors: (n_docs x n_dims) document matrix, or int8 codes
+            scales: Scale of each document for int8 codes (None for plain
+                vectors)
+        """
+        self.vectors = np.asarray(vectors)
+        self.scales = None if scales is None else np.asarray(scales)
+        return self
+        
+    def __len__(self) -> int:
+        return 0 if self.vectors is None else len(self.vectors)
+        
+    def _decode(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Get float vectors of some documents.
+        
+        Args:
+            rows: Document positions (slice or array), None for all of them
+            
+        Returns:
+            Matrix with one row per document
+        """
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        if self.scales is None:
+            return vectors
+        scales = self.scales if rows is None else self.scales[rows]
+        return vectors.astype(np.float32) * scales[:, np.newaxis]
+        
+    def _scan(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Score queries against every document, decoding `chunk_size`
+        documents at a time.
+        
+        Args:
+            queries: (n_queries x n_dims) query matrix
+            
+        Returns:
+            (n_queries x n_docs) score matrix
+        """
+        if self.scales is None:
+            return queries @ self.vectors.T
+        scores = np.empty((len(queries), len(self.vectors)), dtype=np.float32)
+        for start in range(0, len(self.vectors), self.chunk_size):
+            rows = slice(start, start + self.chunk_size)
+            scores[:, rows] = queries @ self._decode(rows).T
+        return scores
+        
+    def search(self, queries: np.ndarray, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the documents with the highest inner product with each query.
+        
+        Args:
+            queries: (n_queries x n_dims) query matrix
+            top_k: Number of neighbors per query
+            
+        Returns:
+            Tuple of (document IDs, scores), both (n_queries x top_k) and
+            sorted by decreasing score
+        """
+        if self.vectors is None:
+            raise ValueError("Index must be built before searching")
+        scores = self._scan(np.atleast_2d(queries))
+        top_indices = top_k_rows(scores, top_k)
+        return top_indices, np.take_along_axis(scores, top_indices, axis=1)
+
+
+class IVFFlatIndex(ExactIndex):
+    """
+    Inverted file index with uncompressed vectors (IVF-flat).
+    
+    Documents are clustered with spherical k-means and each query only scans
+    the documents of the `n_probe` clusters whose centroids are closest to it.
+    Increasing `n_probe` trades latency for recall; with `n_probe >= n_lists`
+    the search is exact. The inverted lists only hold document IDs: the
+    vectors stay in the indexed matrix.
+    """
+    
+    def __init__(self,
+                 n_lists: Optional[int] = None,
+                 n_probe: int = 8,
+                 n_iter: int = 20,
+                 max_training_points: int = 100000,
+                 random_state: int = 42):
+        """
+        Initialize the IVF-flat index.
+        
+        Args:
+            n_lists: Number of clusters (None for ~sqrt(n_docs))
+            n_probe: Number of clusters scanned per query
+            n_iter: Number of k-means iterations
+            max_training_points: Maximum number of documents sampled to train
+                the centroids
+            random_state: Random seed for reproducibility
+        """
+        super().__init__()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.max_training_points = max_training_points
+        self.random_state = random_state
+        self.centroids = None
+        self.doc_ids = None
+        self.list_offsets = None
+        
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        L2-normalize the rows of a matrix (zero rows are left as they are).
+        """
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+        
+    def _train_centroids(self, n_lists: int) -> np.ndarray:
+        """
+        Train the cluster centroids with spherical k-means.
+        
+        Args:
+            n_lists: Number of clusters
+            
+        Returns:
+            (n_lists x n_dims) matrix of unit-norm centroids
+        """
+        rng = np.random.default_rng(self.random_state)
+        rows = None
+        if len(self.vectors) > self.max_training_points:
+            rows = np.sort(rng.choice(len(self.vectors), self.max_training_points, replace=False))
+        vectors = self._decode(rows)
+            
+        centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)]
+        for _ in range(self.n_iter):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            
+            # Re-seed empty clusters with random documents
+            empty = np.bincount(assignments, minlength=n_lists) == 0
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            
+            centroids = self._normalize(sums)
+            
+        return centroids
+        
+    def build(self, vectors: np.ndarray, scales: Optional[np.ndarray] = None):
+        """
+        Cluster the document vectors and build the inverted lists.
+        
+        Args:
+            vectors: (n_docs x n_dims) document matrix, or int8 codes
+            scales: Scale of each document for int8 codes (None for plain
+                vectors)
+        """
+        super().build(vectors, scales)
+        n_lists = self.n_lists or int(np.sqrt(len(self.vectors)))
+        n_lists = max(1, min(n_lists, len(self.vectors)))
+        
+        dtype = np.float32 if self.scales is not None else self.vectors.dtype
+        self.centroids = self._train_centroids(n_lists).astype(dtype)
+        assignments = np.concatenate([
+            np.argmax(self._decode(slice(start, start + self.chunk_size)) @ self.centroids.T, axis=1)
+            for start in range(0, len(self.vectors), self.chunk_size)
+        ])
+        
+        # Inverted lists: document IDs sorted by cluster, so each list is a
+        # contiguous block of `doc_ids`
+        self.doc_ids = np.argsort(assignments, kind='stable')
+        self.list_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignments, minlength=n_lists))]
+        )
+        return self
+        
+    def search(self,
+               queries: np.ndarray,
+               top_k: int = 10,
+               n_probe: Optional[int] = None,
+               exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the (approximately) closest documents to each query.
+        
+        Args:
+            queries: (n_queries x n_dims) query matrix
+            top_k: Number of neighbors per query
+            n_probe: Number of clusters to scan (None for the index default)
+            exact: Whether to scan every document instead
+            
+        Returns:
+            Tuple of (document IDs, scores), both (n_queries x top_k) and
+            sorted by decreasing score. If the probed clusters hold fewer than
+            top_k documents, the query falls back to the exact search.
+        """
+        if self.centroids is None:
+            raise ValueError("Index must be built before searching")
+        queries = np.atleast_2d(queries)
+        n_lists = len(self.centroids)
+        n_probe = min(n_probe or self.n_probe, n_lists)
+        top_k = min(top_k, len(self.vectors))
+        
+        if exact or n_probe >= n_lists:
+            return super().search(queries, top_k)
+            
+        # Closest clusters of every query
+        probes = top_k_rows(queries @ self.centroids.T, n_probe)
+        
+        doc_ids = np.empty((len(queries), top_k), dtype=np.int64)
+        scores = np.empty((len(queries), top_k), dtype=np.result_type(queries, self.centroids))
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([
+                self.doc_ids[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+                for list_id in probes[i]
+            ])
+            if len(candidates) < top_k:
+                candidates = np.arange(len(self.vectors))
+            candidate_scores = self._decode(candidates) @ query
+            best = top_k_rows(candidate_scores[np.newaxis], top_k)[0]
+            doc_ids[i] = candidates[best]
+            scores[i] = candidate_scores[best]
+            
+        return doc_ids, scores
+        
+    def recall(self, queries: np.ndarray, top_k: int = 10, n_probe: Optional[int] = None) -> float:
+        """
+        Measure the recall of the approximate search against the exact one.
+        
+        Args:
+            queries: (n_queries x n_dims) query matrix
+            top_k: Number of neighbors per query
+            n_probe: Number of clusters to scan (None for the index default)
+            
+        Returns:
+            Fraction of the exact top_k neighbors found by the approximate search
+        """
+        approx, _ = self.search(queries, top_k, n_probe)
+        exact, _ = self.search(queries, top_k, exact=True)
+        found = sum(len(np.intersect1d(a, e)) for a, e in zip(approx, exact))
+        return found / exact.size if exact.size else 1.0
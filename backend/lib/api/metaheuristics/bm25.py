@@ -6,16 +6,179 @@ document searching in BOE legal corpus.
 
 import numpy as np
 import math
-from typing import List, Dict, Tuple, Any, Union
-from collections import Counter
-import re
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from typing import List, Dict, Tuple, Any, Union, Iterator, Iterable, Sequence, Optional
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from bisect import bisect_left
+import json
+import os
+import xml.etree.ElementTree as ET
+from scipy import sparse
+from backend.lib.language.tokenizer import Tokenizer
+
+INDEX_FORMAT_VERSION = 4
+
+# Fields of a BOE diario XML document, see `boe_fields_from_xml`
+BOE_FIELDS = ('titulo', 'materias', 'alertas', 'texto')
+
+# Scoring functions selectable at query time, with the default delta
+# (lower bound for the contribution of a matching term) of BM25+ and BM25L
+BM25_VARIANTS = ('bm25', 'bm25+', 'bm25l', 'bm25f')
+DEFAULT_DELTA = {'bm25+': 1.0, 'bm25l': 0.5}
+
+# Number of tokenized queries kept by each model (see BM25Retrieval._query_terms)
+QUERY_CACHE_SIZE = 4096
+
+# MaxScore falls back to exhaustive scoring when the essential posting lists
+# hold more than 1 / MAXSCORE_DENSITY postings per document
+MAXSCORE_DENSITY = 8
+
+
+def _save_array(path: str, name: str, array: np.ndarray):
+    """
+    Write an array to `<name>.npy` through a temporary file that replaces
+    the previous one, so arrays still memory-mapped from it (e.g. by a
+    model loaded from the same directory) keep their data.
+    
+    Args:
+        path: Output directory
+        name: Base file name of the array
+        array: Array to write
+    """
+    target = os.path.join(path, f'{name}.npy')
+    with open(target + '.tmp', 'wb') as f:
+        np.save(f, np.asarray(array))
+    os.replace(target + '.tmp', target)
+
+
+def _write_strings(path: str, name: str, strings: Iterable[str]):
+    """
+    Write a list of strings as one UTF-8 blob plus an offsets array.
+    
+    Args:
+        path: Output directory
+        name: Base file name of the table
+        strings: Strings to write
+    """
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(data) for data in encoded])
+    
+    blob_path = os.path.join(path, f'{name}.bin')
+    with open(blob_path + '.tmp', 'wb') as f:
+        f.write(b''.join(encoded))
+    os.replace(blob_path + '.tmp', blob_path)
+    _save_array(path, f'{name}_offsets', offsets)
+
+
+class _StringTable(Sequence):
+    """
+    Read-only sequence of strings backed by a memory-mapped UTF-8 blob.
+    """
+    
+    def __init__(self, path: str, name: str, mmap: bool = True):
+        self.offsets = np.load(
+            os.path.join(path, f'{name}_offsets.npy'), mmap_mode='r' if mmap else None
+        )
+        blob_path = os.path.join(path, f'{name}.bin')
+        if mmap and os.path.getsize(blob_path) > 0:
+            self.blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+        else:
+            self.blob = np.fromfile(blob_path, dtype=np.uint8)
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, idx: int) -> str:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return self.blob[self.offsets[idx]:self.offsets[idx + 1]].tobytes().decode('utf-8')
+
+
+class DocumentStore(_StringTable):
+    """
+    External store of raw document texts: one UTF-8 file plus a byte offset
+    table, memory-mapped and read by document ID. The BM25 index only keeps
+    document IDs; texts are fetched from here when a snippet is requested.
+    """
+    
+    def __init__(self, path: str, mmap: bool = True):
+        super().__init__(path, 'documents', mmap)
+        self.path = path
+    
+    @classmethod
+    def write(cls, path: str, documents: Iterable[str]) -> 'DocumentStore':
+        """
+        Write documents to a new store, in document ID order.
+        
+        Args:
+            path: Output directory (created if needed)
+            documents: Raw document texts
+            
+        Returns:
+            The opened document store
+        """
+        os.makedirs(path, exist_ok=True)
+        _write_strings(path, 'documents', documents)
+        return cls(path)
+
+
+def boe_fields_from_xml(xml_path: str) -> Dict[str, str]:
+    """
+    Parse a BOE diario XML document into the fields used by BM25F.
+    
+    Args:
+        xml_path: Path of the XML document
+        
+    Returns:
+        Dictionary with the text of each field in BOE_FIELDS
+    """
+    root = ET.parse(xml_path).getroot()
+    materias = [m.text for m in root.findall('.//materias/materia') if m.text]
+    alertas = [a.text for a in root.findall('.//alertas/alerta') if a.text]
+    paragraphs = [p.text for p in root.findall('.//texto//p') if p.text]
+    return {
+        'titulo': root.findtext('.//titulo') or '',
+        'materias': ', '.join(materias),
+        'alertas': ', '.join(alertas),
+        'texto': '\n'.join(paragraphs),
+    }
+
+
+class _TermDictionary(Mapping):
+    """
+    Read-only term -> term ID mapping over a lexicographically sorted
+    string table. Lookups are binary searches, so nothing is loaded into
+    a Python dict and the pages can be shared between processes.
+    """
+    
+    def __init__(self, path: str, mmap: bool = True):
+        self.terms = _StringTable(path, 'terms', mmap)
+        self.term_ids = np.load(
+            os.path.join(path, 'term_ids.npy'), mmap_mode='r' if mmap else None
+        )
+    
+    def __len__(self) -> int:
+        return len(self.terms)
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.terms)
+    
+    def __getitem__(self, term: str) -> int:
+        pos = bisect_left(self.terms, term)
+        if pos < len(self.terms) and self.terms[pos] == term:
+            return int(self.term_ids[pos])
+        raise KeyError(term)
+
 
 class BM25Retrieval:
     def __init__(self, 
                  k1: float = 1.5, 
                  b: float = 0.75,
-                 epsilon: float = 0.25):
+                 epsilon: float = 0.25,
+                 tokenizer: Optional[Tokenizer] = None):
         """
         Initialize BM25 retrieval model.
         
@@ -23,19 +186,32 @@ class BM25Retrieval:
             k1: Term saturation parameter (typical values: 1.2-2.0)
             b: Document length normalization (0.75 is a common value)
             epsilon: Delta for IDF calculation, prevents division by zero
+            tokenizer: Tokenizer shared by indexing and querying (defaults to
+                lowercasing without accent folding or stemming)
         """
         self.k1 = k1
         self.b = b
         self.epsilon = epsilon
-        self.corpus = None
+        self.tokenizer = tokenizer or Tokenizer()
+        self.document_store = None
         self.doc_lengths = None
         self.avgdl = None
         self.tf = None
         self.idf = None
         self.doc_freqs = None
         self.n_docs = None
-        self.vectorizer = None
         self.vocabulary = None
+        self.impacts = None
+        self.term_upper_bounds = None
+        self.removed = None
+        self.fields = None
+        self.tf_fields = None
+        self.field_lengths = None
+        self.avg_field_lengths = None
+        self._posting_order = None
+        self._kth_impacts = {}
+        self._stale = False
+        self._query_cache = OrderedDict()
         
     def _preprocess(self, text: str) -> str:
         """
@@ -45,64 +221,758 @@ class BM25Retrieval:
             text: Raw text
             
         Returns:
-            Preprocessed text
+            Preprocessed text (normalized terms separated by spaces)
+        """
+        return ' '.join(self.tokenizer.tokenize(text))
+    
+    def _terms(self, text: str, use_preprocessor: bool = True) -> List[str]:
         """
-        # Convert to lowercase
-        text = text.lower()
+        Get the terms of a document or query.
         
-        # Remove punctuation, except periods in abbreviations
-        text = re.sub(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\w)\.(?=\s)', ' ', text)
-        text = re.sub(r'[^\w\s]', ' ', text)
+        Args:
+            text: Document or query text
+            use_preprocessor: Whether to run the tokenizer. If False, the text
+                is taken as already preprocessed and split on whitespace
+            
+        Returns:
+            List of terms
+        """
+        return self.tokenizer.tokenize(text) if use_preprocessor else text.split()
+    
+    def _query_terms(self, 
+                     query: str, 
+                     use_preprocessor: bool = True) -> Tuple[Tuple[str, ...], np.ndarray]:
+        """
+        Tokenize a query and look up its term IDs, with an LRU cache so that
+        repeated queries (e.g. one call per keystroke) skip tokenization.
+        
+        Args:
+            query: Query text
+            use_preprocessor: Whether to run the tokenizer on the query
+            
+        Returns:
+            Tuple of (query terms, term ID of each term or -1 if unknown).
+            The returned array is shared with the cache and must not be modified
+        """
+        key = (query, use_preprocessor)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            self._query_cache.move_to_end(key)
+            return cached
+            
+        terms = tuple(self._terms(query, use_preprocessor))
+        get = self.vocabulary.get
+        term_ids = np.array([get(term, -1) for term in terms], dtype=np.int64)
+        
+        self._query_cache[key] = (terms, term_ids)
+        if len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return terms, term_ids
+    
+    def _count_terms(self, documents: List[str], use_preprocessor: bool = True) -> sparse.csr_matrix:
+        """
+        Build the term frequency matrix of some documents, adding unknown
+        terms to the vocabulary.
+        
+        Args:
+            documents: List of document texts
+            use_preprocessor: Whether to run the tokenizer on the documents
+            
+        Returns:
+            Sparse (documents x vocabulary) term count matrix
+        """
+        term_ids = [
+            Tokenizer.encode_terms(self._terms(doc, use_preprocessor), self.vocabulary, add_terms=True)
+            for doc in documents
+        ]
+        indptr = np.zeros(len(documents) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(ids) for ids in term_ids])
+        indices = np.concatenate(term_ids) if term_ids else np.empty(0, dtype=np.int64)
+        
+        # One entry per token; summing duplicates turns them into counts
+        X = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int64), indices, indptr),
+            shape=(len(documents), len(self.vocabulary))
+        )
+        X.sum_duplicates()
+        return X
+    
+    def _count_field_terms(self, 
+                           documents: List[Mapping[str, str]], 
+                           use_preprocessor: bool = True) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+        """
+        Build the term frequency matrix of fielded documents.
         
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        Args:
+            documents: List of documents as field -> text mappings
+            use_preprocessor: Whether to run the tokenizer on the documents
+            
+        Returns:
+            Tuple of (term count matrix summed over fields, per-field counts of
+            every stored entry of that matrix (nnz x n_fields), per-field length
+            of every document (n_docs x n_fields))
+        """
+        per_field = [
+            self._count_terms([doc.get(field) or '' for doc in documents], use_preprocessor)
+            for field in self.fields
+        ]
+        shape = (len(documents), len(self.vocabulary))
+        for X_field in per_field:
+            X_field.resize(shape)
+            
+        X = per_field[0].copy()
+        for X_field in per_field[1:]:
+            X = X + X_field
+        X = X.tocsr()
+        X.sort_indices()
+        
+        # Per-field counts aligned with the entries of X
+        rows = np.repeat(np.arange(shape[0]), np.diff(X.indptr))
+        tf_fields = np.column_stack([
+            np.asarray(X_field[rows, X.indices]).ravel() for X_field in per_field
+        ]) if X.nnz else np.zeros((0, len(self.fields)), dtype=X.dtype)
+        field_lengths = np.column_stack([X_field.sum(axis=1).A1 for X_field in per_field])
         
-        return text
+        return X, tf_fields.astype(X.dtype), field_lengths
     
-    def fit(self, corpus: List[str], use_preprocessor: bool = True):
+    def fit(self, 
+            corpus: List[Union[str, Mapping[str, str]]], 
+            use_preprocessor: bool = True,
+            document_store: Optional[Sequence[str]] = None,
+            fields: Optional[Sequence[str]] = None):
         """
         Fit BM25 model on a corpus of documents.
         
+        The document texts are not kept by the model. Pass a document store
+        (a DocumentStore, or any sequence of raw texts indexed by document
+        ID, such as `corpus` itself) to get snippets in the results.
+        
+        With `fields` (e.g. BOE_FIELDS), each document is a field -> text
+        mapping (see `boe_fields_from_xml`). Term counts are also kept per
+        field, which enables the BM25F variant at query time; the other
+        variants score the fields concatenated.
+        
         Args:
-            corpus: List of document texts
-            use_preprocessor: Whether to apply preprocessing to documents
+            corpus: List of document texts, or of field -> text mappings
+            use_preprocessor: Whether to tokenize documents (if False they
+                must already be preprocessed, space-separated terms)
+            document_store: Optional source of raw texts for snippets
+            fields: Names of the document fields, None for plain texts
         """
-        # Preprocess corpus if requested
-        if use_preprocessor:
-            self.corpus = [self._preprocess(doc) for doc in corpus]
-        else:
-            self.corpus = corpus
+        self.document_store = document_store
+        self.fields = tuple(fields) if fields else None
         
         # Number of documents
-        self.n_docs = len(self.corpus)
-        
-        # Create vectorizer for term frequency calculation
-        self.vectorizer = CountVectorizer(lowercase=not use_preprocessor)
-        X = self.vectorizer.fit_transform(self.corpus)
+        self.n_docs = len(corpus)
         
-        # Get vocabulary
-        self.vocabulary = self.vectorizer.vocabulary_
+        # Tokenize straight into term IDs and count them
+        self.vocabulary = {}
+        self._query_cache.clear()
+        if self.fields:
+            X, self.tf_fields, self.field_lengths = self._count_field_terms(corpus, use_preprocessor)
+        else:
+            X = self._count_terms(corpus, use_preprocessor)
+            self.tf_fields = self.field_lengths = None
         
         # Calculate document frequencies (number of documents containing term t)
         self.doc_freqs = np.bincount(X.indices, minlength=len(self.vocabulary))
         
+        # Calculate document lengths
+        self.doc_lengths = X.sum(axis=1).A1
+        
+        # Term frequency matrix
+        self.tf = X.tocsr()
+        
+        # No document has been removed yet
+        self.removed = np.zeros(self.n_docs, dtype=bool)
+        
+        # Compute IDF, average length and impacts
+        self._update_statistics()
+        
+        return self
+    
+    def _update_statistics(self):
+        """
+        Recompute the corpus-level statistics that depend on every document:
+        IDF, average document length and the BM25 impact matrix.
+        """
         # Calculate IDF (Inverse Document Frequency)
+        self.idf = self._compute_idf(self.n_docs, self.doc_freqs)
+        
+        # Calculate average document (and field) length over the live documents
+        self.avgdl = np.mean(self.doc_lengths[~self.removed]) if self.n_docs else 0.0
+        if self.fields:
+            self.avg_field_lengths = (
+                self.field_lengths[~self.removed].mean(axis=0) if self.n_docs
+                else np.zeros(len(self.fields))
+            )
+        
+        # Drop the entries zeroed by remove_documents
+        self._compact_tf()
+        
+        # Precompute per-posting BM25 contributions
+        self._build_impacts()
+        
+        self._stale = False
+    
+    def _compact_tf(self):
+        """
+        Drop the zero entries of the term frequency matrix (and the matching
+        rows of the per-field counts).
+        """
+        keep = self.tf.data != 0
+        if keep.all():
+            return
+        kept = np.concatenate([[0], np.cumsum(keep)])
+        self.tf = sparse.csr_matrix(
+            (self.tf.data[keep], self.tf.indices[keep], kept[self.tf.indptr]),
+            shape=self.tf.shape
+        )
+        if self.tf_fields is not None:
+            self.tf_fields = self.tf_fields[keep]
+    
+    @staticmethod
+    def _compute_idf(n_docs: int, doc_freqs: np.ndarray) -> np.ndarray:
+        """
+        Compute the IDF of every term.
+        
+        Args:
+            n_docs: Number of documents in the collection
+            doc_freqs: Number of documents containing each term
+            
+        Returns:
+            IDF of each term
+        """
         # Using the Robertson-Spärck Jones formula with smoothing
         # idf(t) = log((N - n(t) + 0.5) / (n(t) + 0.5) + 1.0)
-        self.idf = np.log(
-            (self.n_docs - self.doc_freqs + 0.5) / (self.doc_freqs + 0.5) + 1.0
+        return np.log((n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5) + 1.0)
+    
+    def _ensure_statistics(self):
+        """
+        Lazily refresh IDF and impacts after documents were added or removed.
+        """
+        if self._stale:
+            self._update_statistics()
+    
+    def add_documents(self, 
+                      documents: List[Union[str, Mapping[str, str]]], 
+                      use_preprocessor: bool = True) -> np.ndarray:
+        """
+        Add documents to a fitted model without refitting the whole corpus.
+        
+        Only the new documents are tokenized. Unknown terms extend the
+        vocabulary, and document frequencies and lengths are updated in
+        place. IDF and impacts are recomputed lazily on the next query.
+        The caller is responsible for adding the raw texts to the document
+        store, if any, under the returned IDs.
+        
+        Args:
+            documents: List of document texts (field -> text mappings if the
+                model was fitted with fields)
+            use_preprocessor: Whether to tokenize documents (if False they
+                must already be preprocessed, space-separated terms)
+            
+        Returns:
+            IDs assigned to the new documents
+        """
+        if self.vocabulary is None:
+            self.fit(documents, use_preprocessor)
+            return np.arange(self.n_docs)
+        self._make_mutable()
+            
+        # Count terms of the new documents, extending the vocabulary
+        if self.fields:
+            X, tf_fields, field_lengths = self._count_field_terms(documents, use_preprocessor)
+            self.tf_fields = np.concatenate([self.tf_fields, tf_fields])
+            self.field_lengths = np.concatenate([self.field_lengths, field_lengths])
+        else:
+            X = self._count_terms(documents, use_preprocessor)
+        
+        # Cached queries may contain terms that are now in the vocabulary
+        self._query_cache.clear()
+        n_terms = len(self.vocabulary)
+        
+        # Append the new rows to the term frequency matrix
+        first_id = self.tf.shape[0]
+        self.tf.resize((first_id, n_terms))
+        self.tf = sparse.vstack([self.tf, X], format='csr')
+        
+        # Update per-term and per-document statistics
+        self.doc_freqs = np.concatenate([
+            self.doc_freqs, np.zeros(n_terms - len(self.doc_freqs), dtype=self.doc_freqs.dtype)
+        ])
+        self.doc_freqs += np.bincount(X.indices, minlength=n_terms)
+        self.doc_lengths = np.concatenate([self.doc_lengths, X.sum(axis=1).A1])
+        self.removed = np.concatenate([self.removed, np.zeros(len(documents), dtype=bool)])
+        self.n_docs += len(documents)
+        
+        self._stale = True
+        return np.arange(first_id, first_id + len(documents))
+    
+    def remove_documents(self, doc_ids: List[int]):
+        """
+        Remove documents from a fitted model without refitting the corpus.
+        
+        Removed documents keep their ID (IDs of the other documents do not
+        change) but no longer count towards the statistics or appear in
+        results. IDF and impacts are recomputed lazily on the next query.
+        
+        Args:
+            doc_ids: IDs of the documents to remove
+        """
+        if self.tf is None:
+            raise ValueError("Model must be fit before removing documents")
+        self._make_mutable()
+            
+        doc_ids = np.unique(np.asarray(doc_ids, dtype=np.int64))
+        if len(doc_ids) and (doc_ids[0] < 0 or doc_ids[-1] >= self.tf.shape[0]):
+            raise ValueError("Invalid document ID")
+        doc_ids = doc_ids[~self.removed[doc_ids]]
+        
+        for doc_id in doc_ids:
+            start, end = self.tf.indptr[doc_id], self.tf.indptr[doc_id + 1]
+            
+            # Update document frequencies and zero the row in place
+            self.doc_freqs[self.tf.indices[start:end]] -= 1
+            self.tf.data[start:end] = 0
+            if self.tf_fields is not None:
+                self.tf_fields[start:end] = 0
+            
+        self.doc_lengths[doc_ids] = 0
+        if self.field_lengths is not None:
+            self.field_lengths[doc_ids] = 0
+        self.removed[doc_ids] = True
+        self.n_docs -= len(doc_ids)
+        
+        self._stale = True
+    
+    def _make_mutable(self):
+        """
+        Replace the read-only term dictionary of a loaded index with an
+        in-memory one before it is modified.
+        """
+        if not isinstance(self.vocabulary, dict):
+            self.vocabulary = dict(zip(self.vocabulary, self.vocabulary.term_ids.tolist()))
+    
+    def save(self, path: str):
+        """
+        Save the fitted index to a directory.
+        
+        Every array (CSR term frequencies, CSC impacts, IDF, lengths...) is
+        written as a separate .npy file so it can be memory-mapped by `load`.
+        Terms are written as a UTF-8 blob with an offset table. Document texts
+        are not part of the index; only the path of an attached DocumentStore
+        is recorded. Files are replaced rather than overwritten, so an index
+        loaded from `path` can be updated and saved back to it.
+        
+        Args:
+            path: Output directory (created if needed)
+        """
+        if self.tf is None:
+            raise ValueError("Model must be fit before saving")
+        self._ensure_statistics()
+        os.makedirs(path, exist_ok=True)
+        
+        arrays = {
+            'tf_indptr': self.tf.indptr,
+            'tf_indices': self.tf.indices,
+            'tf_data': self.tf.data,
+            'impacts_indptr': self.impacts.indptr,
+            'impacts_indices': self.impacts.indices,
+            'impacts_data': self.impacts.data,
+            'term_upper_bounds': self.term_upper_bounds,
+            'idf': self.idf,
+            'doc_freqs': self.doc_freqs,
+            'doc_lengths': self.doc_lengths,
+            'removed': self.removed,
+            'posting_order': self._posting_order,
+        }
+        if self.fields:
+            arrays.update({
+                'tf_fields': self.tf_fields,
+                'field_lengths': self.field_lengths,
+                'avg_field_lengths': self.avg_field_lengths,
+            })
+        for name, array in arrays.items():
+            _save_array(path, name, array)
+            
+        # Term dictionary sorted by term, for binary search at load time
+        terms = sorted(self.vocabulary.items())
+        _write_strings(path, 'terms', [term for term, _ in terms])
+        _save_array(path, 'term_ids', np.array([term_id for _, term_id in terms], dtype=np.int64))
+        
+        meta = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'k1': self.k1,
+            'b': self.b,
+            'epsilon': self.epsilon,
+            'n_docs': int(self.n_docs),
+            'avgdl': float(self.avgdl),
+            'shape': list(self.tf.shape),
+            'tokenizer': self.tokenizer.get_config(),
+            'fields': list(self.fields) if self.fields else None,
+            'document_store': (
+                os.path.abspath(self.document_store.path)
+                if isinstance(self.document_store, DocumentStore) else None
+            ),
+        }
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+    
+    @classmethod
+    def load(cls, 
+             path: str, 
+             mmap: bool = True,
+             document_store: Optional[Sequence[str]] = None) -> 'BM25Retrieval':
+        """
+        Load an index written by `save`.
+        
+        With mmap=True the arrays are memory-mapped copy-on-write, so loading
+        is near-instant and several processes loading the same index share
+        the page cache. Modifying a loaded index (add/remove documents) only
+        copies what is written.
+        
+        Args:
+            path: Index directory
+            mmap: Whether to memory-map the arrays instead of reading them
+            document_store: Source of raw texts for snippets. Defaults to the
+                DocumentStore recorded at save time, if any
+            
+        Returns:
+            Fitted BM25Retrieval model
+        """
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['format_version'] != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version: {meta['format_version']}")
+            
+        def load_array(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='c' if mmap else None)
+            
+        model = cls(
+            k1=meta['k1'], b=meta['b'], epsilon=meta['epsilon'],
+            tokenizer=Tokenizer(**meta['tokenizer'])
+        )
+        shape = tuple(meta['shape'])
+        model.tf = sparse.csr_matrix(
+            (load_array('tf_data'), load_array('tf_indices'), load_array('tf_indptr')),
+            shape=shape, copy=False
+        )
+        model.impacts = sparse.csc_matrix(
+            (load_array('impacts_data'), load_array('impacts_indices'), load_array('impacts_indptr')),
+            shape=shape, copy=False
         )
+        model.term_upper_bounds = load_array('term_upper_bounds')
+        model.idf = load_array('idf')
+        model.doc_freqs = load_array('doc_freqs')
+        model.doc_lengths = load_array('doc_lengths')
+        model.removed = load_array('removed')
+        model._posting_order = load_array('posting_order')
+        if meta['fields']:
+            model.fields = tuple(meta['fields'])
+            model.tf_fields = load_array('tf_fields')
+            model.field_lengths = load_array('field_lengths')
+            model.avg_field_lengths = load_array('avg_field_lengths')
+        model.n_docs = meta['n_docs']
+        model.avgdl = meta['avgdl']
         
-        # Calculate document lengths
-        self.doc_lengths = X.sum(axis=1).A1
+        # Memory-mapped term dictionary
+        model.vocabulary = _TermDictionary(path, mmap)
         
-        # Calculate average document length
-        self.avgdl = np.mean(self.doc_lengths)
+        if document_store is None and meta['document_store']:
+            document_store = DocumentStore(meta['document_store'], mmap)
+        model.document_store = document_store
         
-        # Term frequency matrix
-        self.tf = X
+        return model
+    
+    def _build_impacts(self):
+        """
+        Precompute the BM25 impact matrix from the term frequency matrix.
         
-        return self
+        Each non-zero entry (d, t) holds the full BM25 contribution of term t
+        to document d. The matrix is stored in CSC format so the posting list
+        of a term is a contiguous slice of `indices`/`data`.
+        """
+        tf = self.tf.tocsr()
+        
+        # Document of every stored entry
+        rows = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        
+        # Document length normalization component per entry
+        len_norm = 1.0 - self.b + self.b * (self.doc_lengths[rows] / self.avgdl)
+        
+        doc_tf = tf.data.astype(np.float64)
+        data = self.idf[tf.indices] * (
+            (self.k1 + 1.0) * doc_tf / (self.k1 * len_norm + doc_tf)
+        )
+        
+        # Position in the CSR entries (tf.data, tf_fields) of every CSC entry,
+        # so query-time variants can be computed per posting list
+        positions = sparse.csr_matrix(
+            (np.arange(1, tf.nnz + 1), tf.indices, tf.indptr), shape=tf.shape
+        ).tocsc()
+        positions.sort_indices()
+        self._posting_order = positions.data - 1
+        
+        self.impacts = sparse.csc_matrix(
+            (data[self._posting_order], positions.indices, positions.indptr), shape=tf.shape
+        )
+        
+        # Maximum contribution of each term to any document (used for pruning)
+        self.term_upper_bounds = self.impacts.max(axis=0).toarray().ravel()
+        self._kth_impacts = {}
+    
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the posting list of a term from the impact matrix.
+        
+        Args:
+            term_id: Term ID in the vocabulary
+            
+        Returns:
+            Tuple of (document IDs, BM25 impacts), sorted by document ID
+        """
+        start, end = self.impacts.indptr[term_id], self.impacts.indptr[term_id + 1]
+        return self.impacts.indices[start:end], self.impacts.data[start:end]
+    
+    def _check_variant(self, variant: str):
+        """
+        Validate the scoring variant requested for a query.
+        """
+        if variant not in BM25_VARIANTS:
+            raise ValueError(f"Unknown BM25 variant: {variant}")
+        if variant == 'bm25f' and not self.fields:
+            raise ValueError("BM25F requires a model fitted with fields")
+    
+    def _field_weights(self, field_weights: Optional[Mapping[str, float]]) -> np.ndarray:
+        """
+        Get the BM25F weight of each field (1.0 for the fields not given).
+        """
+        field_weights = dict(field_weights or {})
+        unknown = set(field_weights) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {sorted(unknown)}")
+        return np.array([field_weights.get(field, 1.0) for field in self.fields])
+    
+    def _term_postings(self, 
+                       term_id: int, 
+                       variant: str = 'bm25',
+                       delta: Optional[float] = None,
+                       field_weights: Optional[Mapping[str, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the posting list of a term scored with a BM25 variant.
+        
+        Plain BM25 reads the precomputed impacts. The other variants are
+        computed from the raw (and per-field) term frequencies of the posting
+        list only:
+        
+        - 'bm25+': idf * ((k1 + 1) * tf / (k1 * norm + tf) + delta)
+        - 'bm25l': idf * (k1 + 1) * c / (k1 + c), with c = tf / norm + delta
+        - 'bm25f': idf * (k1 + 1) * tf' / (k1 + tf'), where tf' is the sum
+          over fields of weight * tf_field / norm_field
+          
+        where norm = 1 - b + b * length / average length.
+        
+        Args:
+            term_id: Term ID in the vocabulary
+            variant: One of BM25_VARIANTS
+            delta: Lower bound parameter of BM25+ and BM25L (None for the
+                default of the variant)
+            field_weights: Field -> weight mapping for BM25F
+            
+        Returns:
+            Tuple of (document IDs, contributions), sorted by document ID
+        """
+        doc_ids, impacts = self._postings(term_id)
+        if variant == 'bm25':
+            return doc_ids, impacts
+            
+        start, end = self.impacts.indptr[term_id], self.impacts.indptr[term_id + 1]
+        positions = self._posting_order[start:end]
+        idf = self.idf[term_id]
+        k1, b = self.k1, self.b
+        
+        if variant == 'bm25f':
+            weights = self._field_weights(field_weights)
+            avg_lengths = np.where(self.avg_field_lengths > 0, self.avg_field_lengths, 1.0)
+            norm = 1.0 - b + b * (self.field_lengths[doc_ids] / avg_lengths)
+            # Empty fields (norm 0 with b = 1) have no term frequency
+            norm[norm == 0] = 1.0
+            field_tf = (self.tf_fields[positions] * weights / norm).sum(axis=1)
+            return doc_ids, idf * (k1 + 1.0) * field_tf / (k1 + field_tf)
+            
+        if delta is None:
+            delta = DEFAULT_DELTA[variant]
+        doc_tf = self.tf.data[positions].astype(np.float64)
+        norm = 1.0 - b + b * (self.doc_lengths[doc_ids] / self.avgdl)
+        
+        if variant == 'bm25+':
+            return doc_ids, idf * ((k1 + 1.0) * doc_tf / (k1 * norm + doc_tf) + delta)
+        c = doc_tf / norm + delta
+        return doc_ids, idf * (k1 + 1.0) * c / (k1 + c)
+    
+    def _query_term_ids(self, terms: Iterable[str]) -> np.ndarray:
+        """
+        Get the unique vocabulary IDs of the terms of a query.
+        
+        Args:
+            terms: Query terms
+            
+        Returns:
+            Array of term IDs present in the vocabulary
+        """
+        return np.unique(Tokenizer.encode_terms(list(terms), self.vocabulary))
+    
+    def _score_terms(self, 
+                     term_ids: np.ndarray,
+                     variant: str = 'bm25',
+                     delta: Optional[float] = None,
+                     field_weights: Optional[Mapping[str, float]] = None) -> np.ndarray:
+        """
+        Score every document for a set of query terms.
+        
+        Only the posting lists of the given terms are visited, so the cost is
+        proportional to their length rather than to N_docs x |V|.
+        
+        Args:
+            term_ids: Unique query term IDs
+            variant: Scoring function, see `_term_postings`
+            delta: Lower bound parameter of BM25+ and BM25L
+            field_weights: Field -> weight mapping for BM25F
+            
+        Returns:
+            Dense array with the score of each document
+        """
+        n_rows = self.impacts.shape[0]
+        if len(term_ids) == 0:
+            return np.zeros(n_rows)
+            
+        postings = [
+            self._term_postings(term_id, variant, delta, field_weights)
+            for term_id in term_ids
+        ]
+        doc_ids = np.concatenate([docs for docs, _ in postings])
+        impacts = np.concatenate([data for _, data in postings])
+        
+        scores = np.bincount(doc_ids, weights=impacts, minlength=n_rows)
+        
+        # bincount returns integers when every posting list is empty
+        return scores.astype(np.float64, copy=False)
+    
+    def _kth_impact(self, term_id: int, k: int) -> float:
+        """
+        Get the k-th largest impact of a posting list (0 if it is shorter
+        than k). Cached per (term, k), since frequent terms recur in queries.
+        """
+        key = (term_id, k)
+        if key not in self._kth_impacts:
+            self._kth_impacts[key] = self._kth_score(self._postings(term_id)[1], k)
+        return self._kth_impacts[key]
+        
+    def _maxscore_terms(self, term_ids: np.ndarray, top_k: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Score documents for a set of query terms with MaxScore dynamic pruning.
+        
+        Terms are sorted by decreasing score upper bound. A lower bound of the
+        top-k threshold is the k-th largest impact of any single term, so the
+        leading (essential) terms are taken until the upper bounds of the
+        remaining terms add up to less than that threshold: only documents of
+        the essential posting lists can reach the top-k. Their postings are
+        accumulated over the candidates only, and the other (non-essential)
+        terms are probed with binary searches for the candidates still able
+        to qualify, so their posting lists are never traversed.
+        
+        When every term is essential, or the essential posting lists cover a
+        large part of the collection, pruning cannot pay off and None is
+        returned so the caller scores the query exhaustively.
+        
+        Args:
+            term_ids: Unique query term IDs
+            top_k: Number of top results that must be exact
+            
+        Returns:
+            Tuple of (candidate document IDs sorted by ID, their scores), or
+            None if no term can be pruned. Scores are exact for the top_k
+            documents; documents missing from the candidates cannot reach the
+            top_k
+        """
+        n_rows = self.impacts.shape[0]
+        k = min(top_k, n_rows)
+        if len(term_ids) == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+            
+        # Process terms with the highest upper bounds first
+        term_ids = term_ids[np.argsort(-self.term_upper_bounds[term_ids], kind='stable')]
+        bounds = self.term_upper_bounds[term_ids]
+        
+        # remaining[i] = best score obtainable from terms i, i+1, ...
+        remaining = np.append(np.cumsum(bounds[::-1])[::-1], 0.0)
+        
+        # Essential terms: unseen documents can still enter the top-k
+        threshold = 0.0
+        n_essential = 0
+        n_postings = 0
+        while n_essential < len(term_ids) and remaining[n_essential] > threshold:
+            term_id = term_ids[n_essential]
+            threshold = max(threshold, self._kth_impact(term_id, k))
+            n_postings += self.impacts.indptr[term_id + 1] - self.impacts.indptr[term_id]
+            n_essential += 1
+        if n_essential == len(term_ids) or n_postings * MAXSCORE_DENSITY >= n_rows:
+            return None
+            
+        postings = [self._postings(term_id) for term_id in term_ids[:n_essential]]
+        doc_ids = np.concatenate([docs for docs, _ in postings])
+        impacts = np.concatenate([data for _, data in postings])
+        candidates, inverse = np.unique(doc_ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=impacts, minlength=len(candidates)).astype(np.float64)
+        
+        # Non-essential terms: only probe documents that can still qualify
+        for i in range(n_essential, len(term_ids)):
+            threshold = max(threshold, self._kth_score(scores, k))
+            keep = scores + remaining[i] > threshold
+            candidates, scores = candidates[keep], scores[keep]
+            if len(candidates) == 0:
+                break
+            doc_ids, impacts = self._postings(term_ids[i])
+            if len(doc_ids) > 0:
+                positions = np.minimum(np.searchsorted(doc_ids, candidates), len(doc_ids) - 1)
+                found = doc_ids[positions] == candidates
+                scores[found] += impacts[positions[found]]
+                
+        return candidates, scores
+        
+    @staticmethod
+    def _kth_score(scores: np.ndarray, k: int) -> float:
+        """
+        Get the k-th largest score, or 0 if there are fewer than k scores.
+        """
+        if len(scores) < k:
+            return 0.0
+        return float(np.partition(scores, len(scores) - k)[len(scores) - k])
+    
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        Get the indices of the top_k highest scores, sorted by decreasing score.
+        
+        Uses partial selection (argpartition) so only the selected indices are
+        fully sorted.
+        
+        Args:
+            scores: Score of each document
+            top_k: Number of indices to return
+            
+        Returns:
+            Array of document indices
+        """
+        k = min(max(top_k, 0), len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.intp)
+        if k < len(scores):
+            top_indices = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top_indices = np.arange(len(scores))
+        return top_indices[np.argsort(-scores[top_indices], kind='stable')]
     
     def _score_document(self, query_tf: np.ndarray, doc_id: int) -> float:
         """
@@ -115,95 +985,283 @@ class BM25Retrieval:
         Returns:
             BM25 score
         """
-        # Get document term frequencies
-        doc_tf = self.tf[doc_id].toarray().flatten()
-        
-        # Get length of document
-        doc_len = self.doc_lengths[doc_id]
-        
-        # Calculate BM25 score
-        # BM25 formula: 
-        # sum(idf(t) * ((k1 + 1) * tf(t)) / (k1 * (1 - b + b * (dl/avgdl)) + tf(t)))
-        
-        # Document length normalization component
-        len_norm = 1.0 - self.b + self.b * (doc_len / self.avgdl)
+        # Get the impacts stored for this document (sparse row, never densified)
+        row = self.impacts.getrow(doc_id)
         
         # For terms that appear in both document and query
-        common_terms = np.logical_and(query_tf > 0, doc_tf > 0)
-        
-        # Calculate score for each common term
-        term_scores = np.zeros_like(doc_tf, dtype=np.float64)
-        term_scores[common_terms] = self.idf[common_terms] * (
-            (self.k1 + 1.0) * doc_tf[common_terms] / 
-            (self.k1 * len_norm + doc_tf[common_terms])
-        )
+        common_terms = query_tf[row.indices] > 0
         
-        # Sum scores for all terms
-        return np.sum(term_scores)
+        # Sum precomputed BM25 contributions of the common terms
+        return float(np.sum(row.data[common_terms]))
     
     def search(self, 
               query: str, 
               top_k: int = 10, 
-              use_preprocessor: bool = True) -> List[Dict[str, Any]]:
+              use_preprocessor: bool = True,
+              strategy: str = 'exhaustive',
+              with_snippets: bool = True,
+              with_contributions: bool = False,
+              variant: str = 'bm25',
+              delta: Optional[float] = None,
+              field_weights: Optional[Mapping[str, float]] = None) -> List[Dict[str, Any]]:
         """
         Search the corpus using BM25 ranking.
         
+        Every variant is computed from the same posting lists, so the scoring
+        function can be chosen per query: 'bm25', 'bm25+' and 'bm25l' (which
+        lower-bound the contribution of a matching term so long documents are
+        not over-penalized) and 'bm25f' (per-field length normalization and
+        weights, only for models fitted with fields).
+        
         Args:
             query: Search query
             top_k: Number of top results to return
             use_preprocessor: Whether to apply preprocessing to query
+            strategy: 'exhaustive' scores every posting of the query terms,
+                'maxscore' skips documents that cannot reach the top_k
+            with_snippets: Whether to fetch a snippet for each result (only
+                when a document store is attached)
+            with_contributions: Whether to add the score contribution of each
+                query term to each result
+            variant: Scoring function, one of BM25_VARIANTS
+            delta: Lower bound parameter of BM25+ and BM25L (None for the
+                default of the variant)
+            field_weights: Field -> weight mapping for BM25F (missing fields
+                weigh 1.0), e.g. {'titulo': 3.0, 'materias': 2.0}
             
         Returns:
-            List of dictionaries with document ID, text, and score
+            List of dictionaries with document ID, score, optional snippet and
+            optional per-term contributions
         """
-        if self.corpus is None:
+        if self.impacts is None:
             raise ValueError("Model must be fit before searching")
+        if strategy not in ('exhaustive', 'maxscore'):
+            raise ValueError(f"Unknown search strategy: {strategy}")
+        self._check_variant(variant)
+        if strategy == 'maxscore' and variant != 'bm25':
+            raise ValueError("The maxscore strategy only supports the 'bm25' variant")
+        self._ensure_statistics()
             
-        # Preprocess query if requested
-        if use_preprocessor:
-            query = self._preprocess(query)
+        # Tokenize query (cached)
+        terms, term_ids = self._query_terms(query, use_preprocessor)
+        term_ids = np.unique(term_ids[term_ids >= 0])
             
-        # Convert query to term frequency vector
-        query_tf = self.vectorizer.transform([query]).toarray().flatten()
-        
-        # Score each document
-        scores = np.zeros(self.n_docs)
-        for doc_id in range(self.n_docs):
-            scores[doc_id] = self._score_document(query_tf, doc_id)
+        # Score documents from the posting lists of the query terms
+        pruned = self._maxscore_terms(term_ids, top_k) if strategy == 'maxscore' else None
+        if pruned is not None:
+            top_indices, top_scores = self._top_k_sparse(*pruned, top_k)
+        else:
+            scores = self._score_terms(term_ids, variant, delta, field_weights)
+            
+            # Removed documents never appear in the results
+            scores[self.removed] = -np.inf
+            
+            # Get top_k documents
+            top_indices = self._top_k(scores, min(top_k, self.n_docs))
+            top_scores = scores[top_indices]
             
-        # Get top_k documents
-        top_indices = np.argsort(-scores)[:top_k]
+            # Fewer matches than top_k: pad like batch_search (lowest IDs first)
+            matched = top_scores > 0
+            if not matched.all():
+                top_indices, top_scores = self._top_k_sparse(
+                    top_indices[matched], top_scores[matched], top_k
+                )
         
-        # Prepare results
+        results = self._format_results(
+            top_indices, top_scores, terms if with_snippets else None
+        )
+        
+        if with_contributions:
+            contribution_terms, contributions = self.explain(
+                query, top_indices, use_preprocessor, variant, delta, field_weights
+            )
+            for result, row in zip(results, contributions):
+                result['contributions'] = dict(zip(contribution_terms, row.tolist()))
+                
+        return results
+    
+    def _format_results(self, 
+                        doc_ids: np.ndarray, 
+                        scores: np.ndarray,
+                        terms: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Build the result dictionaries for a ranked list of documents.
+        
+        Args:
+            doc_ids: Ranked document IDs
+            scores: Score of each ranked document
+            terms: Query terms to build snippets for, or None to skip snippets
+            
+        Returns:
+            List of dictionaries with document ID, score and optional snippet
+        """
+        if self.document_store is None:
+            terms = None
+        elif terms is not None:
+            terms = set(terms)
+            
         results = []
-        for idx in top_indices:
-            results.append({
+        for idx, score in zip(doc_ids, scores):
+            result = {
                 'id': int(idx),
-                'score': float(scores[idx]),
-                'text': self.corpus[idx]
-            })
-            
+                'score': float(score)
+            }
+            if terms is not None:
+                result['snippet'] = self._snippet(self.document_store[idx], terms)
+            results.append(result)
         return results
     
+    def get_snippet(self, doc_id: int, query: str, window: int = 30) -> str:
+        """
+        Fetch a document from the document store and extract a snippet
+        around the query terms.
+        
+        Args:
+            doc_id: Document ID
+            query: Search query
+            window: Snippet length in words
+            
+        Returns:
+            Snippet text
+        """
+        if self.document_store is None:
+            raise ValueError("No document store attached to the model")
+        terms = set(self.tokenizer.tokenize(query))
+        return self._snippet(self.document_store[doc_id], terms, window)
+    
+    def _snippet(self, text: str, terms: set, window: int = 30) -> str:
+        """
+        Extract the window of words containing the most query term matches.
+        
+        Args:
+            text: Raw document text
+            terms: Normalized query terms
+            window: Snippet length in words
+            
+        Returns:
+            Snippet text, with ellipses where the document was cut
+        """
+        words = list(self.tokenizer.iter_spans(text))
+        if not words:
+            return text.strip()
+            
+        # Positions (in words) of the query term matches
+        matches = np.array([i for i, (term, _, _) in enumerate(words) if term in terms])
+        
+        start = 0
+        if len(matches) > 0:
+            # Number of matches inside the window starting at each match
+            counts = np.searchsorted(matches, matches + window) - np.arange(len(matches))
+            start = int(matches[np.argmax(counts)])
+            # Add some leading context when the window is not full of matches
+            start = max(0, min(start - window // 4, len(words) - window))
+        end = min(len(words), start + window)
+        
+        begin = words[start][1] if start > 0 else 0
+        finish = words[end - 1][2] if end < len(words) else len(text)
+        snippet = text[begin:finish].strip()
+        if start > 0:
+            snippet = '...' + snippet
+        if end < len(words):
+            snippet = snippet + '...'
+        return snippet
+    
     def batch_search(self, 
                     queries: List[str], 
                     top_k: int = 10,
-                    use_preprocessor: bool = True) -> List[List[Dict[str, Any]]]:
+                    use_preprocessor: bool = True,
+                    chunk_size: int = 1024,
+                    with_snippets: bool = True) -> List[List[Dict[str, Any]]]:
         """
         Perform batch search with multiple queries.
         
+        All queries are vectorized into one sparse query-term matrix (each
+        distinct set of query terms once, each term counted once per query) and
+        multiplied against the BM25 impact matrix, `chunk_size` queries at a
+        time.
+        
         Args:
             queries: List of search queries
             top_k: Number of top results to return per query
             use_preprocessor: Whether to apply preprocessing to queries
+            chunk_size: Number of queries scored per matrix product, bounds
+                the size of the intermediate query x document score matrix
+            with_snippets: Whether to fetch a snippet for each result (only
+                when a document store is attached)
             
         Returns:
             List of results for each query
         """
-        results = []
-        for query in queries:
-            results.append(self.search(query, top_k, use_preprocessor))
-        return results
+        if self.impacts is None:
+            raise ValueError("Model must be fit before searching")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        self._ensure_statistics()
+            
+        # Queries with the same set of terms get the same results
+        queries = [frozenset(self._query_terms(query, use_preprocessor)[0]) for query in queries]
+        unique_queries = list(dict.fromkeys(queries))
+        if not unique_queries:
+            return []
+            
+        # Binary query-term matrix: repeated terms contribute once, like search
+        rows = [self._query_term_ids(terms) for terms in unique_queries]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(term_ids) for term_ids in rows])
+        indices = np.concatenate(rows)
+        Q = sparse.csr_matrix(
+            (np.ones(len(indices)), indices, indptr),
+            shape=(len(unique_queries), self.impacts.shape[1])
+        )
+        
+        # (V x N_docs) view of the impact matrix
+        weights = self.impacts.T
+        
+        unique_results = []
+        for start in range(0, Q.shape[0], chunk_size):
+            chunk_scores = (Q[start:start + chunk_size] @ weights).tocsr()
+            for row in range(chunk_scores.shape[0]):
+                lo, hi = chunk_scores.indptr[row], chunk_scores.indptr[row + 1]
+                doc_ids, scores = self._top_k_sparse(
+                    chunk_scores.indices[lo:hi], chunk_scores.data[lo:hi], top_k
+                )
+                terms = unique_queries[start + row] if with_snippets else None
+                unique_results.append(self._format_results(doc_ids, scores, terms))
+                
+        # Map results back to the original query order
+        by_query = dict(zip(unique_queries, unique_results))
+        return [by_query[query] for query in queries]
+    
+    def _top_k_sparse(self, 
+                      doc_ids: np.ndarray, 
+                      scores: np.ndarray, 
+                      top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the top_k documents from a sparse row of scores.
+        
+        If fewer than top_k documents have a non-zero score, the ranking is
+        padded with the zero-score (non-removed) documents of lowest ID, as
+        `search` does.
+        
+        Args:
+            doc_ids: Documents with a non-zero score
+            scores: Score of each of those documents
+            top_k: Number of documents to return
+            
+        Returns:
+            Tuple of (ranked document IDs, scores)
+        """
+        order = self._top_k(scores, top_k)
+        top_ids, top_scores = doc_ids[order], scores[order]
+        
+        n_missing = min(top_k, self.n_docs) - len(top_ids)
+        if n_missing > 0:
+            excluded = np.union1d(doc_ids, np.flatnonzero(self.removed))
+            padding = np.setdiff1d(np.arange(len(excluded) + n_missing), excluded)[:n_missing]
+            top_ids = np.concatenate([top_ids, padding])
+            top_scores = np.concatenate([top_scores, np.zeros(n_missing)])
+            
+        return top_ids, top_scores
     
     def get_term_importance(self, term: str) -> float:
         """
@@ -215,12 +1273,37 @@ class BM25Retrieval:
         Returns:
             IDF value of the term or 0 if not in vocabulary
         """
+        self._ensure_statistics()
         if term not in self.vocabulary:
             return 0.0
         
         term_id = self.vocabulary[term]
         return float(self.idf[term_id])
     
+    def get_terms_importance(self, terms: List[str]) -> np.ndarray:
+        """
+        Get the importance (IDF) of many terms at once.
+        
+        Args:
+            terms: Terms to get importance for
+            
+        Returns:
+            Array with the IDF of each term (0 if not in vocabulary)
+        """
+        self._ensure_statistics()
+        get = self.vocabulary.get
+        term_ids = np.array([get(term, -1) for term in terms], dtype=np.int64)
+        return self._idf_of(term_ids)
+    
+    def _idf_of(self, term_ids: np.ndarray) -> np.ndarray:
+        """
+        Look up the IDF of term IDs, with 0 for unknown terms (ID -1).
+        """
+        known = term_ids >= 0
+        idf = np.zeros(len(term_ids))
+        idf[known] = self.idf[term_ids[known]]
+        return idf
+    
     def calculate_query_importance(self, query: str) -> Dict[str, float]:
         """
         Calculate importance scores for each term in the query.
@@ -231,19 +1314,84 @@ class BM25Retrieval:
         Returns:
             Dictionary mapping terms to their importance scores
         """
-        # Preprocess query
-        query = self._preprocess(query)
+        self._ensure_statistics()
+        
+        # Get query terms (cached tokenization)
+        terms, term_ids = self._query_terms(query)
+        
+        return dict(zip(terms, self._idf_of(term_ids).tolist()))
+    
+    def batch_query_importance(self, 
+                               queries: List[str],
+                               use_preprocessor: bool = True) -> List[Tuple[Tuple[str, ...], np.ndarray]]:
+        """
+        Calculate the importance (IDF) of the terms of many queries at once.
         
-        # Get query terms
-        terms = query.split()
+        Args:
+            queries: Search queries
+            use_preprocessor: Whether to run the tokenizer on the queries
+            
+        Returns:
+            For each query, a tuple of (query terms, IDF of each term)
+        """
+        self._ensure_statistics()
+        tokenized = [self._query_terms(query, use_preprocessor) for query in queries]
+        if not tokenized:
+            return []
+            
+        # One vectorized lookup for all the terms of all the queries
+        idf = self._idf_of(np.concatenate([term_ids for _, term_ids in tokenized]))
+        splits = np.cumsum([len(terms) for terms, _ in tokenized])[:-1]
         
-        # Calculate importance
-        importance = {}
-        for term in terms:
-            if term in self.vocabulary:
-                term_id = self.vocabulary[term]
-                importance[term] = float(self.idf[term_id])
-            else:
-                importance[term] = 0.0
+        return [
+            (terms, query_idf)
+            for (terms, _), query_idf in zip(tokenized, np.split(idf, splits))
+        ]
+    
+    def explain(self, 
+                query: str, 
+                doc_ids: List[int],
+                use_preprocessor: bool = True,
+                variant: str = 'bm25',
+                delta: Optional[float] = None,
+                field_weights: Optional[Mapping[str, float]] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Break down the BM25 score of some documents into per-term contributions.
+        
+        Args:
+            query: Search query
+            doc_ids: Documents to explain (e.g. the IDs of search results)
+            use_preprocessor: Whether to run the tokenizer on the query
+            variant: Scoring function, see `search`
+            delta: Lower bound parameter of BM25+ and BM25L
+            field_weights: Field -> weight mapping for BM25F
+            
+        Returns:
+            Tuple of (distinct query terms in the vocabulary, matrix with the
+            contribution of each term (columns) to each document (rows)). Rows
+            sum to the document scores
+        """
+        self._check_variant(variant)
+        self._ensure_statistics()
+        terms, term_ids = self._query_terms(query, use_preprocessor)
+        
+        # Distinct known terms, in query order
+        known = {}
+        for term, term_id in zip(terms, term_ids.tolist()):
+            if term_id >= 0:
+                known.setdefault(term, term_id)
                 
-        return importance
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        if variant == 'bm25':
+            contributions = self.impacts[:, list(known.values())][doc_ids].toarray()
+            return list(known), contributions
+            
+        contributions = np.zeros((len(doc_ids), len(known)))
+        for col, term_id in enumerate(known.values()):
+            posting_docs, posting_scores = self._term_postings(term_id, variant, delta, field_weights)
+            if len(posting_docs) == 0:
+                continue
+            positions = np.minimum(np.searchsorted(posting_docs, doc_ids), len(posting_docs) - 1)
+            found = posting_docs[positions] == doc_ids
+            contributions[found, col] = posting_scores[positions[found]]
+        return list(known), contributions
@@ -0,0 +1,248 @@
+"""
+Sharded BM25 implementation for large legal corpora.
+This module splits the BOE corpus into shards (for example one per year
+folder of the diario), fits them in parallel processes and merges their
+statistics so that scores are identical to a single BM25 index.
+"""
+
+import numpy as np
+import heapq
+from typing import List, Dict, Any, Optional, Sequence, Mapping
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from backend.lib.api.metaheuristics.bm25 import BM25Retrieval
+from backend.lib.language.tokenizer import Tokenizer
+
+
+def _fit_shard(documents: List[str], 
+               k1: float, 
+               b: float, 
+               tokenizer: Tokenizer, 
+               use_preprocessor: bool,
+               fields: Optional[Sequence[str]] = None) -> BM25Retrieval:
+    """
+    Fit a BM25 model on one shard (runs in a worker process).
+    """
+    return BM25Retrieval(k1=k1, b=b, tokenizer=tokenizer).fit(
+        documents, use_preprocessor, fields=fields
+    )
+
+
+class ShardedBM25Retrieval:
+    def __init__(self, 
+                 k1: float = 1.5, 
+                 b: float = 0.75,
+                 tokenizer: Optional[Tokenizer] = None,
+                 n_jobs: Optional[int] = None):
+        """
+        Initialize sharded BM25 retrieval model.
+        
+        Args:
+            k1: Term saturation parameter (typical values: 1.2-2.0)
+            b: Document length normalization (0.75 is a common value)
+            tokenizer: Tokenizer shared by every shard
+            n_jobs: Number of worker processes/threads (None uses all cores)
+        """
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer or Tokenizer()
+        self.n_jobs = n_jobs
+        self.shards = None
+        self.offsets = None
+        self.vocabulary = None
+        self.doc_freqs = None
+        self.n_docs = None
+        self.avgdl = None
+        self.fields = None
+        self.document_store = None
+        
+    def fit(self, 
+            shards: Sequence[Sequence[str]], 
+            use_preprocessor: bool = True,
+            document_store: Optional[Sequence[str]] = None,
+            fields: Optional[Sequence[str]] = None):
+        """
+        Fit one BM25 model per shard in a process pool and merge their
+        statistics.
+        
+        Global document IDs follow the order of the shards: the documents of
+        the first shard come first, then those of the second one, etc.
+        
+        Args:
+            shards: Lists of document texts, one per shard (e.g. per year)
+            use_preprocessor: Whether to apply preprocessing to documents
+            document_store: Optional source of raw texts for snippets,
+                indexed by global document ID
+            fields: Names of the document fields if the shards hold field ->
+                text mappings, see BM25Retrieval.fit
+        """
+        shards = [list(shard) for shard in shards if len(shard) > 0]
+        if not shards:
+            raise ValueError("Cannot fit on an empty corpus")
+        self.document_store = document_store
+        self.fields = tuple(fields) if fields else None
+        
+        # Tokenize and count every shard in parallel
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            self.shards = list(executor.map(
+                _fit_shard, shards, repeat(self.k1), repeat(self.b),
+                repeat(self.tokenizer), repeat(use_preprocessor), repeat(self.fields)
+            ))
+            
+        # Global ID of the first document of each shard
+        self.offsets = np.concatenate([[0], np.cumsum([len(shard) for shard in shards])])
+        
+        self._merge_statistics()
+        
+        return self
+    
+    def _merge_statistics(self):
+        """
+        Merge the document frequencies and lengths of all shards and rebuild
+        each shard's impacts with the global IDF and average length.
+        """
+        # Global vocabulary and mapping from each shard's term IDs
+        self.vocabulary = {}
+        local_to_global = []
+        for shard in self.shards:
+            mapping = np.empty(len(shard.vocabulary), dtype=np.int64)
+            for term, term_id in shard.vocabulary.items():
+                mapping[term_id] = self.vocabulary.setdefault(term, len(self.vocabulary))
+            local_to_global.append(mapping)
+            
+        # Global document frequencies and lengths
+        self.doc_freqs = np.zeros(len(self.vocabulary), dtype=np.int64)
+        for shard, mapping in zip(self.shards, local_to_global):
+            self.doc_freqs[mapping] += shard.doc_freqs
+        self.n_docs = sum(shard.n_docs for shard in self.shards)
+        self.avgdl = sum(float(np.sum(shard.doc_lengths)) for shard in self.shards) / self.n_docs
+        
+        if self.fields:
+            avg_field_lengths = sum(shard.field_lengths.sum(axis=0) for shard in self.shards) / self.n_docs
+        
+        # Rebuild shard impacts with the collection-wide statistics
+        idf = BM25Retrieval._compute_idf(self.n_docs, self.doc_freqs)
+        for shard, mapping in zip(self.shards, local_to_global):
+            shard.idf = idf[mapping]
+            shard.avgdl = self.avgdl
+            if self.fields:
+                shard.avg_field_lengths = avg_field_lengths
+            shard._build_impacts()
+    
+    def _scatter(self, fn) -> List[Any]:
+        """
+        Run a function on every shard in a thread pool.
+        """
+        if len(self.shards) == 1:
+            return [fn(self.shards[0])]
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+            return list(executor.map(fn, self.shards))
+    
+    def _gather(self, 
+                shard_results: List[List[Dict[str, Any]]], 
+                top_k: int,
+                terms: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Merge the per-shard rankings of one query into a global top-k.
+        
+        Args:
+            shard_results: Results of each shard (local document IDs)
+            top_k: Number of top results to return
+            terms: Query terms to build snippets for, or None
+            
+        Returns:
+            List of dictionaries with global document ID, score and optional snippet
+        """
+        candidates = [
+            {'id': int(self.offsets[shard_idx] + result['id']), 'score': result['score']}
+            for shard_idx, results in enumerate(shard_results)
+            for result in results
+        ]
+        merged = heapq.nlargest(top_k, candidates, key=lambda result: result['score'])
+        
+        if terms is not None and self.document_store is not None:
+            terms = set(terms)
+            for result in merged:
+                result['snippet'] = self.shards[0]._snippet(self.document_store[result['id']], terms)
+                
+        return merged
+    
+    def search(self, 
+              query: str, 
+              top_k: int = 10, 
+              use_preprocessor: bool = True,
+              strategy: str = 'exhaustive',
+              with_snippets: bool = True,
+              variant: str = 'bm25',
+              delta: Optional[float] = None,
+              field_weights: Optional[Mapping[str, float]] = None) -> List[Dict[str, Any]]:
+        """
+        Search all shards (scatter) and merge their top-k (gather).
+        
+        Args:
+            query: Search query
+            top_k: Number of top results to return
+            use_preprocessor: Whether to apply preprocessing to query
+            strategy: 'exhaustive' or 'maxscore', see BM25Retrieval.search
+            with_snippets: Whether to fetch a snippet for each result (only
+                when a document store is attached)
+            variant: Scoring function, see BM25Retrieval.search
+            delta: Lower bound parameter of BM25+ and BM25L
+            field_weights: Field -> weight mapping for BM25F
+            
+        Returns:
+            List of dictionaries with global document ID, score and optional snippet
+        """
+        if self.shards is None:
+            raise ValueError("Model must be fit before searching")
+            
+        # Tokenize once, shards receive the preprocessed query
+        terms = self.shards[0]._terms(query, use_preprocessor)
+        query = ' '.join(terms)
+            
+        shard_results = self._scatter(
+            lambda shard: shard.search(
+                query, top_k, False, strategy, with_snippets=False,
+                variant=variant, delta=delta, field_weights=field_weights
+            )
+        )
+        return self._gather(shard_results, top_k, terms if with_snippets else None)
+    
+    def batch_search(self, 
+                    queries: List[str], 
+                    top_k: int = 10,
+                    use_preprocessor: bool = True,
+                    chunk_size: int = 1024,
+                    with_snippets: bool = True) -> List[List[Dict[str, Any]]]:
+        """
+        Perform batch search with multiple queries on all shards.
+        
+        Args:
+            queries: List of search queries
+            top_k: Number of top results to return per query
+            use_preprocessor: Whether to apply preprocessing to queries
+            chunk_size: Number of queries scored per matrix product
+            with_snippets: Whether to fetch a snippet for each result (only
+                when a document store is attached)
+            
+        Returns:
+            List of results for each query
+        """
+        if self.shards is None:
+            raise ValueError("Model must be fit before searching")
+            
+        # Tokenize once, shards receive the preprocessed queries
+        terms = [self.shards[0]._terms(query, use_preprocessor) for query in queries]
+        queries = [' '.join(query_terms) for query_terms in terms]
+            
+        shard_results = self._scatter(
+            lambda shard: shard.batch_search(queries, top_k, False, chunk_size, with_snippets=False)
+        )
+        return [
+            self._gather(
+                [results[query_idx] for results in shard_results],
+                top_k,
+                query_terms if with_snippets else None
+            )
+            for query_idx, query_terms in enumerate(terms)
+        ]
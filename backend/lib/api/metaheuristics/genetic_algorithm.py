@@ -4,10 +4,212 @@ This module provides a GA-based approach to select the most informative sentence
 """
 
 import numpy as np
-from typing import List, Tuple, Dict, Set
+from typing import List, Tuple, Dict, Set, Union, Optional, Iterable, Iterator, Any
+import os
 import re
-from sklearn.metrics.pairwise import cosine_similarity
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
+from backend.lib.api.metaheuristics.bm25 import boe_fields_from_xml, _save_array, _write_strings, _StringTable
+from backend.lib.language.stop_words import resolve_stop_words
+
+# Maximum number of preprocessed documents kept by each summarizer
+DOCUMENT_CACHE_SIZE = 128
+
+# Maximum number of swaps applied to each copy of the MMR summary
+MMR_SEED_SWAPS = 2
+
+VECTORIZER_FORMAT_VERSION = 1
+
+
+def iter_boe_documents(diario_dir: str) -> Iterator[Tuple[str, str]]:
+    """
+    Stream the BOE diario XML documents of a folder (e.g. one day), in order.
+    
+    Args:
+        diario_dir: Directory with the XML documents (searched recursively)
+        
+    Yields:
+        Tuples of (document ID, body text); the ID is the file name without
+        the .xml extension
+    """
+    for dirpath, dirnames, filenames in os.walk(diario_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.xml'):
+                fields = boe_fields_from_xml(os.path.join(dirpath, filename))
+                yield filename[:-len('.xml')], fields['texto']
+
+
+class CorpusVectorizer:
+    """
+    Vocabulary and IDF fitted once over a corpus (e.g. the BOE archive) and
+    used to vectorize the sentences of any document with a transform-only
+    step, instead of fitting the IDF on the few sentences of each document.
+    
+    Saved vectorizers are loaded with the IDF memory-mapped; the vocabulary
+    is decoded into a dict, once per process that loads it. Once saved or
+    loaded, a pickled vectorizer (e.g. sent to worker processes) only
+    carries its path and is reloaded from disk in the receiving process.
+    """
+    
+    def __init__(self, 
+                 stop_words: Union[str, List[str]] = 'spanish',
+                 min_df: int = 2,
+                 max_df: float = 0.95):
+        """
+        Initialize the corpus vectorizer.
+        
+        Args:
+            stop_words: Stop words to exclude ('spanish' or custom list)
+            min_df: Minimum document frequency of the vocabulary terms
+            max_df: Maximum document frequency of the vocabulary terms
+        """
+        self.stop_words = stop_words
+        self.min_df = min_df
+        self.max_df = max_df
+        self.vectorizer = None
+        self.path = None
+        self.mmap = True
+        self._fingerprint = None
+        
+    def fit(self, documents: Iterable[str]):
+        """
+        Fit the vocabulary and the document-level IDF.
+        
+        Args:
+            documents: Document texts (may be a generator, e.g. the texts
+                of `iter_boe_documents`)
+        """
+        self.vectorizer = TfidfVectorizer(
+            stop_words=resolve_stop_words(self.stop_words), min_df=self.min_df, max_df=self.max_df
+        ).fit(documents)
+        self.path = None
+        self._fingerprint = None
+        return self
+        
+    def transform(self, sentences: List[str]) -> sparse.csr_matrix:
+        """
+        Create the L2-normalized TF-IDF vectors of a list of sentences.
+        
+        Args:
+            sentences: Sentence texts
+            
+        Returns:
+            (n_sentences x n_terms) TF-IDF matrix
+        """
+        if self.vectorizer is None:
+            raise ValueError("Vectorizer must be fit before transforming")
+        return self.vectorizer.transform(sentences)
+        
+    def fingerprint(self) -> str:
+        """
+        Get a hash identifying the vocabulary and IDF, used to key the
+        sentence vectors cached by the summarizer.
+        
+        Returns:
+            Hex digest of the vectorizer
+        """
+        if self.vectorizer is None:
+            raise ValueError("Vectorizer must be fit before fingerprinting")
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            digest.update(np.ascontiguousarray(self.vectorizer.idf_).tobytes())
+            digest.update('\n'.join(self.vectorizer.get_feature_names_out()).encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+        
+    def save(self, path: str):
+        """
+        Save the vocabulary (a UTF-8 blob with an offset table, in column
+        order) and the IDF (.npy) to a directory.
+        
+        Args:
+            path: Output directory (created if needed)
+        """
+        if self.vectorizer is None:
+            raise ValueError("Vectorizer must be fit before saving")
+        os.makedirs(path, exist_ok=True)
+        
+        _save_array(path, 'idf', self.vectorizer.idf_)
+        _write_strings(path, 'terms', self.vectorizer.get_feature_names_out())
+        meta = {
+            'format_version': VECTORIZER_FORMAT_VERSION,
+            'stop_words': self.stop_words,
+            'min_df': self.min_df,
+            'max_df': self.max_df,
+        }
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        self.path = path
+        
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'CorpusVectorizer':
+        """
+        Load a vectorizer written by `save`.
+        
+        Args:
+            path: Directory written by `save`
+            mmap: Whether to memory-map the IDF (the vocabulary table is
+                read into a dict either way)
+            
+        Returns:
+            Loaded vectorizer, ready to transform
+        """
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['format_version'] != VECTORIZER_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vectorizer format: {meta['format_version']}")
+            
+        model = cls(stop_words=meta['stop_words'], min_df=meta['min_df'], max_df=meta['max_df'])
+        terms = _StringTable(path, 'terms', mmap)
+        model.vectorizer = TfidfVectorizer(
+            stop_words=resolve_stop_words(model.stop_words),
+            vocabulary={term: column for column, term in enumerate(terms)}
+        )
+        model.vectorizer.idf_ = np.load(os.path.join(path, 'idf.npy'), mmap_mode='r' if mmap else None)
+        model.path = path
+        model.mmap = mmap
+        return model
+        
+    def __getstate__(self):
+        # Saved vectorizers are reloaded from disk instead of being pickled
+        if self.path is not None:
+            return {'path': self.path, 'mmap': self.mmap}
+        return self.__dict__.copy()
+        
+    def __setstate__(self, state):
+        if set(state) == {'path', 'mmap'}:
+            state = self.load(state['path'], state['mmap']).__dict__
+        self.__dict__.update(state)
+
+
+# Summarizer of the worker processes of a batch run
+_WORKER_SUMMARIZER = None
+
+
+def _init_worker(summarizer):
+    """
+    Receive the summarizer once per worker process.
+    """
+    global _WORKER_SUMMARIZER
+    # The documents of a batch are all different, so workers do not cache them
+    summarizer._document_cache = None
+    _WORKER_SUMMARIZER = summarizer
+
+
+def _summarize_document(text, seed, max_summary_ratio):
+    """
+    Summarize one document of a batch run with its own seed (runs in a
+    worker process).
+    """
+    np.random.seed(seed)
+    return _WORKER_SUMMARIZER.summarize(text, max_summary_ratio)
+
 
 class ExtractiveSummarizerGA:
     def __init__(self, 
@@ -15,7 +217,14 @@ class ExtractiveSummarizerGA:
                  generations: int = 30,
                  summary_size: int = 3,
                  crossover_rate: float = 0.8,
-                 mutation_rate: float = 0.2):
+                 mutation_rate: float = 0.2,
+                 stop_words: Union[str, List[str]] = 'spanish',
+                 init_method: str = 'random',
+                 mmr_lambda: float = 0.7,
+                 patience: Optional[int] = 10,
+                 tol: float = 1e-6,
+                 time_budget: Optional[float] = None,
+                 vectorizer: Optional[CorpusVectorizer] = None):
         """
         Initialize the GA-based extractive summarizer.
         
@@ -25,12 +234,44 @@ class ExtractiveSummarizerGA:
             summary_size: Target number of sentences in summary
             crossover_rate: Probability of performing crossover operation
             mutation_rate: Probability of mutation for each gene
+            stop_words: Stop words to exclude from the sentence vectors
+                ('spanish' or custom list)
+            init_method: 'random' or 'mmr' (seed the population with a greedy
+                maximal marginal relevance summary)
+            mmr_lambda: Trade-off between relevance and redundancy of the
+                MMR selection (1 ignores redundancy)
+            patience: Generations without improvement of the best fitness
+                before stopping (None to run every generation)
+            tol: Minimum fitness gain counted as an improvement
+            time_budget: Wall-clock budget of a summarize call in seconds
+                (None for no limit); the evolution stops once it is spent
+            vectorizer: Fitted corpus-level vectorizer used to transform the
+                sentences (None to fit the TF-IDF on each document)
         """
+        if init_method not in ('random', 'mmr'):
+            raise ValueError(f"Unknown initialization method: {init_method}")
         self.population_size = population_size
         self.generations = generations
         self.summary_size = summary_size
         self.crossover_rate = crossover_rate
         self.mutation_rate = mutation_rate
+        self.stop_words = stop_words
+        self.init_method = init_method
+        self.mmr_lambda = mmr_lambda
+        self.patience = patience
+        self.tol = tol
+        self.time_budget = time_budget
+        self.vectorizer = vectorizer
+        self.generations_run = 0
+        
+        # LRU cache of the preprocessed documents, keyed by content hash
+        self._document_cache = OrderedDict()
+        
+    def __getstate__(self):
+        # Worker processes start with an empty cache
+        state = self.__dict__.copy()
+        state['_document_cache'] = OrderedDict()
+        return state
         
     def _split_into_sentences(self, text: str) -> List[str]:
         """Split text into sentences using regex for legal text."""
@@ -49,140 +290,333 @@ class ExtractiveSummarizerGA:
         
     def _create_sentence_vectors(self, sentences: List[str]) -> np.ndarray:
         """Create TF-IDF vectors for each sentence."""
-        vectorizer = TfidfVectorizer(stop_words='spanish')
+        if self.vectorizer is not None:
+            return self.vectorizer.transform(sentences)
+        vectorizer = TfidfVectorizer(stop_words=resolve_stop_words(self.stop_words))
         tfidf_matrix = vectorizer.fit_transform(sentences)
         return tfidf_matrix
         
-    def _initialize_population(self, n_sentences: int) -> List[np.ndarray]:
-        """
-        Create initial random population of binary vectors.
-        Each vector represents which sentences are included in the summary.
-        """
-        population = []
-        for _ in range(self.population_size):
-            # Generate random binary vector with exactly summary_size 1's
-            individual = np.zeros(n_sentences, dtype=int)
-            selected_indices = np.random.choice(
-                range(n_sentences), 
-                min(self.summary_size, n_sentences), 
-                replace=False
-            )
-            individual[selected_indices] = 1
-            population.append(individual)
+    def _preprocess(self, text: str, vectorize: bool = True) -> Dict[str, Any]:
+        """
+        Split a document into sentences and vectorize them, caching both by
+        content hash so repeated summarizations of the same document (e.g.
+        parameter sweeps) skip preprocessing. Only the sparse sentence
+        vectors are cached: the dense tables of `_precompute` grow with the
+        square of the number of sentences and are rebuilt on every call.
+        
+        Args:
+            text: Document text
+            vectorize: Whether the sentence vectors are needed
+            
+        Returns:
+            Dictionary with the sentences ('sentences') and, when vectorized,
+            the TF-IDF sentence vectors ('sentence_vectors'). The entry is
+            shared with the cache and must not be modified
+        """
+        key = (
+            hashlib.sha1(text.encode('utf-8')).hexdigest(),
+            repr(self.stop_words),
+            self.vectorizer.fingerprint() if self.vectorizer is not None else None
+        )
+        cache = self._document_cache if self._document_cache is not None else OrderedDict()
+        entry = cache.get(key)
+        if entry is None:
+            entry = {'sentences': self._split_into_sentences(text)}
+            cache[key] = entry
+            if len(cache) > DOCUMENT_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+            
+        if vectorize:
+            self._vectorize(entry)
+        return entry
+        
+    def _vectorize(self, entry: Dict[str, Any]) -> sparse.csr_matrix:
+        """
+        Get the TF-IDF sentence vectors of an entry of `_preprocess`, creating
+        them on first use.
+        
+        Args:
+            entry: Dictionary returned by `_preprocess`
+            
+        Returns:
+            (n_sentences x n_terms) TF-IDF matrix
+        """
+        if 'sentence_vectors' not in entry:
+            entry['sentence_vectors'] = self._create_sentence_vectors(entry['sentences'])
+        return entry['sentence_vectors']
+        
+    def _initialize_population(self, 
+                               n_sentences: int, 
+                               context: Optional[Dict[str, np.ndarray]] = None,
+                               summary_size: Optional[int] = None) -> np.ndarray:
+        """
+        Create initial population of binary vectors.
+        Each row represents which sentences are included in the summary.
+        
+        With the 'mmr' initialization the first individual is the greedy MMR
+        summary, half of the population are copies of it with 1 to
+        MMR_SEED_SWAPS sentences swapped and the rest are random, so the
+        search starts around a good solution without losing diversity.
+        
+        Args:
+            n_sentences: Number of sentences of the document
+            context: Tables returned by `_precompute` (required for 'mmr')
+            summary_size: Sentences per summary (None for self.summary_size)
+            
+        Returns:
+            (population_size x n_sentences) boolean array with exactly
+            summary_size True values per row
+        """
+        summary_size = min(summary_size or self.summary_size, n_sentences)
+        
+        # Generate random binary vectors with exactly summary_size 1's
+        population = self._random_selection(
+            np.zeros((self.population_size, n_sentences), dtype=bool), summary_size
+        )
+        if self.init_method == 'mmr':
+            seed = np.zeros(n_sentences, dtype=bool)
+            seed[self._mmr_selection(context, summary_size)] = True
+            n_seeded = max(1, self.population_size // 2)
+            population[:n_seeded] = seed
+            n_swaps = np.random.randint(1, MMR_SEED_SWAPS + 1, size=n_seeded - 1)
+            population[1:n_seeded] = self._swap(population[1:n_seeded], n_swaps)
         return population
         
+    def _mmr_selection(self, context: Dict[str, np.ndarray], k: int) -> List[int]:
+        """
+        Greedy maximal marginal relevance selection of k sentences.
+        
+        Each step picks the sentence maximizing
+        mmr_lambda * sim(sentence, document) - (1 - mmr_lambda) * max sim(sentence, selected),
+        using the precomputed similarity tables.
+        
+        Args:
+            context: Tables returned by `_precompute`
+            k: Number of sentences to select
+            
+        Returns:
+            Indices of the selected sentences, in selection order
+        """
+        # Cosine similarity of each sentence with the document vector
+        norms = context['doc_norm'] * np.sqrt(np.diag(context['gram']))
+        relevance = np.divide(
+            context['doc_dots'], norms, out=np.zeros(len(norms)), where=norms > 0
+        )
+        
+        selected = []
+        redundancy = np.zeros(len(relevance))
+        available = np.ones(len(relevance), dtype=bool)
+        for _ in range(k):
+            scores = self.mmr_lambda * relevance - (1.0 - self.mmr_lambda) * redundancy
+            best = int(np.argmax(np.where(available, scores, -np.inf)))
+            selected.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, context['similarities'][best])
+        return selected
+        
+    def _random_selection(self, 
+                          population: np.ndarray, 
+                          sizes: Union[int, np.ndarray]) -> np.ndarray:
+        """
+        Make every row of a population select exactly `sizes` sentences.
+        
+        Rows with too many sentences drop random ones and rows with too few
+        add random ones: the selected sentences get random keys in [1, 2) and
+        the others in [0, 1), and the top keys of each row win.
+        
+        Args:
+            population: (n_individuals x n_sentences) selection matrix
+            sizes: Number of sentences of every row, or one number per row
+            
+        Returns:
+            Repaired selection matrix
+        """
+        keys = population + np.random.random(population.shape)
+        ranks = np.argsort(np.argsort(-keys, axis=1), axis=1)
+        return ranks < np.reshape(sizes, (-1, 1))
+        
+    def _precompute(self, sentence_vectors: sparse.csr_matrix) -> Dict[str, np.ndarray]:
+        """
+        Precompute, once per document, every quantity the fitness needs.
+        
+        The summary vector of the coverage score is the mean of the selected
+        sentence vectors, so its dot product with the document vector and its
+        norm are sums of per-sentence dot products and of Gram matrix entries.
+        
+        Args:
+            sentence_vectors: TF-IDF matrix of the sentences
+            
+        Returns:
+            Dictionary with the dot product of each sentence with the document
+            vector ('doc_dots'), the document vector norm ('doc_norm'), the
+            sentence Gram matrix ('gram'), the sentence x sentence cosine
+            similarities ('similarities'), the TF-IDF mass of each sentence
+            ('importances') and the position score of each sentence
+            ('positions')
+        """
+        n_sentences = sentence_vectors.shape[0]
+        
+        # Document centroid
+        document_vector = np.asarray(sentence_vectors.mean(axis=0)).ravel()
+        
+        gram = (sentence_vectors @ sentence_vectors.T).toarray()
+        norms = np.sqrt(np.diag(gram))
+        outer_norms = np.outer(norms, norms)
+        similarities = np.divide(gram, outer_norms, out=np.zeros_like(gram), where=outer_norms > 0)
+        
+        return {
+            'doc_dots': sentence_vectors @ document_vector,
+            'doc_norm': np.linalg.norm(document_vector),
+            'gram': gram,
+            'similarities': similarities,
+            'importances': np.asarray(sentence_vectors.sum(axis=1)).ravel(),
+            'positions': 1.0 - np.arange(n_sentences) / n_sentences,
+        }
+        
     def _fitness_function(self, 
                           individual: np.ndarray, 
-                          sentence_vectors: np.ndarray, 
-                          sentences: List[str]) -> float:
+                          context: Dict[str, np.ndarray]) -> float:
         """
-        Calculate fitness of a candidate solution based on:
+        Calculate fitness of a candidate solution, see `_population_fitness`.
+        """
+        return float(self._population_fitness(np.atleast_2d(individual), context)[0])
+        
+    def _population_fitness(self, 
+                            population: np.ndarray, 
+                            context: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Calculate fitness of every candidate solution of a generation based on:
         1. Coverage: How well the selected sentences cover the main topics
         2. Diversity: Minimizing redundancy between selected sentences
         3. Importance: Prioritizing sentences with higher TF-IDF scores
         4. Position: Giving some weight to sentences appearing earlier
-        """
-        if np.sum(individual) == 0:
-            return 0.0  # No sentences selected
+        
+        Every term is computed for the whole population with matrix products
+        against the tables precomputed by `_precompute`.
+        
+        Args:
+            population: (population_size x n_sentences) selection matrix
+            context: Tables returned by `_precompute`
             
-        # Get indices of selected sentences
-        selected_indices = np.where(individual == 1)[0]
-        
-        # Calculate coverage score (similarity to the full document)
-        document_vector = np.mean(sentence_vectors.toarray(), axis=0).reshape(1, -1)
-        summary_vector = np.mean(sentence_vectors[selected_indices].toarray(), axis=0).reshape(1, -1)
-        coverage_score = cosine_similarity(document_vector, summary_vector)[0][0]
-        
-        # Calculate diversity score (penalize redundancy)
-        diversity_score = 0.0
-        if len(selected_indices) > 1:
-            similarities = []
-            for i in range(len(selected_indices)):
-                for j in range(i+1, len(selected_indices)):
-                    sim = cosine_similarity(
-                        sentence_vectors[selected_indices[i]].reshape(1, -1),
-                        sentence_vectors[selected_indices[j]].reshape(1, -1)
-                    )[0][0]
-                    similarities.append(sim)
-            diversity_score = 1.0 - (sum(similarities) / len(similarities) if similarities else 0)
-        
-        # Calculate importance score based on TF-IDF values
-        importance_score = np.mean([np.sum(sentence_vectors[i].toarray()) for i in selected_indices])
-        
-        # Position score (favor sentences that appear earlier)
-        position_scores = [1.0 - (idx / len(sentences)) for idx in selected_indices]
-        position_score = np.mean(position_scores)
+        Returns:
+            Fitness of each individual
+        """
+        selection = population.astype(np.float64)
+        n_selected = selection.sum(axis=1)
+        
+        # Calculate coverage score (similarity of the summary to the full document):
+        # the summary norm is the sum of the Gram block of the selected sentences
+        summary_norms = np.sqrt(np.maximum(((selection @ context['gram']) * selection).sum(axis=1), 0.0))
+        norms = context['doc_norm'] * summary_norms
+        coverage_scores = np.divide(
+            selection @ context['doc_dots'], norms, out=np.zeros(len(selection)), where=norms > 0
+        )
+        
+        # Calculate diversity score (penalize redundancy): mean pairwise similarity
+        pair_sums = (
+            ((selection @ context['similarities']) * selection).sum(axis=1)
+            - selection @ np.diag(context['similarities'])
+        )
+        n_pairs = n_selected * (n_selected - 1)
+        diversity_scores = np.where(
+            n_selected > 1, 1.0 - pair_sums / np.maximum(n_pairs, 1), 0.0
+        )
+        
+        # Calculate importance score based on TF-IDF values and position score
+        # (favor sentences that appear earlier)
+        counts = np.maximum(n_selected, 1)
+        importance_scores = (selection @ context['importances']) / counts
+        position_scores = (selection @ context['positions']) / counts
         
         # Combine scores with weights
-        final_score = (
-            0.4 * coverage_score + 
-            0.3 * diversity_score + 
-            0.2 * importance_score + 
-            0.1 * position_score
+        final_scores = (
+            0.4 * coverage_scores + 
+            0.3 * diversity_scores + 
+            0.2 * importance_scores + 
+            0.1 * position_scores
         )
         
-        return final_score
+        # No sentences selected
+        return np.where(n_selected > 0, final_scores, 0.0)
         
     def _tournament_selection(self, 
-                              population: List[np.ndarray], 
-                              fitness_scores: List[float], 
+                              population: np.ndarray, 
+                              fitness_scores: np.ndarray, 
+                              n_winners: int,
                               tournament_size: int = 3) -> np.ndarray:
-        """Select an individual using tournament selection."""
-        # Randomly select tournament_size individuals
-        tournament_indices = np.random.choice(len(population), tournament_size, replace=False)
-        tournament_fitness = [fitness_scores[i] for i in tournament_indices]
-        
-        # Return the winner (individual with highest fitness)
-        winner_idx = tournament_indices[np.argmax(tournament_fitness)]
-        return population[winner_idx].copy()
-        
-    def _crossover(self, parent1: np.ndarray, parent2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """Perform crossover between two parents to create two children."""
-        if np.random.random() > self.crossover_rate:
-            return parent1.copy(), parent2.copy()
+        """
+        Select individuals using tournament selection, running n_winners
+        tournaments at once.
+        
+        Returns:
+            (n_winners x n_sentences) selection matrix of the winners
+        """
+        # Randomly select tournament_size distinct individuals per tournament
+        tournament_size = min(tournament_size, len(population))
+        keys = np.random.random((n_winners, len(population)))
+        tournament_indices = np.argpartition(keys, tournament_size - 1, axis=1)[:, :tournament_size]
+        
+        # The winner is the individual with highest fitness of each tournament
+        winners = np.argmax(fitness_scores[tournament_indices], axis=1)
+        return population[tournament_indices[np.arange(n_winners), winners]]
+        
+    def _crossover(self, parents1: np.ndarray, parents2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Perform one-point crossover between pairs of parents (row by row) to
+        create two children per pair.
+        """
+        n_pairs, n = parents1.shape
+        if n < 2:
+            return parents1.copy(), parents2.copy()
             
-        n = len(parent1)
-        # One-point crossover
-        crossover_point = np.random.randint(1, n)
-        
-        child1 = np.concatenate([parent1[:crossover_point], parent2[crossover_point:]])
-        child2 = np.concatenate([parent2[:crossover_point], parent1[crossover_point:]])
-        
-        # Ensure each child has exactly summary_size 1's
-        for child in [child1, child2]:
-            ones_count = np.sum(child)
-            if ones_count > self.summary_size:
-                # Randomly remove 1's
-                ones_indices = np.where(child == 1)[0]
-                to_remove = np.random.choice(ones_indices, ones_count - self.summary_size, replace=False)
-                child[to_remove] = 0
-            elif ones_count < self.summary_size:
-                # Randomly add 1's
-                zeros_indices = np.where(child == 0)[0]
-                to_add = np.random.choice(zeros_indices, self.summary_size - ones_count, replace=False)
-                child[to_add] = 1
-                
-        return child1, child2
-        
-    def _mutate(self, individual: np.ndarray) -> np.ndarray:
-        """Apply mutation to an individual."""
-        n = len(individual)
-        for i in range(n):
-            if np.random.random() < self.mutation_rate:
-                # Flip a 0 to 1 and a 1 to 0 to maintain summary_size
-                if individual[i] == 1:
-                    zeros_indices = np.where(individual == 0)[0]
-                    if len(zeros_indices) > 0:
-                        j = np.random.choice(zeros_indices)
-                        individual[i] = 0
-                        individual[j] = 1
-                else:
-                    ones_indices = np.where(individual == 1)[0]
-                    if len(ones_indices) > 0:
-                        j = np.random.choice(ones_indices)
-                        individual[i] = 1
-                        individual[j] = 0
-        return individual
+        # Crossover point of each pair, pairs that do not cross keep both parents
+        crossover_points = np.random.randint(1, n, n_pairs)
+        crossover_points[np.random.random(n_pairs) > self.crossover_rate] = n
+        head = np.arange(n) < crossover_points[:, np.newaxis]
+        
+        children1 = np.where(head, parents1, parents2)
+        children2 = np.where(head, parents2, parents1)
+        
+        # Ensure each child has as many 1's as its parents
+        sizes = parents1.sum(axis=1)
+        return self._random_selection(children1, sizes), self._random_selection(children2, sizes)
+        
+    def _mutate(self, population: np.ndarray) -> np.ndarray:
+        """
+        Apply mutation to every individual of a population.
+        
+        Each gene mutates with probability mutation_rate; every mutation
+        swaps a selected sentence with an unselected one (so the summary size
+        is kept). The swapped sentences of each row are chosen at random.
+        """
+        n_swaps = (np.random.random(population.shape) < self.mutation_rate).sum(axis=1)
+        return self._swap(population, n_swaps)
+        
+    def _swap(self, population: np.ndarray, n_swaps: np.ndarray) -> np.ndarray:
+        """
+        Swap selected sentences with unselected ones in every row.
+        
+        Args:
+            population: (n_individuals x n_sentences) selection matrix
+            n_swaps: Number of swaps of each row (capped by the number of
+                selected and of unselected sentences)
+            
+        Returns:
+            Selection matrix with the same summary sizes
+        """
+        # Rank the selected (and the unselected) sentences of each row randomly
+        keys = np.random.random(population.shape)
+        rank_selected = np.argsort(np.argsort(np.where(population, keys, np.inf), axis=1), axis=1)
+        rank_unselected = np.argsort(np.argsort(np.where(population, np.inf, keys), axis=1), axis=1)
+        
+        n_selected = population.sum(axis=1)
+        n_swaps = np.minimum(n_swaps, np.minimum(n_selected, population.shape[1] - n_selected))[:, np.newaxis]
+        
+        removed = population & (rank_selected < n_swaps)
+        added = ~population & (rank_unselected < n_swaps)
+        return (population & ~removed) | added
         
     def summarize(self, text: str, max_summary_ratio: float = 0.3) -> str:
         """
@@ -195,74 +629,123 @@ class ExtractiveSummarizerGA:
         Returns:
             Extractive summary as a string
         """
+        start_time = time.perf_counter()
+        
         # Preprocess text
-        sentences = self._split_into_sentences(text)
+        entry = self._preprocess(text, vectorize=False)
+        sentences = entry['sentences']
         n_sentences = len(sentences)
         
         if n_sentences <= self.summary_size:
             return text  # Text is already short enough
             
         # Adjust summary size based on text length and max_summary_ratio
-        self.summary_size = min(
+        summary_size = min(
             self.summary_size,
             max(1, int(n_sentences * max_summary_ratio))
         )
         
-        # Create sentence vectors
-        sentence_vectors = self._create_sentence_vectors(sentences)
+        # Create sentence vectors and the fitness lookup tables
+        context = self._precompute(self._vectorize(entry))
         
         # Initialize population
-        population = self._initialize_population(n_sentences)
+        population = self._initialize_population(n_sentences, context, summary_size)
+        n_children = self.population_size - 1
+        n_pairs = (n_children + 1) // 2
         
         # Evolution process
+        best_fitness = -np.inf
+        stagnant = 0
+        self.generations_run = 0
         for generation in range(self.generations):
-            # Calculate fitness for each individual
-            fitness_scores = [
-                self._fitness_function(individual, sentence_vectors, sentences)
-                for individual in population
-            ]
+            # Calculate fitness for the whole population
+            fitness_scores = self._population_fitness(population, context)
             
-            # Keep track of the best individual
-            best_idx = np.argmax(fitness_scores)
-            best_individual = population[best_idx].copy()
-            best_fitness = fitness_scores[best_idx]
+            # Stop when the best fitness plateaus or the time budget is spent
+            if fitness_scores.max() > best_fitness + self.tol:
+                stagnant = 0
+            else:
+                stagnant += 1
+            best_fitness = max(best_fitness, fitness_scores.max())
+            if self.patience is not None and stagnant >= self.patience:
+                break
+            if self.time_budget is not None and time.perf_counter() - start_time >= self.time_budget:
+                break
+                
+            # Keep track of the best individual (elitism)
+            best_individual = population[np.argmax(fitness_scores)]
             
-            # Create new population
-            new_population = [best_individual]  # Elitism: keep the best individual
+            # Selection, crossover and mutation of the whole generation
+            parents = self._tournament_selection(population, fitness_scores, 2 * n_pairs)
+            children1, children2 = self._crossover(parents[:n_pairs], parents[n_pairs:])
+            children = self._mutate(np.vstack([children1, children2])[:n_children])
             
-            # Fill the rest of the population
-            while len(new_population) < self.population_size:
-                # Selection
-                parent1 = self._tournament_selection(population, fitness_scores)
-                parent2 = self._tournament_selection(population, fitness_scores)
-                
-                # Crossover
-                child1, child2 = self._crossover(parent1, parent2)
-                
-                # Mutation
-                child1 = self._mutate(child1)
-                child2 = self._mutate(child2)
-                
-                # Add to new population
-                new_population.append(child1)
-                if len(new_population) < self.population_size:
-                    new_population.append(child2)
-                    
             # Replace old population
-            population = new_population
+            population = np.vstack([best_individual[np.newaxis], children])
+            self.generations_run += 1
             
         # Get the best individual from the final population
-        final_fitness_scores = [
-            self._fitness_function(individual, sentence_vectors, sentences)
-            for individual in population
-        ]
-        best_idx = np.argmax(final_fitness_scores)
-        best_individual = population[best_idx]
+        final_fitness_scores = self._population_fitness(population, context)
+        best_individual = population[np.argmax(final_fitness_scores)]
         
         # Create summary
-        selected_indices = np.where(best_individual == 1)[0]
-        selected_indices.sort()  # Maintain original order
+        selected_indices = np.flatnonzero(best_individual)  # Maintain original order
         summary_sentences = [sentences[i] for i in selected_indices]
         summary = " ".join(summary_sentences)
         
         return summary
+        
+    def summarize_batch(self, 
+                        documents: Iterable[Tuple[Any, str]], 
+                        max_summary_ratio: float = 0.3,
+                        n_jobs: Optional[int] = None,
+                        random_state: Optional[int] = None) -> Iterator[Tuple[Any, str]]:
+        """
+        Summarize many documents (e.g. a day of the BOE diario, see
+        `iter_boe_documents`) in a process pool.
+        
+        Document i is summarized with the i-th seed spawned from random_state,
+        so the summaries do not depend on the number of workers or on the
+        scheduling. Results are yielded as soon as each document is done, and
+        only a bounded number of documents is in flight at a time.
+        
+        Args:
+            documents: Iterable of (document ID, text) tuples
+            max_summary_ratio: Maximum ratio of original text length for summary
+            n_jobs: Number of worker processes (None uses all cores, 1 runs
+                in this process)
+            random_state: Seed of the per-document seeds (None for random)
+            
+        Yields:
+            Tuples of (document ID, summary), in completion order
+        """
+        seeds = np.random.SeedSequence(random_state)
+        n_jobs = n_jobs or os.cpu_count() or 1
+        
+        if n_jobs == 1:
+            global_state = np.random.get_state()
+            try:
+                for doc_id, text in documents:
+                    np.random.seed(int(seeds.spawn(1)[0].generate_state(1)[0]))
+                    yield doc_id, self.summarize(text, max_summary_ratio)
+            finally:
+                np.random.set_state(global_state)
+            return
+            
+        documents = iter(documents)
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(self,)) as executor:
+            pending = {}
+            while True:
+                # Keep the workers busy without reading the whole input
+                for doc_id, text in documents:
+                    seed = int(seeds.spawn(1)[0].generate_state(1)[0])
+                    future = executor.submit(_summarize_document, text, seed, max_summary_ratio)
+                    pending[future] = doc_id
+                    if len(pending) >= 2 * n_jobs:
+                        break
+                if not pending:
+                    break
+                    
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
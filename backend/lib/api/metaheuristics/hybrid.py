@@ -0,0 +1,195 @@
+"""
+Hybrid BM25 + LSI retrieval for legal document search.
+This module combines lexical candidate generation with BM25 and semantic
+re-ranking with LSI: only the BM25 candidates of a query are compared in the
+LSI space, and both rankings are merged with reciprocal rank fusion or a
+weighted sum of scores.
+"""
+
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence
+from scipy.stats import rankdata
+from backend.lib.api.metaheuristics.bm25 import BM25Retrieval
+from backend.lib.api.metaheuristics.lsi import LSIModel
+
+
+class HybridRetrieval:
+    def __init__(self,
+                 bm25: Optional[BM25Retrieval] = None,
+                 lsi: Optional[LSIModel] = None,
+                 n_candidates: int = 100,
+                 fusion: str = 'rrf',
+                 rrf_k: int = 60,
+                 alpha: float = 0.5):
+        """
+        Initialize hybrid retrieval.
+        
+        Args:
+            bm25: BM25 model (fitted or not) generating the candidates
+            lsi: LSI model (fitted or not) re-ranking the candidates; both
+                models must index the same documents with the same IDs
+            n_candidates: Number of BM25 candidates re-ranked per query
+            fusion: 'rrf' (reciprocal rank fusion) or 'weighted' (weighted
+                sum of min-max normalized BM25 and cosine similarity)
+            rrf_k: Rank offset of reciprocal rank fusion
+            alpha: Weight of BM25 in weighted fusion (1 - alpha for LSI)
+        """
+        if fusion not in ('rrf', 'weighted'):
+            raise ValueError(f"Unknown fusion method: {fusion}")
+        self.bm25 = bm25 or BM25Retrieval()
+        self.lsi = lsi or LSIModel()
+        self.n_candidates = n_candidates
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.alpha = alpha
+        
+    def fit(self,
+            corpus: List[str],
+            document_store: Optional[Sequence[str]] = None,
+            min_df: int = 2,
+            max_df: float = 0.95):
+        """
+        Fit both models on a corpus tokenized once.
+        
+        The BM25 tokenizer output is shared: BM25 indexes the terms directly
+        and LSI builds its TF-IDF matrix from the same terms.
+        
+        Args:
+            corpus: List of document texts
+            document_store: Optional source of raw texts for snippets
+            min_df: Minimum document frequency for LSI terms
+            max_df: Maximum document frequency for LSI terms
+        """
+        tokenized = [self.bm25._preprocess(text) for text in corpus]
+        self.bm25.fit(tokenized, use_preprocessor=False, document_store=document_store)
+        self.lsi.fit(tokenized, min_df=min_df, max_df=max_df)
+        self.lsi.corpus = None
+        return self
+        
+    def _fuse(self, bm25_scores: np.ndarray, lsi_scores: np.ndarray) -> np.ndarray:
+        """
+        Fuse the BM25 and LSI scores of a list of candidates.
+        
+        Args:
+            bm25_scores: BM25 score of each candidate
+            lsi_scores: LSI cosine similarity of each candidate
+            
+        Returns:
+            Fused score of each candidate
+        """
+        if self.fusion == 'rrf':
+            # Tied scores share the best rank
+            return sum(
+                1.0 / (self.rrf_k + rankdata(-scores, method='min'))
+                for scores in (bm25_scores, lsi_scores)
+            )
+            
+        low, high = bm25_scores.min(), bm25_scores.max()
+        normalized = (bm25_scores - low) / (high - low) if high > low else np.ones(len(bm25_scores))
+        return self.alpha * normalized + (1.0 - self.alpha) * lsi_scores
+        
+    def _rerank(self,
+                candidates: List[Dict[str, Any]],
+                query_lsi: np.ndarray,
+                terms: List[str],
+                top_k: int,
+                with_snippets: bool) -> List[Dict[str, Any]]:
+        """
+        Re-rank the BM25 candidates of one query with LSI.
+        
+        Args:
+            candidates: BM25 results of the query
+            query_lsi: Query vector in the LSI space
+            terms: Query terms, for snippets
+            top_k: Number of results to return
+            with_snippets: Whether to fetch a snippet for each result
+            
+        Returns:
+            List of dictionaries with document ID, fused score, BM25 score,
+            LSI score and optional snippet
+        """
+        # Zero-score candidates only pad the BM25 ranking; sorting by ID makes
+        # ties independent of the candidate order
+        candidates = sorted(
+            (candidate for candidate in candidates if candidate['score'] > 0),
+            key=lambda candidate: candidate['id']
+        )
+        if not candidates:
+            return []
+            
+        doc_ids = np.array([candidate['id'] for candidate in candidates])
+        bm25_scores = np.array([candidate['score'] for candidate in candidates])
+        lsi_scores = self.lsi._document_vectors(doc_ids) @ query_lsi.astype(np.float32)
+        
+        fused = self._fuse(bm25_scores, lsi_scores.astype(np.float64))
+        order = self.bm25._top_k(fused, top_k)
+        
+        results = self.bm25._format_results(doc_ids[order], fused[order], terms if with_snippets else None)
+        for result, idx in zip(results, order):
+            result['bm25_score'] = float(bm25_scores[idx])
+            result['lsi_score'] = float(lsi_scores[idx])
+        return results
+        
+    def search(self,
+              query: str,
+              top_k: int = 10,
+              with_snippets: bool = True) -> List[Dict[str, Any]]:
+        """
+        Search with BM25 candidate generation and LSI re-ranking.
+        
+        Args:
+            query: Search query
+            top_k: Number of top results to return
+            with_snippets: Whether to fetch a snippet for each result (only
+                when the BM25 model has a document store)
+                
+        Returns:
+            List of dictionaries with document ID, fused score, BM25 score,
+            LSI score and optional snippet. Documents without any query term
+            are not returned
+        """
+        if self.bm25.impacts is None or self.lsi.lsi is None:
+            raise ValueError("Models must be fit before searching")
+            
+        # Tokenize once for both models
+        terms = self.bm25._terms(query, True)
+        query = ' '.join(terms)
+        
+        candidates = self.bm25.search(
+            query, max(self.n_candidates, top_k), use_preprocessor=False, with_snippets=False
+        )
+        query_lsi = self.lsi.transform([query])[0]
+        return self._rerank(candidates, query_lsi, terms, top_k, with_snippets)
+        
+    def batch_search(self,
+                    queries: List[str],
+                    top_k: int = 10,
+                    with_snippets: bool = True) -> List[List[Dict[str, Any]]]:
+        """
+        Perform hybrid search with multiple queries, generating the candidates
+        with one batched BM25 search and projecting the queries together.
+        
+        Args:
+            queries: List of search queries
+            top_k: Number of top results to return per query
+            with_snippets: Whether to fetch a snippet for each result
+            
+        Returns:
+            List of results for each query, see `search`
+        """
+        if self.bm25.impacts is None or self.lsi.lsi is None:
+            raise ValueError("Models must be fit before searching")
+        if not queries:
+            return []
+            
+        terms = [self.bm25._terms(query, True) for query in queries]
+        queries = [' '.join(query_terms) for query_terms in terms]
+        
+        candidates = self.bm25.batch_search(
+            queries, max(self.n_candidates, top_k), use_preprocessor=False, with_snippets=False
+        )
+        queries_lsi = self.lsi.transform(queries)
+        return [
+            self._rerank(query_candidates, query_lsi, query_terms, top_k, with_snippets)
+            for query_candidates, query_lsi, query_terms in zip(candidates, queries_lsi, terms)
+        ]
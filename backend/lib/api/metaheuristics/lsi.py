@@ -5,22 +5,86 @@ in legal text corpora, particularly for the BOE legal documents.
 """
 
 import numpy as np
-from typing import List, Dict, Tuple, Any, Union
-from sklearn.feature_extraction.text import TfidfVectorizer
+import json
+import hashlib
+import tempfile
+from typing import List, Dict, Tuple, Any, Union, Optional, Iterable, Iterator
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, CountVectorizer, TfidfTransformer
 from sklearn.decomposition import TruncatedSVD
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import Normalizer
-from sklearn.metrics.pairwise import cosine_similarity
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+from sklearn.preprocessing import Normalizer, normalize
+from sklearn.utils import murmurhash3_32
 import os
+from backend.lib.api.metaheuristics.ann import ExactIndex, top_k_rows
+from backend.lib.api.metaheuristics.bm25 import boe_fields_from_xml, _save_array, _write_strings, _StringTable
+from backend.lib.language.stop_words import resolve_stop_words
+
+MODEL_FORMAT_VERSION = 1
+
+# Default directory of the rendered topic images, see LSIModel.render_topic_images
+TOPIC_IMAGE_CACHE = os.path.join(tempfile.gettempdir(), 'lsi_topic_images')
+
+
+def _render_topic_cloud(topic_terms: List[Tuple[str, float]], n_top_terms: int, path: str) -> str:
+    """
+    Render the word cloud of one topic to a PNG file (runs in a worker process).
+    
+    Args:
+        topic_terms: (term, weight) tuples of the topic
+        n_top_terms: Maximum number of words in the cloud
+        path: Output image path
+        
+    Returns:
+        Output image path
+    """
+    from wordcloud import WordCloud
+    
+    # Create word cloud data
+    word_cloud_data = {term: abs(weight) for term, weight in topic_terms if term}
+    
+    # Write to a temporary file first so readers never see partial images
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    WordCloud(
+        background_color='white',
+        width=400,
+        height=400,
+        colormap='viridis',
+        max_words=n_top_terms
+    ).generate_from_frequencies(word_cloud_data).to_image().save(tmp_path, format='PNG')
+    os.replace(tmp_path, path)
+    return path
+
+
+def iter_boe_texts(diario_dir: str) -> Iterator[str]:
+    """
+    Stream the texts of the BOE diario XML documents, in date order.
+    
+    Args:
+        diario_dir: Base directory of the diario ({year}/{date}/xml/{id}.xml)
+        
+    Yields:
+        Text of each document (all its fields joined)
+    """
+    for dirpath, dirnames, filenames in os.walk(diario_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.xml'):
+                fields = boe_fields_from_xml(os.path.join(dirpath, filename))
+                yield '\n'.join(text for text in fields.values() if text)
+
 
 class LSIModel:
     def __init__(self, 
                  n_components: int = 100,
                  random_state: int = 42,
                  use_idf: bool = True,
-                 stop_words: Union[str, List[str]] = 'spanish'):
+                 stop_words: Union[str, List[str]] = 'spanish',
+                 ann_index: Optional[ExactIndex] = None,
+                 quantize: bool = False,
+                 topic_postings_size: int = 100):
         """
         Initialize LSI model.
         
@@ -29,6 +93,13 @@ class LSIModel:
             random_state: Random seed for reproducibility
             use_idf: Whether to use inverse document frequency weighting
             stop_words: Stop words to exclude ('spanish' or custom list)
+            ann_index: Optional nearest-neighbor index (e.g. IVFFlatIndex)
+                built on the document vectors after fitting and used by
+                search and find_similar_documents
+            quantize: Whether to store the document vectors as int8 (with one
+                float32 scale per document) instead of float32
+            topic_postings_size: Number of strongest documents kept per topic
+                for topic browsing and topic-filtered search
         """
         self.n_components = n_components
         self.random_state = random_state
@@ -36,10 +107,23 @@ class LSIModel:
         self.stop_words = stop_words
         self.vectorizer = None
         self.svd = None
+        self.quantize = quantize
+        self.topic_postings_size = topic_postings_size
+        self.topic_doc_ids = None
+        self.topic_doc_weights = None
         self.lsi = None
+        self.lsi_scales = None
         self.corpus = None
         self.pipeline = None
         self.feature_names = None
+        self.ann_index = ann_index
+        self._fingerprint = None
+        
+        # State of the streaming fit (see fit_stream)
+        self.n_features = None
+        self._stream_n_docs = 0
+        self._stream_doc_freqs = None
+        self._stream_norm = 0.0
         
     def fit(self, corpus: List[str], min_df: int = 2, max_df: float = 0.95):
         """
@@ -50,13 +134,20 @@ class LSIModel:
             min_df: Minimum document frequency for terms
             max_df: Maximum document frequency for terms
         """
-        self.corpus = corpus
+        # Own copy, extended in place by add_documents
+        self.corpus = list(corpus)
+        
+        # A batch fit replaces any streaming fit
+        self.n_features = None
+        self._stream_n_docs = 0
+        self._stream_doc_freqs = None
+        self._stream_norm = 0.0
         
         # Create TF-IDF vectorizer
         self.vectorizer = TfidfVectorizer(
             min_df=min_df,
             max_df=max_df,
-            stop_words=self.stop_words,
+            stop_words=resolve_stop_words(self.stop_words),
             use_idf=self.use_idf
         )
         
@@ -74,13 +165,458 @@ class LSIModel:
         ])
         
         # Fit pipeline on corpus
-        self.lsi = self.pipeline.fit_transform(corpus)
+        self._store_vectors(self.pipeline.fit_transform(corpus))
         
         # Get feature names for later analysis
         self.feature_names = self.vectorizer.get_feature_names_out()
+        self._fingerprint = None
+        
+        self._build_topic_postings()
+        if self.ann_index is not None:
+            self.ann_index.build(self.lsi, self.lsi_scales)
+        
+        return self
+    
+    def _build_topic_postings(self):
+        """
+        Precompute, for every topic, its strongest documents (highest
+        absolute weight) sorted by decreasing strength.
+        """
+        vectors = self._document_vectors()
+        top_indices = top_k_rows(np.abs(vectors.T), self.topic_postings_size)
+        self.topic_doc_ids = top_indices
+        self.topic_doc_weights = np.take_along_axis(vectors.T, top_indices, axis=1)
+    
+    def _store_vectors(self, vectors: np.ndarray, append: bool = False):
+        """
+        Store L2-normalized document vectors in their compact form.
+        
+        Vectors are kept as float32, or as int8 codes with one scale per
+        document (max |weight| / 127) when the model quantizes them.
+        
+        Args:
+            vectors: Document vectors in the LSI space
+            append: Whether to append them to the stored vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = None
+        if self.quantize:
+            scales = np.abs(vectors).max(axis=1, initial=0.0) / 127.0
+            scales[scales == 0] = 1.0
+            vectors = np.rint(vectors / scales[:, np.newaxis]).astype(np.int8)
+            
+        if append and self.lsi is not None:
+            vectors = np.concatenate([self.lsi, vectors])
+            if self.quantize:
+                scales = np.concatenate([self.lsi_scales, scales])
+        self.lsi = vectors
+        self.lsi_scales = scales
+    
+    def _document_vectors(self, doc_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Get (dequantized) float32 document vectors.
+        
+        Args:
+            doc_ids: Documents to get, None for all of them
+            
+        Returns:
+            Matrix with one row per document
+        """
+        vectors = self.lsi if doc_ids is None else self.lsi[doc_ids]
+        if not self.quantize:
+            return vectors
+        scales = self.lsi_scales if doc_ids is None else self.lsi_scales[doc_ids]
+        return vectors.astype(np.float32) * scales[:, np.newaxis]
+    
+    def _similarities(self, vectors: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """
+        Cosine similarity of query vectors with every document.
+        
+        Both sides are already L2-normalized, so this is a single float32
+        matrix product. Quantized vectors are decoded `chunk_size` documents
+        at a time.
+        
+        Args:
+            vectors: (n_queries x n_components) query vectors
+            chunk_size: Number of documents decoded at a time (int8 only)
+            
+        Returns:
+            (n_queries x n_docs) similarity matrix
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not self.quantize:
+            return vectors @ self.lsi.T
+        similarities = np.empty((len(vectors), len(self.lsi)), dtype=np.float32)
+        for start in range(0, len(self.lsi), chunk_size):
+            codes = self.lsi[start:start + chunk_size].astype(np.float32)
+            similarities[:, start:start + chunk_size] = (
+                (vectors @ codes.T) * self.lsi_scales[start:start + chunk_size]
+            )
+        return similarities
+    
+    def build_index(self, ann_index: ExactIndex):
+        """
+        Build a nearest-neighbor index on the fitted document vectors.
+        
+        Args:
+            ann_index: Index to build (e.g. IVFFlatIndex(n_probe=16))
+        """
+        if self.lsi is None:
+            raise ValueError("Model must be fit before building an index")
+        self.ann_index = ann_index.build(self.lsi, self.lsi_scales)
+        return self
+    
+    def _nearest(self, 
+                 vectors: np.ndarray, 
+                 top_k: int, 
+                 exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the documents most similar to some vectors in the LSI space.
+        
+        Args:
+            vectors: (n_queries x n_components) query vectors
+            top_k: Number of documents per vector
+            exact: Whether to bypass the nearest-neighbor index
+            
+        Returns:
+            Tuple of (document IDs, similarities), both (n_queries x top_k)
+            and sorted by decreasing similarity
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.ann_index is not None and not exact:
+            return self.ann_index.search(vectors, top_k)
+            
+        # Calculate similarity with each document and keep the top_k
+        similarities = self._similarities(vectors)
+        top_indices = top_k_rows(similarities, top_k)
+        return top_indices, np.take_along_axis(similarities, top_indices, axis=1)
+    
+    def fit_stream(self, 
+                   documents: Iterable[str], 
+                   batch_size: int = 1000,
+                   vocabulary: Optional[Union[Dict[str, int], List[str]]] = None,
+                   n_features: int = 2 ** 18):
+        """
+        Fit the LSI model on a stream of documents in bounded memory.
+        
+        Documents are consumed `batch_size` at a time (e.g. from
+        `iter_boe_texts`) and never kept. Terms are mapped to columns through
+        a fixed `vocabulary` or, by default, by feature hashing, and the
+        decomposition is updated incrementally with each batch (see
+        `partial_fit`). Memory is bounded by the (n_components x n_features)
+        components and one batch, independently of the corpus size.
+        
+        The document vectors are not stored: index the documents to search
+        with `add_documents` (e.g. a second pass over the stream).
+        
+        Args:
+            documents: Iterable of document texts
+            batch_size: Number of documents per incremental update
+            vocabulary: Fixed term -> column mapping (or list of terms)
+            n_features: Number of hashed features when no vocabulary is given
+        """
+        if vocabulary is not None:
+            self.vectorizer = CountVectorizer(vocabulary=vocabulary, stop_words=resolve_stop_words(self.stop_words))
+            self.feature_names = self.vectorizer.get_feature_names_out()
+        else:
+            self.vectorizer = HashingVectorizer(
+                n_features=n_features,
+                stop_words=resolve_stop_words(self.stop_words),
+                alternate_sign=False,
+                norm=None
+            )
+            self.feature_names = np.full(n_features, '', dtype=object)
+        self.n_features = len(self.feature_names)
+        
+        self.svd = None
+        self.lsi = None
+        self.lsi_scales = None
+        self.topic_doc_ids = None
+        self.topic_doc_weights = None
+        self.corpus = None
+        self._stream_n_docs = 0
+        self._stream_doc_freqs = np.zeros(self.n_features, dtype=np.int64)
+        self._stream_norm = 0.0
+        
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, batch_size))
+            if not batch:
+                break
+            self.partial_fit(batch)
+            
+        if self.svd is None:
+            raise ValueError("Cannot fit on an empty corpus")
+        return self
+    
+    def partial_fit(self, documents: List[str]):
+        """
+        Fold a batch of documents into a streaming fit.
+        
+        The TF-IDF rows of the batch are weighted with the IDF of all the
+        documents seen so far, and the truncated SVD is updated with them
+        (incremental SVD): the top singular vectors of the stacked matrix
+        [diag(S) V; X_batch] are obtained from the eigendecomposition of its
+        small Gram matrix. New days of the BOE can be folded in the same way.
+        
+        Args:
+            documents: Batch of document texts
+        """
+        if self._stream_doc_freqs is None:
+            raise ValueError("Start a streaming fit with fit_stream")
+        counts = self.vectorizer.transform(documents).tocsr()
+        
+        # Document frequencies and IDF of everything seen so far
+        self._stream_n_docs += counts.shape[0]
+        self._stream_doc_freqs += np.bincount(counts.indices, minlength=self.n_features)
+        if self.use_idf:
+            idf = np.log((1 + self._stream_n_docs) / (1 + self._stream_doc_freqs)) + 1
+        else:
+            idf = np.ones(self.n_features)
+        if isinstance(self.vectorizer, HashingVectorizer):
+            self._record_feature_names(documents)
+        
+        X = normalize(counts.multiply(idf).tocsr())
+        self._stream_norm += X.multiply(X).sum()
+        
+        # Rows of the current decomposition, diag(S) V
+        n_components = self.n_components
+        if self.svd is None:
+            singular_values = np.zeros(0)
+            previous = np.zeros((0, self.n_features), dtype=np.float32)
+        else:
+            singular_values = self.svd.singular_values_
+            previous = singular_values[:, np.newaxis] * self.svd.components_
+            
+        # Gram matrix of [diag(S) V; X] (the rows of V are orthonormal)
+        cross = (X @ previous.T).T
+        gram = np.block([
+            [np.diag(singular_values ** 2), cross],
+            [cross.T, (X @ X.T).toarray()]
+        ])
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        top = np.argsort(-eigenvalues)[:n_components]
+        top = top[eigenvalues[top] > 1e-10]
+        singular_values = np.sqrt(eigenvalues[top])
+        left = eigenvectors[:, top]
         
+        # V' = diag(1/S') U'^T [diag(S) V; X]
+        n_previous = len(previous)
+        components = left[:n_previous].T @ previous + np.asarray((X.T @ left[n_previous:]).T)
+        components = (components / singular_values[:, np.newaxis]).astype(np.float32)
+        
+        self._set_stream_pipeline(idf, components, singular_values)
         return self
     
+    def _record_feature_names(self, documents: List[str]):
+        """
+        Remember a term for each hashed feature so topics can be displayed.
+        """
+        analyzer = self.vectorizer.build_analyzer()
+        terms = set()
+        for document in documents:
+            terms.update(analyzer(document))
+        for term in terms:
+            column = abs(murmurhash3_32(term, seed=0)) % self.n_features
+            if not self.feature_names[column]:
+                self.feature_names[column] = term
+    
+    def _set_stream_pipeline(self, 
+                             idf: Optional[np.ndarray], 
+                             components: np.ndarray, 
+                             singular_values: np.ndarray,
+                             explained_variance_ratio: Optional[np.ndarray] = None):
+        """
+        Expose the state of a streaming fit (or of a loaded model) through
+        the usual pipeline.
+        """
+        if explained_variance_ratio is None:
+            explained_variance_ratio = singular_values ** 2 / self._stream_norm
+        self._fingerprint = None
+        self.svd = TruncatedSVD(n_components=len(components), random_state=self.random_state)
+        self.svd.components_ = components
+        self.svd.singular_values_ = singular_values
+        self.svd.explained_variance_ratio_ = explained_variance_ratio
+        self.svd.n_features_in_ = self.n_features
+        
+        tfidf = TfidfTransformer(use_idf=self.use_idf)
+        tfidf.fit(sparse.csr_matrix((1, self.n_features)))
+        if self.use_idf:
+            tfidf.idf_ = idf
+        
+        self.pipeline = Pipeline([
+            ('vectorizer', self.vectorizer),
+            ('tfidf', tfidf),
+            ('svd', self.svd),
+            ('normalizer', Normalizer(copy=False).fit(np.zeros((1, len(components)))))
+        ])
+    
+    def add_documents(self, documents: Iterable[str], batch_size: int = 1000) -> np.ndarray:
+        """
+        Project documents with the current model and append them to the
+        searchable document vectors (the nearest-neighbor index is rebuilt).
+        
+        Args:
+            documents: Iterable of document texts
+            batch_size: Number of documents projected at a time
+            
+        Returns:
+            IDs assigned to the new documents
+        """
+        if self.pipeline is None:
+            raise ValueError("Model must be fit before adding documents")
+        n_before = 0 if self.lsi is None else len(self.lsi)
+        
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, batch_size))
+            if not batch:
+                break
+            self._store_vectors(self.pipeline.transform(batch), append=True)
+            if self.corpus is not None:
+                self.corpus.extend(batch)
+        if self.lsi is None:
+            self._store_vectors(np.zeros((0, self.svd.components_.shape[0])))
+        
+        self._build_topic_postings()
+        if self.ann_index is not None and len(self.lsi):
+            self.ann_index.build(self.lsi, self.lsi_scales)
+        return np.arange(n_before, len(self.lsi))
+    
+    def save(self, path: str):
+        """
+        Save the fitted model to a directory.
+        
+        The projection (IDF, SVD components) and the document vectors are
+        written as separate .npy files so `load` can memory-map them; the
+        vocabulary is written as a UTF-8 blob with an offset table. Document
+        texts and the nearest-neighbor index are not saved. Files are replaced
+        rather than overwritten, so a model loaded from `path` can be saved
+        back to it.
+        
+        Args:
+            path: Output directory (created if needed)
+        """
+        if self.svd is None:
+            raise ValueError("Model must be fit before saving")
+        os.makedirs(path, exist_ok=True)
+        
+        if isinstance(self.vectorizer, HashingVectorizer):
+            vectorizer, idf = 'hashing', self.pipeline.named_steps['tfidf']
+        elif isinstance(self.vectorizer, TfidfVectorizer):
+            vectorizer, idf = 'vocabulary', self.vectorizer
+        else:
+            vectorizer, idf = 'vocabulary', self.pipeline.named_steps['tfidf']
+        
+        arrays = {
+            'components': self.svd.components_,
+            'singular_values': self.svd.singular_values_,
+            'explained_variance_ratio': self.svd.explained_variance_ratio_,
+            'lsi': self.lsi if self.lsi is not None else np.zeros((0, len(self.svd.components_)), np.float32),
+        }
+        if self.use_idf:
+            arrays['idf'] = idf.idf_
+        if self.quantize:
+            arrays['lsi_scales'] = self.lsi_scales if self.lsi_scales is not None else np.zeros(0, np.float32)
+        if self._stream_doc_freqs is not None:
+            arrays['stream_doc_freqs'] = self._stream_doc_freqs
+        if self.topic_doc_ids is not None:
+            arrays['topic_doc_ids'] = self.topic_doc_ids
+            arrays['topic_doc_weights'] = self.topic_doc_weights
+        for name, array in arrays.items():
+            _save_array(path, name, array)
+            
+        # Feature names in column order (hashed columns without a known term are empty)
+        _write_strings(path, 'features', [str(name) for name in self.feature_names])
+        
+        meta = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'n_components': self.n_components,
+            'random_state': self.random_state,
+            'use_idf': self.use_idf,
+            'stop_words': self.stop_words,
+            'quantize': self.quantize,
+            'topic_postings_size': self.topic_postings_size,
+            'vectorizer': vectorizer,
+            'n_features': len(self.feature_names),
+            'stream_n_docs': self._stream_n_docs,
+            'stream_norm': float(self._stream_norm),
+        }
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+    
+    @classmethod
+    def load(cls, 
+             path: str, 
+             mmap: bool = True,
+             corpus: Optional[List[str]] = None) -> 'LSIModel':
+        """
+        Load a model written by `save`.
+        
+        With mmap=True the components and document vectors are memory-mapped
+        read-only, so loading is almost instant and worker processes share
+        the same pages.
+        
+        Args:
+            path: Directory written by `save`
+            mmap: Whether to memory-map the arrays instead of reading them
+            corpus: Optional document texts to include in the results
+            
+        Returns:
+            Loaded model, ready to search
+        """
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['format_version'] != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported LSI model format: {meta['format_version']}")
+            
+        def load_array(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+            
+        model = cls(
+            n_components=meta['n_components'],
+            random_state=meta['random_state'],
+            use_idf=meta['use_idf'],
+            stop_words=meta['stop_words'],
+            quantize=meta['quantize'],
+            topic_postings_size=meta['topic_postings_size']
+        )
+        feature_names = list(_StringTable(path, 'features', mmap))
+        model.n_features = meta['n_features']
+        if meta['vectorizer'] == 'hashing':
+            model.vectorizer = HashingVectorizer(
+                n_features=model.n_features,
+                stop_words=resolve_stop_words(model.stop_words),
+                alternate_sign=False,
+                norm=None
+            )
+        else:
+            model.vectorizer = CountVectorizer(
+                vocabulary={term: column for column, term in enumerate(feature_names)},
+                stop_words=resolve_stop_words(model.stop_words)
+            )
+        model.feature_names = np.array(feature_names, dtype=object)
+        
+        if os.path.exists(os.path.join(path, 'stream_doc_freqs.npy')):
+            model._stream_doc_freqs = np.load(os.path.join(path, 'stream_doc_freqs.npy'))
+        model._stream_n_docs = meta['stream_n_docs']
+        model._stream_norm = meta['stream_norm']
+        
+        model._set_stream_pipeline(
+            load_array('idf') if model.use_idf else None,
+            load_array('components'),
+            load_array('singular_values'),
+            load_array('explained_variance_ratio')
+        )
+        model.lsi = load_array('lsi')
+        if model.quantize:
+            model.lsi_scales = load_array('lsi_scales')
+        if os.path.exists(os.path.join(path, 'topic_doc_ids.npy')):
+            model.topic_doc_ids = load_array('topic_doc_ids')
+            model.topic_doc_weights = load_array('topic_doc_weights')
+        model.corpus = list(corpus) if corpus is not None else None
+        return model
+    
     def transform(self, documents: List[str]) -> np.ndarray:
         """
         Transform new documents into the LSI space.
@@ -109,33 +645,54 @@ class LSIModel:
         # Get term-topic matrix
         term_topic_matrix = self.svd.components_
         
+        # Get indices of top terms for every topic at once
+        top_term_indices = top_k_rows(np.abs(term_topic_matrix), n_top_terms)
+        
         topics = []
-        for topic_idx, topic in enumerate(term_topic_matrix):
-            # Get indices of top terms for this topic
-            top_term_indices = np.argsort(-np.abs(topic))[:n_top_terms]
-            
+        for topic, topic_term_indices in zip(term_topic_matrix, top_term_indices):
             # Get terms and their weights
             topic_terms = [
                 (self.feature_names[i], float(topic[i]))
-                for i in top_term_indices
+                for i in topic_term_indices
             ]
             
             topics.append(topic_terms)
             
         return topics
     
+    def fingerprint(self) -> str:
+        """
+        Get a hash identifying the fitted topics (components and vocabulary),
+        used to key cached artifacts such as the topic images.
+        
+        Returns:
+            Hex digest of the model
+        """
+        if self.svd is None:
+            raise ValueError("Model must be fit before fingerprinting")
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            digest.update(np.ascontiguousarray(self.svd.components_).tobytes())
+            digest.update('\n'.join(str(name) for name in self.feature_names).encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+    
     def search(self, 
               query: str, 
-              top_k: int = 10) -> List[Dict[str, Any]]:
+              top_k: int = 10,
+              exact: bool = False) -> List[Dict[str, Any]]:
         """
         Search the corpus using LSI semantic similarity.
         
         Args:
             query: Search query
             top_k: Number of top results to return
+            exact: Whether to compare the query with every document even if a
+                nearest-neighbor index is attached
             
         Returns:
-            List of dictionaries with document ID, text, and similarity score
+            List of dictionaries with document ID, similarity score and text
+            (when the corpus was fitted in memory)
         """
         if self.lsi is None:
             raise ValueError("Model must be fit before searching")
@@ -143,61 +700,101 @@ class LSIModel:
         # Transform query to LSI space
         query_lsi = self.pipeline.transform([query])
         
-        # Calculate similarity with each document
-        similarities = cosine_similarity(query_lsi, self.lsi)[0]
+        top_indices, similarities = self._nearest(query_lsi, top_k, exact)
+        
+        return self._format_results(top_indices[0], similarities[0])
+    
+    def batch_search(self, 
+                     queries: List[str], 
+                     top_k: int = 10,
+                     exact: bool = False,
+                     chunk_size: int = 1024) -> List[List[Dict[str, Any]]]:
+        """
+        Search the corpus with many queries at once.
+        
+        Queries are projected together and scored `chunk_size` at a time with
+        one matrix product against the document vectors (or one batched
+        nearest-neighbor index lookup).
         
-        # Get top_k documents
-        top_indices = np.argsort(-similarities)[:top_k]
+        Args:
+            queries: Search queries
+            top_k: Number of top results to return per query
+            exact: Whether to compare the queries with every document even if
+                a nearest-neighbor index is attached
+            chunk_size: Number of queries scored per matrix product, bounds
+                the size of the intermediate query x document matrix
+            
+        Returns:
+            List of results for each query, see `search`
+        """
+        if self.lsi is None:
+            raise ValueError("Model must be fit before searching")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+            
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            query_lsi = self.pipeline.transform(queries[start:start + chunk_size])
+            top_indices, similarities = self._nearest(query_lsi, top_k, exact)
+            results.extend(
+                self._format_results(doc_ids, scores)
+                for doc_ids, scores in zip(top_indices, similarities)
+            )
+        return results
+    
+    def _format_results(self, doc_ids: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Build the result dictionaries for a ranked list of documents.
         
-        # Prepare results
+        Args:
+            doc_ids: Ranked document IDs
+            scores: Similarity of each ranked document
+            
+        Returns:
+            List of dictionaries with document ID, similarity score and text
+            (when the corpus was fitted in memory)
+        """
         results = []
-        for idx in top_indices:
-            results.append({
+        for idx, score in zip(doc_ids, scores):
+            result = {
                 'id': int(idx),
-                'score': float(similarities[idx]),
-                'text': self.corpus[idx]
-            })
+                'score': float(score)
+            }
+            if self.corpus is not None:
+                result['text'] = self.corpus[idx]
+            results.append(result)
             
         return results
     
     def find_similar_documents(self, 
                              doc_id: int, 
-                             top_k: int = 5) -> List[Dict[str, Any]]:
+                             top_k: int = 5,
+                             exact: bool = False) -> List[Dict[str, Any]]:
         """
         Find documents similar to a given document.
         
         Args:
             doc_id: ID of the document to find similar documents to
             top_k: Number of similar documents to return
+            exact: Whether to compare with every document even if a
+                nearest-neighbor index is attached
             
         Returns:
-            List of dictionaries with document ID, text, and similarity score
+            List of dictionaries with document ID, similarity score and text
+            (when the corpus was fitted in memory)
         """
         if self.lsi is None or doc_id >= len(self.lsi):
             raise ValueError("Invalid document ID or model not fit")
             
         # Get document vector in LSI space
-        doc_lsi = self.lsi[doc_id].reshape(1, -1)
-        
-        # Calculate similarity with all documents
-        similarities = cosine_similarity(doc_lsi, self.lsi)[0]
+        doc_lsi = self._document_vectors(np.array([doc_id]))
         
         # Get top_k+1 documents (including the query document)
-        top_indices = np.argsort(-similarities)[:top_k+1]
+        top_indices, similarities = self._nearest(doc_lsi, top_k + 1, exact)
         
         # Remove the query document itself
-        top_indices = top_indices[top_indices != doc_id][:top_k]
-        
-        # Prepare results
-        results = []
-        for idx in top_indices:
-            results.append({
-                'id': int(idx),
-                'score': float(similarities[idx]),
-                'text': self.corpus[idx]
-            })
-            
-        return results
+        keep = top_indices[0] != doc_id
+        return self._format_results(top_indices[0][keep][:top_k], similarities[0][keep][:top_k])
     
     def get_document_topics(self, 
                          doc_id: int, 
@@ -216,16 +813,87 @@ class LSIModel:
             raise ValueError("Invalid document ID or model not fit")
             
         # Get document vector in LSI space
-        doc_vector = self.lsi[doc_id]
+        doc_vector = self._document_vectors(np.array([doc_id]))[0]
         
-        # Get topics above threshold
-        topic_weights = [(i, abs(weight)) for i, weight in enumerate(doc_vector)]
-        significant_topics = [t for t in topic_weights if t[1] >= threshold]
+        return self._significant_topics(doc_vector, threshold)
+    
+    @staticmethod
+    def _significant_topics(vector: np.ndarray, threshold: float) -> List[Tuple[int, float]]:
+        """
+        Get the topics whose absolute weight in a vector reaches a threshold.
+        
+        Args:
+            vector: Vector in the LSI space
+            threshold: Minimum weight to include a topic
+            
+        Returns:
+            List of (topic_id, weight) tuples sorted by decreasing weight
+        """
+        weights = np.abs(vector)
+        topic_ids = np.flatnonzero(weights >= threshold)
+        topic_ids = topic_ids[np.argsort(-weights[topic_ids], kind='stable')]
+        return list(zip(topic_ids.tolist(), weights[topic_ids].tolist()))
+    
+    def get_topic_documents(self, topic_id: int, top_n: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get the documents most strongly associated with a topic.
         
-        # Sort by weight
-        significant_topics.sort(key=lambda x: x[1], reverse=True)
+        Served from the per-topic posting lists built at fit time; only
+        requests for more than `topic_postings_size` documents scan the
+        document vectors.
         
-        return significant_topics
+        Args:
+            topic_id: ID of the topic (LSI component)
+            top_n: Number of documents to return
+            
+        Returns:
+            List of dictionaries with document ID, signed topic weight as
+            score and text (when the corpus was fitted in memory)
+        """
+        if self.topic_doc_ids is None:
+            raise ValueError("Model must be fit before browsing topics")
+        if not 0 <= topic_id < len(self.topic_doc_ids):
+            raise ValueError(f"Invalid topic ID: {topic_id}")
+            
+        if top_n <= self.topic_doc_ids.shape[1]:
+            return self._format_results(
+                self.topic_doc_ids[topic_id, :top_n], self.topic_doc_weights[topic_id, :top_n]
+            )
+        weights = self._document_vectors()[:, topic_id]
+        top_indices = top_k_rows(np.abs(weights)[np.newaxis], top_n)[0]
+        return self._format_results(top_indices, weights[top_indices])
+    
+    def search_in_topics(self, 
+                         query: str, 
+                         topic_ids: Union[int, List[int]], 
+                         top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Search only among the strongest documents of some topics.
+        
+        The candidates are the union of the topic posting lists, so the
+        query is compared with at most len(topic_ids) x topic_postings_size
+        documents.
+        
+        Args:
+            query: Search query
+            topic_ids: Topic ID or list of topic IDs to restrict the search to
+            top_k: Number of top results to return
+            
+        Returns:
+            List of dictionaries with document ID, similarity score and text
+            (when the corpus was fitted in memory)
+        """
+        if self.topic_doc_ids is None:
+            raise ValueError("Model must be fit before searching")
+        topic_ids = np.atleast_1d(topic_ids)
+        if np.any((topic_ids < 0) | (topic_ids >= len(self.topic_doc_ids))):
+            raise ValueError(f"Invalid topic IDs: {topic_ids.tolist()}")
+            
+        candidates = np.unique(self.topic_doc_ids[topic_ids])
+        query_lsi = self.pipeline.transform([query]).astype(np.float32)
+        similarities = (self._document_vectors(candidates) @ query_lsi[0])
+        top_indices = top_k_rows(similarities[np.newaxis], top_k)[0]
+        return self._format_results(candidates[top_indices], similarities[top_indices])
     
     def get_explained_variance(self) -> np.ndarray:
         """
@@ -239,50 +907,109 @@ class LSIModel:
             
         return self.svd.explained_variance_ratio_
     
+    def render_topic_images(self, 
+                            topic_ids: Optional[List[int]] = None,
+                            n_top_terms: int = 15,
+                            cache_dir: Optional[str] = None,
+                            n_jobs: Optional[int] = None) -> List[str]:
+        """
+        Render one word cloud image per topic, reusing cached images.
+        
+        Images are stored under `cache_dir/<model fingerprint>/`, so a model
+        loaded in another process (e.g. a dashboard worker) finds the images
+        already rendered. Missing images are rendered in a process pool, one
+        topic per task, without matplotlib.
+        
+        Args:
+            topic_ids: Topics to render (None for all of them)
+            n_top_terms: Number of top terms to include per topic
+            cache_dir: Image cache directory (defaults to TOPIC_IMAGE_CACHE)
+            n_jobs: Number of worker processes (None uses all cores)
+            
+        Returns:
+            Path of the PNG image of each requested topic
+        """
+        if self.svd is None:
+            raise ValueError("Model must be fit before visualizing topics")
+        if topic_ids is None:
+            topic_ids = range(len(self.svd.components_))
+            
+        output_dir = os.path.join(cache_dir or TOPIC_IMAGE_CACHE, self.fingerprint())
+        os.makedirs(output_dir, exist_ok=True)
+        paths = [
+            os.path.join(output_dir, f'topic_{topic_id}_{n_top_terms}.png')
+            for topic_id in topic_ids
+        ]
+        missing = [
+            (topic_id, path) for topic_id, path in zip(topic_ids, paths)
+            if not os.path.exists(path)
+        ]
+        if not missing:
+            return paths
+            
+        # Get topics (more terms than displayed for better clouds)
+        topics = self.get_topics(n_top_terms=max(50, n_top_terms))
+        
+        if len(missing) == 1:
+            topic_id, path = missing[0]
+            _render_topic_cloud(topics[topic_id], n_top_terms, path)
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                list(executor.map(
+                    _render_topic_cloud,
+                    [topics[topic_id] for topic_id, _ in missing],
+                    [n_top_terms] * len(missing),
+                    [path for _, path in missing]
+                ))
+        return paths
+    
     def visualize_topics(self, 
                         output_dir: str = None,
                         n_top_terms: int = 15,
-                        figsize: Tuple[int, int] = (15, 10)) -> None:
+                        figsize: Tuple[int, int] = (15, 10),
+                        cache_dir: Optional[str] = None,
+                        n_jobs: Optional[int] = None,
+                        dpi: int = 300) -> None:
         """
         Visualize topics as word clouds.
         
+        The word clouds come from `render_topic_images` (cached per model),
+        so only the 3x3 grid is drawn on every call. Saving does not need a
+        display: the figure is drawn on a headless canvas.
+        
         Args:
             output_dir: Directory to save visualizations (if None, just display)
             n_top_terms: Number of top terms to include per topic
             figsize: Figure size for plots
+            cache_dir: Image cache directory, see `render_topic_images`
+            n_jobs: Number of worker processes rendering the word clouds
+            dpi: Resolution of the saved figure
         """
         if self.svd is None:
             raise ValueError("Model must be fit before visualizing topics")
+        import matplotlib.image as mpimg
+        from matplotlib.figure import Figure
             
-        # Get topics
-        topics = self.get_topics(n_top_terms=50)  # Get more terms for better clouds
+        # Number of topics to visualize (max 9 for a 3x3 grid)
+        n_topics = min(9, len(self.svd.components_))
+        images = self.render_topic_images(list(range(n_topics)), n_top_terms, cache_dir, n_jobs)
         
         # Create output directory if needed
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
             
-        # Number of topics to visualize (max 9 for a 3x3 grid)
-        n_topics = min(9, len(topics))
-        
         # Create figure
-        fig, axs = plt.subplots(3, 3, figsize=figsize)
+        if output_dir:
+            fig = Figure(figsize=figsize)
+            axs = fig.subplots(3, 3)
+        else:
+            import matplotlib.pyplot as plt
+            fig, axs = plt.subplots(3, 3, figsize=figsize)
         axs = axs.flatten()
         
-        for topic_idx, topic_terms in enumerate(topics[:n_topics]):
-            # Create word cloud data
-            word_cloud_data = {term: abs(weight) for term, weight in topic_terms}
-            
-            # Generate word cloud
-            wordcloud = WordCloud(
-                background_color='white',
-                width=400,
-                height=400,
-                colormap='viridis',
-                max_words=n_top_terms
-            ).generate_from_frequencies(word_cloud_data)
-            
+        for topic_idx, image in enumerate(images):
             # Plot word cloud
-            axs[topic_idx].imshow(wordcloud, interpolation='bilinear')
+            axs[topic_idx].imshow(mpimg.imread(image), interpolation='bilinear')
             axs[topic_idx].set_title(f'Topic {topic_idx+1}')
             axs[topic_idx].axis('off')
             
@@ -290,15 +1017,14 @@ class LSIModel:
         for idx in range(n_topics, len(axs)):
             axs[idx].axis('off')
             
-        plt.tight_layout()
+        fig.tight_layout()
         
         # Save or display
         if output_dir:
-            plt.savefig(os.path.join(output_dir, 'lsi_topics.png'), dpi=300)
+            fig.savefig(os.path.join(output_dir, 'lsi_topics.png'), dpi=dpi)
         else:
             plt.show()
-            
-        plt.close()
+            plt.close(fig)
     
     def find_topics_for_query(self, 
                             query: str, 
@@ -316,11 +1042,4 @@ class LSIModel:
         # Transform query to LSI space
         query_lsi = self.pipeline.transform([query])[0]
         
-        # Get topics above threshold
-        topic_weights = [(i, abs(weight)) for i, weight in enumerate(query_lsi)]
-        significant_topics = [t for t in topic_weights if t[1] >= threshold]
-        
-        # Sort by weight
-        significant_topics.sort(key=lambda x: x[1], reverse=True)
-        
-        return significant_topics
+        return self._significant_topics(query_lsi, threshold)
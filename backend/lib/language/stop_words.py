@@ -0,0 +1,28 @@
+"""
+Stop word lists for the scikit-learn vectorizers.
+scikit-learn only ships an English list, so 'spanish' is mapped to the
+Spanish stop words of spaCy.
+"""
+
+from typing import List, Optional, Union
+
+
+def resolve_stop_words(stop_words: Optional[Union[str, List[str]]]) -> Optional[Union[str, List[str]]]:
+    """
+    Get the `stop_words` argument to pass to a scikit-learn vectorizer.
+    
+    Args:
+        stop_words: 'spanish', any value accepted by scikit-learn ('english',
+            a list of words or None)
+            
+    Returns:
+        The sorted spaCy Spanish stop words for 'spanish', otherwise the
+        value unchanged
+    """
+    if stop_words != 'spanish':
+        return stop_words
+    try:
+        from spacy.lang.es.stop_words import STOP_WORDS
+    except ImportError as error:
+        raise ImportError("Spanish stop words require the 'spacy' package") from error
+    return sorted(STOP_WORDS)
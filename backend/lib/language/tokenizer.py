@@ -0,0 +1,175 @@
+"""
+Single-pass tokenizer for Spanish legal text.
+Shared by the retrieval models at index and query time: one compiled regex
+pass over the lowercased text, with optional accent folding and Spanish
+stemming, emitting terms or vocabulary term IDs directly.
+"""
+
+import re
+from typing import Dict, Iterator, List, MutableMapping, Mapping, Tuple, Union
+import numpy as np
+
+try:
+    from nltk.stem.snowball import SpanishStemmer
+    NLTK_AVAILABLE = True
+except ImportError:
+    NLTK_AVAILABLE = False
+
+# Runs of two or more word characters (same tokens as sklearn's default
+# token_pattern once punctuation has been removed)
+TOKEN_PATTERN = re.compile(r'\w\w+')
+
+# Accented vowels folded to their base letter ('ñ' is kept: "año" != "ano")
+ACCENT_TABLE = str.maketrans('áàäâéèëêíìïîóòöôúùüû', 'aaaaeeeeiiiioooouuuu')
+
+
+class Tokenizer:
+    def __init__(self, fold_accents: bool = False, stem: bool = False):
+        """
+        Initialize the tokenizer.
+        
+        Args:
+            fold_accents: Whether to remove accents from vowels
+            stem: Whether to apply the Spanish Snowball stemmer (needs nltk)
+        """
+        if stem and not NLTK_AVAILABLE:
+            raise ImportError("Spanish stemming requires the 'nltk' package")
+        self.fold_accents = fold_accents
+        self.stem = stem
+        self._stemmer = SpanishStemmer() if stem else None
+        self._term_cache: Dict[str, str] = {}
+        
+    def get_config(self) -> Dict[str, bool]:
+        """
+        Get the parameters needed to rebuild an equivalent tokenizer.
+        """
+        return {'fold_accents': self.fold_accents, 'stem': self.stem}
+    
+    def _term(self, token: str) -> str:
+        """
+        Fold and/or stem a lowercased token, caching the result (legal
+        vocabulary is very repetitive, so most tokens are cache hits).
+        """
+        term = self._term_cache.get(token)
+        if term is None:
+            term = token
+            # Stem before folding: the Snowball suffixes include accented
+            # forms ("-ación", "-ución")
+            if self.stem:
+                term = self._stemmer.stem(term)
+            if self.fold_accents:
+                term = term.translate(ACCENT_TABLE)
+            self._term_cache[token] = term
+        return term
+    
+    def normalize_token(self, token: str) -> str:
+        """
+        Normalize a single raw token the same way `tokenize` does.
+        """
+        token = token.lower()
+        return self._term(token) if self.fold_accents or self.stem else token
+    
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Split a text into normalized terms.
+        
+        Args:
+            text: Raw text
+            
+        Returns:
+            List of terms, in order of appearance
+        """
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if self.fold_accents or self.stem:
+            term = self._term
+            tokens = [term(token) for token in tokens]
+        return tokens
+    
+    def iter_spans(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """
+        Stream the normalized terms of a text with their character offsets.
+        
+        Args:
+            text: Raw text
+            
+        Returns:
+            Iterator of (term, start, end) tuples
+        """
+        for match in TOKEN_PATTERN.finditer(text):
+            yield self.normalize_token(match.group()), match.start(), match.end()
+    
+    def encode(self, 
+               text: str, 
+               vocabulary: Union[MutableMapping[str, int], Mapping[str, int]],
+               add_terms: bool = False) -> np.ndarray:
+        """
+        Tokenize a text straight into vocabulary term IDs.
+        
+        Args:
+            text: Raw text
+            vocabulary: Term -> term ID mapping
+            add_terms: Whether to add unknown terms to the vocabulary (with the
+                next free ID) instead of skipping them
+            
+        Returns:
+            Array of term IDs, in order of appearance
+        """
+        return self.encode_terms(self.tokenize(text), vocabulary, add_terms)
+    
+    @staticmethod
+    def encode_terms(tokens: List[str], 
+                     vocabulary: Union[MutableMapping[str, int], Mapping[str, int]],
+                     add_terms: bool = False) -> np.ndarray:
+        """
+        Map already normalized terms to vocabulary term IDs.
+        
+        Args:
+            tokens: Normalized terms
+            vocabulary: Term -> term ID mapping
+            add_terms: Whether to add unknown terms to the vocabulary (with the
+                next free ID) instead of skipping them
+            
+        Returns:
+            Array of term IDs, in order of appearance
+        """
+        if add_terms:
+            ids = [vocabulary.setdefault(token, len(vocabulary)) for token in tokens]
+        else:
+            get = vocabulary.get
+            ids = [term_id for term_id in map(get, tokens) if term_id is not None]
+        return np.array(ids, dtype=np.int64)
+
+
+if __name__ == "__main__":
+    # Throughput benchmark against the previous BM25 path: three re.sub passes
+    # plus lower(), then CountVectorizer's own regex tokenization
+    import time
+    from sklearn.feature_extraction.text import CountVectorizer
+    
+    def legacy_preprocess(text: str) -> str:
+        text = text.lower()
+        text = re.sub(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\w)\.(?=\s)', ' ', text)
+        text = re.sub(r'[^\w\s]', ' ', text)
+        return re.sub(r'\s+', ' ', text).strip()
+    
+    sample = (
+        "Real Decreto 1234/2024, de 3 de diciembre, por el que se regula el régimen "
+        "jurídico de las subvenciones públicas (artículo 22.2.c de la Ley 38/2003). "
+    ) * 200
+    corpus = [sample] * 500
+    n_chars = sum(len(doc) for doc in corpus)
+    
+    analyzer = CountVectorizer(lowercase=False).build_analyzer()
+    start = time.perf_counter()
+    legacy = [analyzer(legacy_preprocess(doc)) for doc in corpus]
+    legacy_time = time.perf_counter() - start
+    
+    for config in [{}, {'fold_accents': True}] + ([{'stem': True}] if NLTK_AVAILABLE else []):
+        tokenizer = Tokenizer(**config)
+        start = time.perf_counter()
+        tokens = [tokenizer.tokenize(doc) for doc in corpus]
+        elapsed = time.perf_counter() - start
+        if not config:
+            assert tokens == legacy
+        print(f"Tokenizer{config}: {n_chars / elapsed / 1e6:.1f} MB/s "
+              f"(legacy: {n_chars / legacy_time / 1e6:.1f} MB/s, x{legacy_time / elapsed:.1f})")
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Test the PSO document retrieval module
+"""
+
+import numpy as np
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+from lib.api.boe.pso import PSODocumentRetrieval, precision_recall_score
+
+
+def make_problem(seed: int = 0):
+    """
+    Random document features where the first feature identifies the relevant documents
+    """
+    rng = np.random.default_rng(seed)
+    documents = rng.random((200, 6))
+    relevant = np.arange(10)
+    documents[relevant, 0] += 2.0
+    query = np.ones(6)
+    return documents, query, relevant
+
+
+def test_similarity_matches_cosine():
+    """
+    Test the tensor similarity against per-document cosine similarity
+    """
+    documents, query, _ = make_problem()
+    pso = PSODocumentRetrieval(documents)
+    swarm = np.random.default_rng(1).random((4, 6))
+    queries = np.vstack([query, np.arange(6)])
+    scores = pso.similarity_scores(swarm, queries)
+    for q, query_vector in enumerate(queries):
+        for p, weights in enumerate(swarm):
+            expected = cosine_similarity(query_vector[np.newaxis], documents * weights)[0]
+            assert scores[q, p] == pytest.approx(expected)
+
+
+def test_precision_recall_score():
+    """
+    Test the F-beta of top-k rankings on a hand-computed example
+    """
+    scores = np.array([[0.9, 0.8, 0.1, 0.0], [0.0, 0.1, 0.8, 0.9]])
+    relevant = np.array([True, False, True, False])
+    # Top 2 of the first ranking: documents 0, 1 -> P = 1/2, R = 1/2
+    # Top 2 of the second ranking: documents 3, 2 -> P = 1/2, R = 1/2
+    assert precision_recall_score(scores, relevant, top_k=2) == pytest.approx([0.5, 0.5])
+    assert precision_recall_score(scores, relevant, top_k=1) == pytest.approx([2 / 3, 0.0])
+
+
+def test_optimize_finds_relevant_feature():
+    """
+    Test that the swarm learns to weight the discriminative feature
+    """
+    documents, query, relevant = make_problem()
+    pso = PSODocumentRetrieval(documents, n_particles=20, iterations=30, top_k=10, random_state=0)
+    baseline = pso.fitness_function(np.ones(6), query, relevant)
+    weights, fitness = pso.optimize(query, relevant)
+    assert fitness == pytest.approx(pso.fitness_function(weights, query, relevant))
+    assert fitness > baseline
+
+
+def test_velocity_clamping_and_coefficients():
+    """
+    Test per-particle/per-dimension random coefficients and velocity clamping
+    """
+    documents, _, _ = make_problem()
+    pso = PSODocumentRetrieval(documents, v_max=0.05, random_state=0)
+    positions, velocities = pso.initialize_swarm()
+    g_best = np.ones(6)
+    new_velocities = pso.update_velocity(positions, np.zeros_like(velocities), positions, g_best)
+    assert np.abs(new_velocities).max() <= 0.05
+    # Without clamping, each coordinate gets its own random factor
+    pso.v_max = np.inf
+    new_velocities = pso.update_velocity(positions, np.zeros_like(velocities), positions, g_best)
+    ratios = new_velocities / (1.5 * (g_best - positions))
+    assert len(np.unique(np.round(ratios, 12))) > 1
+
+
+def test_early_stopping_on_stagnation():
+    """
+    Test that the swarm stops once the global best stagnates
+    """
+    documents, query, relevant = make_problem()
+    pso = PSODocumentRetrieval(documents, iterations=500, patience=5, random_state=0)
+    weights, fitness = pso.optimize(query, relevant)
+    assert pso.iterations_run < 500
+    assert fitness == pytest.approx(pso.fitness_function(weights, query, relevant))
+
+
+def test_multi_swarm():
+    """
+    Test the multi-swarm optimizer, with the same result with and without worker processes
+    """
+    documents, query, relevant = make_problem()
+    pso = PSODocumentRetrieval(documents, n_particles=10, iterations=40, patience=5, random_state=0)
+    weights, fitness = pso.optimize_multi_swarm(query, relevant, n_swarms=3, migration_interval=5, n_jobs=2)
+    assert fitness == pytest.approx(pso.fitness_function(weights, query, relevant))
+    assert fitness >= pso.fitness_function(np.ones(6), query, relevant)
+    assert np.all((weights >= 0) & (weights <= 1))
+    
+    serial_weights, serial_fitness = pso.optimize_multi_swarm(
+        query, relevant, n_swarms=3, migration_interval=5, n_jobs=1
+    )
+    assert serial_fitness == fitness
+    assert np.array_equal(serial_weights, weights)
@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""
+Test the BM25 retrieval module
+"""
+
+import numpy as np
+import pytest
+from lib.api.metaheuristics.bm25 import BM25Retrieval, DocumentStore, BOE_FIELDS
+from lib.api.metaheuristics.bm25_sharded import ShardedBM25Retrieval
+from lib.language.tokenizer import Tokenizer
+
+CORPUS = [
+    "Real Decreto por el que se regula el régimen de subvenciones públicas.",
+    "Ley Orgánica de protección de datos personales y garantía de derechos digitales.",
+    "Resolución de la Subsecretaría sobre subvenciones para energías renovables.",
+    "Orden por la que se aprueban las bases reguladoras de las ayudas a la energía.",
+    "Real Decreto-ley de medidas urgentes en materia de vivienda y alquiler.",
+    "Anuncio de licitación de contrato de obras de la Administración General del Estado.",
+]
+
+FIELDED_CORPUS = [
+    {"titulo": text, "materias": materias, "alertas": "", "texto": texto}
+    for text, materias, texto in zip(CORPUS, [
+        "Subvenciones", "Protección de datos", "Energía, Subvenciones",
+        "Ayudas, Energía", "Vivienda", "Contratación administrativa",
+    ], [
+        "Las subvenciones se concederán en régimen de concurrencia competitiva.",
+        "Los datos personales serán tratados conforme al reglamento europeo.",
+        "Podrán solicitar las ayudas las empresas del sector de la energía.",
+        "Los fondos se destinan a la eficiencia energética de las subvenciones.",
+        "Se prorrogan los contratos de alquiler de vivienda habitual.",
+        "El contrato de obras se adjudicará por procedimiento abierto.",
+    ])
+]
+
+
+def query_vector(model: BM25Retrieval, query: str) -> np.ndarray:
+    """
+    Dense term frequency vector of a query.
+    """
+    query_tf = np.zeros(len(model.vocabulary))
+    np.add.at(query_tf, model.tokenizer.encode(query, model.vocabulary), 1)
+    return query_tf
+
+
+def reference_scores(model: BM25Retrieval, query: str) -> np.ndarray:
+    """
+    Score every document with the textbook BM25 formula over dense rows.
+    """
+    query_tf = query_vector(model, query)
+    scores = np.zeros(model.n_docs)
+    for doc_id in range(model.n_docs):
+        doc_tf = model.tf[doc_id].toarray().flatten()
+        len_norm = 1.0 - model.b + model.b * (model.doc_lengths[doc_id] / model.avgdl)
+        common = np.logical_and(query_tf > 0, doc_tf > 0)
+        scores[doc_id] = np.sum(model.idf[common] * (
+            (model.k1 + 1.0) * doc_tf[common] / (model.k1 * len_norm + doc_tf[common])
+        ))
+    return scores
+
+
+@pytest.fixture(name="model")
+def fixture_model() -> BM25Retrieval:
+    """
+    BM25 model fitted on the sample corpus
+    """
+    return BM25Retrieval().fit(CORPUS)
+
+
+@pytest.mark.parametrize("query", [
+    "subvenciones",
+    "real decreto subvenciones",
+    "protección de datos",
+    "energía renovables energías",
+    "término inexistente",
+])
+def test_search_matches_reference(model, query):
+    """
+    Test that the sparse scoring engine reproduces the dense BM25 scores
+    """
+    expected = reference_scores(model, query)
+    results = model.search(query, top_k=len(CORPUS))
+    for result in results:
+        assert result["score"] == pytest.approx(expected[result["id"]])
+    assert [r["score"] for r in results] == sorted(expected, reverse=True)
+
+
+def test_score_document(model):
+    """
+    Test that single-document scoring agrees with the full search
+    """
+    query = "subvenciones energías"
+    query_tf = query_vector(model, query)
+    expected = reference_scores(model, query)
+    for doc_id in range(model.n_docs):
+        assert model._score_document(query_tf, doc_id) == pytest.approx(expected[doc_id])
+
+
+@pytest.mark.parametrize("query, top_k", [
+    ("subvenciones", 2),
+    ("real decreto subvenciones energías", 2),
+    ("real decreto de la ley", 3),
+    ("orden de las bases reguladoras de las ayudas", 1),
+    ("término inexistente", 2),
+])
+def test_maxscore_matches_exhaustive(model, query, top_k):
+    """
+    Test that MaxScore pruning returns the same top-k scores as exhaustive search
+    """
+    exhaustive = model.search(query, top_k=top_k)
+    pruned = model.search(query, top_k=top_k, strategy="maxscore")
+    assert [r["score"] for r in pruned] == pytest.approx([r["score"] for r in exhaustive])
+
+
+def test_maxscore_prunes_frequent_terms():
+    """
+    Test that MaxScore probes the frequent terms of a query only for the
+    candidates of the rare ones, and still returns the exhaustive top-k
+    """
+    rng = np.random.default_rng(0)
+    common = [f"común{i}" for i in range(5)]
+    corpus = [
+        " ".join(rng.choice(common, 6)) + (f" raro{doc_id % 50}" if doc_id % 7 == 0 else "")
+        for doc_id in range(2000)
+    ]
+    model = BM25Retrieval().fit(corpus)
+    for query, top_k in [("raro3 común0 común1", 5), ("raro3 raro10 común2", 3), ("común0 común4", 4)]:
+        term_ids = model._query_term_ids(query.split())
+        pruned = model._maxscore_terms(term_ids, top_k)
+        if query.startswith("raro"):
+            assert pruned is not None and len(pruned[0]) < 20
+        exhaustive = model.search(query, top_k=top_k, with_snippets=False)
+        results = model.search(query, top_k=top_k, strategy="maxscore", with_snippets=False)
+        assert [r["score"] for r in results] == pytest.approx([r["score"] for r in exhaustive])
+
+
+def test_zero_score_padding(model):
+    """
+    Test that search and batch_search pad short rankings with the same
+    zero-score documents
+    """
+    model.remove_documents([1])
+    for query in ["", "término inexistente", "vivienda"]:
+        for strategy in ("exhaustive", "maxscore"):
+            results = model.search(query, top_k=4, strategy=strategy, with_snippets=False)
+            batch = model.batch_search([query], top_k=4, with_snippets=False)[0]
+            assert [r["id"] for r in results] == [r["id"] for r in batch]
+            assert 1 not in [r["id"] for r in results]
+    assert [r["id"] for r in model.search("", top_k=3)] == [0, 2, 3]
+    assert [r["id"] for r in model.search("vivienda", top_k=3)] == [4, 0, 2]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1024])
+def test_batch_search_matches_search(model, chunk_size):
+    """
+    Test that the matrix batch search returns the same rankings as search
+    """
+    queries = [
+        "subvenciones",
+        "real decreto subvenciones subvenciones",
+        "protección de datos",
+        "subvenciones",
+        "término inexistente",
+    ]
+    batch = model.batch_search(queries, top_k=3, chunk_size=chunk_size)
+    assert len(batch) == len(queries)
+    for query, results in zip(queries, batch):
+        expected = model.search(query, top_k=3)
+        assert len(results) == len(expected)
+        assert [r["score"] for r in results] == pytest.approx([r["score"] for r in expected])
+        
+    with pytest.raises(ValueError):
+        model.batch_search(queries, chunk_size=0)
+
+
+def test_add_documents_matches_full_fit():
+    """
+    Test that incremental ingestion gives the same scores as fitting everything
+    """
+    incremental = BM25Retrieval().fit(CORPUS[:3])
+    new_ids = incremental.add_documents(CORPUS[3:])
+    full = BM25Retrieval().fit(CORPUS)
+
+    assert list(new_ids) == list(range(3, len(CORPUS)))
+    for query in ["subvenciones energía", "real decreto vivienda", "licitación de obras"]:
+        expected = {r["id"]: r["score"] for r in full.search(query, top_k=len(CORPUS))}
+        for result in incremental.search(query, top_k=len(CORPUS)):
+            assert result["score"] == pytest.approx(expected[result["id"]])
+
+
+def test_remove_documents_matches_full_fit():
+    """
+    Test that removed documents disappear and statistics match a refit without them
+    """
+    model = BM25Retrieval().fit(CORPUS)
+    model.remove_documents([0, 2])
+    kept = [1, 3, 4, 5]
+    full = BM25Retrieval().fit([CORPUS[i] for i in kept])
+
+    for query in ["subvenciones", "real decreto", "energía"]:
+        results = model.search(query, top_k=len(CORPUS))
+        expected = {kept[r["id"]]: r["score"] for r in full.search(query, top_k=len(CORPUS))}
+        assert len(results) == len(kept)
+        for result in results:
+            assert result["score"] == pytest.approx(expected[result["id"]])
+        batch = model.batch_search([query], top_k=len(CORPUS))[0]
+        assert sorted(r["id"] for r in batch) == kept
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_roundtrip(model, tmp_path, mmap):
+    """
+    Test that a saved index loads back with identical search results
+    """
+    model.save(str(tmp_path))
+    loaded = BM25Retrieval.load(str(tmp_path), mmap=mmap)
+
+    for query in ["subvenciones", "real decreto vivienda", "término inexistente"]:
+        assert loaded.search(query, top_k=3) == model.search(query, top_k=3)
+    assert loaded.get_term_importance("subvenciones") == model.get_term_importance("subvenciones")
+
+    # A loaded index can still be updated incrementally
+    loaded.add_documents(["Nueva ley de subvenciones agrarias."])
+    loaded.remove_documents([0])
+    assert all(r["id"] != 0 for r in loaded.search("subvenciones", top_k=len(CORPUS) + 1))
+
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_into_loaded_directory(model, tmp_path, mmap):
+    """
+    Test that a loaded index can be updated and saved back to its directory
+    """
+    model.save(str(tmp_path))
+    expected = model.search("real decreto vivienda", top_k=3)
+    loaded = BM25Retrieval.load(str(tmp_path), mmap=mmap)
+    loaded.save(str(tmp_path))
+    assert BM25Retrieval.load(str(tmp_path)).search("real decreto vivienda", top_k=3) == expected
+    
+    loaded = BM25Retrieval.load(str(tmp_path), mmap=mmap)
+    loaded.add_documents(["Nueva ley de subvenciones agrarias."])
+    loaded.remove_documents([0])
+    expected = loaded.search("subvenciones", top_k=len(CORPUS) + 1)
+    loaded.save(str(tmp_path))
+    reloaded = BM25Retrieval.load(str(tmp_path))
+    assert reloaded.search("subvenciones", top_k=len(CORPUS) + 1) == expected
+    assert all(r["id"] != 0 for r in expected)
+
+
+def test_results_do_not_store_text(model):
+    """
+    Test that results only carry ids and scores when no document store is attached
+    """
+    for result in model.search("subvenciones", top_k=2):
+        assert set(result) == {"id", "score"}
+
+
+def test_snippets_from_document_store(tmp_path):
+    """
+    Test that snippets are fetched from the document store around matched terms
+    """
+    long_text = " ".join(["preámbulo"] * 50 + ["cofinanciación de subvenciones públicas"] + ["anexo"] * 50)
+    corpus = CORPUS + [long_text]
+    store = DocumentStore.write(str(tmp_path / "documents"), corpus)
+    model = BM25Retrieval().fit(corpus, document_store=store)
+
+    result = model.search("cofinanciación", top_k=1)[0]
+    assert result["id"] == len(CORPUS)
+    assert "cofinanciación de subvenciones públicas" in result["snippet"]
+    assert result["snippet"].startswith("...") and result["snippet"].endswith("...")
+    assert model.get_snippet(0, "subvenciones") == CORPUS[0]
+
+    # The store location is recorded with the index
+    model.save(str(tmp_path / "index"))
+    loaded = BM25Retrieval.load(str(tmp_path / "index"))
+    assert loaded.search("cofinanciación", top_k=1) == [result]
+
+
+def test_sharded_matches_single_index(model):
+    """
+    Test that sharded fitting with merged statistics reproduces single-index scores
+    """
+    sharded = ShardedBM25Retrieval(n_jobs=2).fit([CORPUS[:2], CORPUS[2:5], CORPUS[5:]])
+    queries = ["subvenciones", "real decreto vivienda", "contrato de obras"]
+
+    for query, results in zip(queries, sharded.batch_search(queries, top_k=3)):
+        expected = model.search(query, top_k=3)
+        assert [r["score"] for r in results] == pytest.approx([r["score"] for r in expected])
+        assert [r["score"] for r in sharded.search(query, top_k=3)] == pytest.approx(
+            [r["score"] for r in expected]
+        )
+    expected = {r["id"]: r["score"] for r in model.search("subvenciones", top_k=len(CORPUS))}
+    for result in sharded.search("subvenciones", top_k=2):
+        assert result["score"] == pytest.approx(expected[result["id"]])
+
+
+def test_accent_folding_tokenizer():
+    """
+    Test that queries without accents match accented documents with accent folding
+    """
+    model = BM25Retrieval(tokenizer=Tokenizer(fold_accents=True)).fit(CORPUS)
+    assert model.search("proteccion organica", top_k=1)[0]["id"] == 1
+
+
+def test_batch_query_importance(model):
+    """
+    Test that batched IDF lookups match the per-term API
+    """
+    queries = ["Subvenciones públicas", "término inexistente", ""]
+    batch = model.batch_query_importance(queries)
+    assert len(batch) == len(queries)
+    for query, (terms, idf) in zip(queries, batch):
+        assert dict(zip(terms, idf.tolist())) == model.calculate_query_importance(query)
+        assert list(idf) == [model.get_term_importance(term) for term in terms]
+    assert list(model.get_terms_importance(["subvenciones", "inexistente"])) == [
+        model.get_term_importance("subvenciones"), 0.0
+    ]
+
+
+def test_search_contributions(model):
+    """
+    Test that per-term contributions add up to the result scores
+    """
+    results = model.search("real decreto subvenciones", top_k=3, with_contributions=True)
+    for result in results:
+        assert set(result["contributions"]) == {"real", "decreto", "subvenciones"}
+        assert sum(result["contributions"].values()) == pytest.approx(result["score"])
+    terms, contributions = model.explain("real decreto subvenciones", [r["id"] for r in results])
+    assert terms == ["real", "decreto", "subvenciones"]
+    assert contributions.sum(axis=1) == pytest.approx([r["score"] for r in results])
+
+
+def variant_reference(model: BM25Retrieval, query: str, variant: str, delta: float) -> np.ndarray:
+    """
+    Score every document with the textbook BM25+ or BM25L formula over dense rows.
+    """
+    query_tf = query_vector(model, query)
+    scores = np.zeros(model.n_docs)
+    for doc_id in range(model.n_docs):
+        doc_tf = model.tf[doc_id].toarray().flatten()
+        norm = 1.0 - model.b + model.b * (model.doc_lengths[doc_id] / model.avgdl)
+        common = np.logical_and(query_tf > 0, doc_tf > 0)
+        tf = doc_tf[common]
+        if variant == "bm25+":
+            term_scores = (model.k1 + 1.0) * tf / (model.k1 * norm + tf) + delta
+        else:
+            c = tf / norm + delta
+            term_scores = (model.k1 + 1.0) * c / (model.k1 + c)
+        scores[doc_id] = np.sum(model.idf[common] * term_scores)
+    return scores
+
+
+@pytest.mark.parametrize("variant,delta", [("bm25+", 1.0), ("bm25+", 0.3), ("bm25l", 0.5)])
+def test_lower_bounded_variants_match_reference(model, variant, delta):
+    """
+    Test BM25+ and BM25L scores computed from the shared postings
+    """
+    query = "real decreto subvenciones energía"
+    expected = variant_reference(model, query, variant, delta)
+    for result in model.search(query, top_k=len(CORPUS), variant=variant, delta=delta):
+        assert result["score"] == pytest.approx(expected[result["id"]])
+    terms, contributions = model.explain(query, range(len(CORPUS)), variant=variant, delta=delta)
+    assert contributions.sum(axis=1) == pytest.approx(expected)
+
+
+def test_bm25f_field_weights():
+    """
+    Test that BM25F weights fields and that plain BM25 sees the fields concatenated
+    """
+    model = BM25Retrieval().fit(FIELDED_CORPUS, fields=BOE_FIELDS)
+    flat = BM25Retrieval().fit([" ".join(doc[f] for f in BOE_FIELDS) for doc in FIELDED_CORPUS])
+    for result, expected in zip(model.search("ayudas energía"), flat.search("ayudas energía")):
+        assert result["score"] == pytest.approx(expected["score"])
+        
+    # "ayudas" is in the title and subjects of document 3 but only in the text of document 2
+    texto = model.search("ayudas", top_k=2, variant="bm25f", field_weights={"titulo": 0.0, "materias": 0.0})
+    titulo = model.search("ayudas", top_k=2, variant="bm25f", field_weights={"titulo": 10.0})
+    assert texto[0]["id"] == 2
+    assert titulo[0]["id"] == 3
+    
+    with pytest.raises(ValueError):
+        BM25Retrieval().fit(CORPUS).search("ayudas", variant="bm25f")
+    with pytest.raises(ValueError):
+        model.search("ayudas", variant="bm25f", field_weights={"resumen": 1.0})
+
+
+def test_bm25f_incremental_and_persistent(tmp_path):
+    """
+    Test that per-field postings survive add/remove and save/load
+    """
+    weights = {"titulo": 3.0, "materias": 2.0}
+    expected = BM25Retrieval().fit(FIELDED_CORPUS[2:], fields=BOE_FIELDS).search(
+        "subvenciones energía", variant="bm25f", field_weights=weights
+    )
+    
+    model = BM25Retrieval().fit(FIELDED_CORPUS[:4], fields=BOE_FIELDS)
+    model.add_documents(FIELDED_CORPUS[4:])
+    model.remove_documents([0, 1])
+    model.save(tmp_path / "index")
+    loaded = BM25Retrieval.load(tmp_path / "index")
+    
+    results = loaded.search("subvenciones energía", variant="bm25f", field_weights=weights)
+    assert {r["id"] - 2: r["score"] for r in results} == pytest.approx(
+        {r["id"]: r["score"] for r in expected}
+    )
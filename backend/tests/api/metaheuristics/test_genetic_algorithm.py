@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Test the genetic algorithm summarizer
+"""
+
+import pickle
+import numpy as np
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+from lib.api.metaheuristics.genetic_algorithm import ExtractiveSummarizerGA, CorpusVectorizer, iter_boe_documents
+
+TEXT = (
+    "El presente Real Decreto tiene por objeto regular la concesión directa de subvenciones. "
+    "Las subvenciones se destinarán a proyectos de eficiencia energética en edificios públicos. "
+    "Podrán ser beneficiarias las entidades locales que cumplan los requisitos establecidos. "
+    "La cuantía máxima de la ayuda será de 2.500.000 euros por entidad beneficiaria. "
+    "Las solicitudes se presentarán en el plazo de tres meses desde la entrada en vigor. "
+    "El órgano instructor comprobará el cumplimiento de los requisitos de las solicitudes. "
+    "La resolución de concesión se notificará a las entidades beneficiarias en seis meses. "
+    "Los beneficiarios deberán justificar la realización de los proyectos subvencionados. "
+    "El incumplimiento de las obligaciones dará lugar al reintegro de las subvenciones. "
+    "Este Real Decreto entrará en vigor el día siguiente al de su publicación en el Boletín Oficial del Estado. "
+    "Se faculta a la persona titular del Ministerio para dictar las disposiciones de desarrollo. "
+    "Las ayudas serán compatibles con otras subvenciones para la misma finalidad."
+)
+
+
+def reference_fitness(individual, sentence_vectors, sentences):
+    """
+    Fitness computed from the sentence vectors, without precomputed tables.
+    """
+    selected = np.where(individual == 1)[0]
+    document_vector = np.mean(sentence_vectors.toarray(), axis=0).reshape(1, -1)
+    summary_vector = np.mean(sentence_vectors[selected].toarray(), axis=0).reshape(1, -1)
+    coverage = cosine_similarity(document_vector, summary_vector)[0][0]
+    pairs = [
+        cosine_similarity(sentence_vectors[i], sentence_vectors[j])[0][0]
+        for n, i in enumerate(selected) for j in selected[n + 1:]
+    ]
+    diversity = 1.0 - np.mean(pairs) if pairs else 0.0
+    importance = np.mean([sentence_vectors[i].sum() for i in selected])
+    position = np.mean([1.0 - i / len(sentences) for i in selected])
+    return 0.4 * coverage + 0.3 * diversity + 0.2 * importance + 0.1 * position
+
+
+@pytest.fixture(name="summarizer")
+def fixture_summarizer() -> ExtractiveSummarizerGA:
+    """
+    Summarizer with a small population and no stop words list
+    """
+    return ExtractiveSummarizerGA(population_size=20, generations=10, summary_size=3, stop_words=None)
+
+
+def test_fitness_matches_reference(summarizer):
+    """
+    Test that the lookup-based fitness reproduces the direct computation
+    """
+    sentences = summarizer._split_into_sentences(TEXT)
+    sentence_vectors = summarizer._create_sentence_vectors(sentences)
+    context = summarizer._precompute(sentence_vectors)
+    rng = np.random.default_rng(0)
+    for size in (1, 2, 3, 5):
+        individual = np.zeros(len(sentences), dtype=int)
+        individual[rng.choice(len(sentences), size, replace=False)] = 1
+        assert summarizer._fitness_function(individual, context) == pytest.approx(
+            reference_fitness(individual, sentence_vectors, sentences)
+        )
+
+
+def test_summarize(summarizer):
+    """
+    Test that the summary is made of sentences of the text, in order
+    """
+    np.random.seed(0)
+    sentences = summarizer._split_into_sentences(TEXT)
+    summary = summarizer.summarize(TEXT)
+    selected = [sentence for sentence in sentences if sentence in summary]
+    assert len(selected) == 3
+    assert summary == " ".join(selected)
+
+
+def test_population_fitness_matches_individuals(summarizer):
+    """
+    Test that the population fitness matches the fitness of each individual
+    """
+    np.random.seed(0)
+    sentences = summarizer._split_into_sentences(TEXT)
+    context = summarizer._precompute(summarizer._create_sentence_vectors(sentences))
+    population = summarizer._initialize_population(len(sentences))
+    population[0] = False
+    population[1, :5] = True
+    fitness = summarizer._population_fitness(population, context)
+    assert fitness[0] == 0.0
+    assert fitness == pytest.approx(
+        [summarizer._fitness_function(individual, context) for individual in population]
+    )
+
+
+def test_operators_keep_summary_size(summarizer):
+    """
+    Test that every individual selects exactly summary_size sentences after
+    selection, crossover and mutation
+    """
+    np.random.seed(0)
+    summarizer.mutation_rate = 0.5
+    population = summarizer._initialize_population(12)
+    assert population.shape == (20, 12)
+    assert (population.sum(axis=1) == 3).all()
+    
+    fitness = np.random.random(len(population))
+    parents = summarizer._tournament_selection(population, fitness, 20)
+    children1, children2 = summarizer._crossover(parents[:10], parents[10:])
+    for children in (children1, children2, summarizer._mutate(children1)):
+        assert children.shape == (10, 12)
+        assert (children.sum(axis=1) == 3).all()
+
+
+def test_mmr_initialization():
+    """
+    Test that the MMR initialization seeds the population with the greedy
+    MMR summary
+    """
+    np.random.seed(0)
+    summarizer = ExtractiveSummarizerGA(population_size=20, summary_size=3, stop_words=None,
+                                        init_method='mmr', mmr_lambda=1.0)
+    sentences = summarizer._split_into_sentences(TEXT)
+    sentence_vectors = summarizer._create_sentence_vectors(sentences)
+    context = summarizer._precompute(sentence_vectors)
+    
+    # With mmr_lambda=1 the selection is the 3 sentences closest to the document
+    document_vector = np.asarray(sentence_vectors.mean(axis=0))
+    relevance = cosine_similarity(sentence_vectors, document_vector).ravel()
+    assert summarizer._mmr_selection(context, 3) == list(np.argsort(-relevance)[:3])
+    
+    population = summarizer._initialize_population(len(sentences), context)
+    assert sorted(np.flatnonzero(population[0])) == sorted(np.argsort(-relevance)[:3])
+    assert (population.sum(axis=1) == 3).all()
+    
+    # The other seeded individuals swap 1 or 2 sentences of the seed
+    overlap = (population[1:10] & population[0]).sum(axis=1)
+    assert ((overlap >= 1) & (overlap <= 2)).all()
+    
+    with pytest.raises(ValueError):
+        ExtractiveSummarizerGA(init_method='greedy')
+
+
+def test_early_stopping():
+    """
+    Test that the evolution stops when the best fitness plateaus or the time
+    budget is spent
+    """
+    np.random.seed(0)
+    summarizer = ExtractiveSummarizerGA(population_size=20, generations=200, summary_size=3,
+                                        stop_words=None, init_method='mmr', patience=3)
+    summary = summarizer.summarize(TEXT)
+    assert 3 <= summarizer.generations_run < 200
+    assert summary
+    
+    summarizer = ExtractiveSummarizerGA(population_size=20, generations=200, summary_size=3,
+                                        stop_words=None, time_budget=0.0)
+    summary = summarizer.summarize(TEXT)
+    assert summarizer.generations_run == 0
+    assert len([s for s in summarizer._split_into_sentences(TEXT) if s in summary]) == 3
+
+
+def test_summarize_keeps_summary_size():
+    """
+    Test that a short max_summary_ratio does not change the configured
+    summary size
+    """
+    np.random.seed(0)
+    summarizer = ExtractiveSummarizerGA(population_size=20, generations=5, summary_size=5, stop_words=None)
+    summary = summarizer.summarize(TEXT, max_summary_ratio=0.2)
+    assert len([s for s in summarizer._split_into_sentences(TEXT) if s in summary]) == 2
+    assert summarizer.summary_size == 5
+
+
+def test_summarize_batch(summarizer, tmp_path):
+    """
+    Test that batch summaries are deterministic and independent of the
+    number of workers
+    """
+    paragraphs = TEXT.split(". ")
+    for day, doc_id in enumerate(["BOE-A-2024-1", "BOE-A-2024-2", "BOE-A-2024-3"]):
+        body = "".join(f"<p>{p}.</p>\n" for p in paragraphs[day:day + 9])
+        (tmp_path / f"{doc_id}.xml").write_text(
+            f"<documento><metadatos><titulo>{doc_id}</titulo></metadatos>"
+            f"<texto>{body}</texto></documento>", encoding="utf-8"
+        )
+    documents = list(iter_boe_documents(str(tmp_path)))
+    assert [doc_id for doc_id, _ in documents] == ["BOE-A-2024-1", "BOE-A-2024-2", "BOE-A-2024-3"]
+    
+    sequential = dict(summarizer.summarize_batch(documents, n_jobs=1, random_state=0))
+    parallel = dict(summarizer.summarize_batch(iter(documents), n_jobs=2, random_state=0))
+    assert sequential == parallel
+    assert set(sequential) == {doc_id for doc_id, _ in documents}
+    for doc_id, text in documents:
+        selected = [s for s in summarizer._split_into_sentences(text) if s in sequential[doc_id]]
+        assert sequential[doc_id] == " ".join(selected)
+
+
+def test_preprocess_cache(summarizer, monkeypatch):
+    """
+    Test that a document is split and vectorized only once
+    """
+    calls = []
+    create_sentence_vectors = summarizer._create_sentence_vectors
+    monkeypatch.setattr(summarizer, "_create_sentence_vectors",
+                        lambda sentences: calls.append(sentences) or create_sentence_vectors(sentences))
+    np.random.seed(0)
+    first = summarizer.summarize(TEXT)
+    np.random.seed(0)
+    assert summarizer.summarize(TEXT) == first
+    assert len(calls) == 1
+    
+    entry = summarizer._preprocess(TEXT)
+    assert entry["sentences"] == summarizer._split_into_sentences(TEXT)
+    assert set(entry) == {"sentences", "sentence_vectors"}
+    summarizer.summarize(TEXT + " Otra frase adicional del documento.")
+    assert len(calls) == 2
+    assert len(summarizer._document_cache) == 2
+    
+    # Batch workers do not cache, but still split and vectorize only once
+    splits = []
+    split_into_sentences = summarizer._split_into_sentences
+    monkeypatch.setattr(summarizer, "_split_into_sentences",
+                        lambda text: splits.append(text) or split_into_sentences(text))
+    summarizer._document_cache = None
+    summarizer.summarize(TEXT)
+    summarizer.summarize(TEXT)
+    assert len(splits) == 2
+    assert len(calls) == 4
+
+
+def test_corpus_vectorizer(tmp_path):
+    """
+    Test that a saved corpus vectorizer transforms like the fitted one, is
+    reloaded from disk when pickled and is used by the summarizer
+    """
+    sentences = ExtractiveSummarizerGA()._split_into_sentences(TEXT)
+    corpus = [" ".join(sentences[i:i + 3]) for i in range(len(sentences))]
+    vectorizer = CorpusVectorizer(stop_words=None, min_df=1).fit(iter(corpus))
+    expected = vectorizer.transform(sentences).toarray()
+    
+    vectorizer.save(str(tmp_path))
+    CorpusVectorizer.load(str(tmp_path)).save(str(tmp_path))
+    loaded = CorpusVectorizer.load(str(tmp_path))
+    assert np.allclose(loaded.transform(sentences).toarray(), expected)
+    assert loaded.fingerprint() == vectorizer.fingerprint()
+    
+    state = pickle.dumps(loaded)
+    assert len(state) < 1000
+    assert np.allclose(pickle.loads(state).transform(sentences).toarray(), expected)
+    
+    np.random.seed(0)
+    summarizer = ExtractiveSummarizerGA(population_size=20, generations=10, summary_size=3,
+                                        vectorizer=loaded)
+    entry = summarizer._preprocess(TEXT)
+    assert np.allclose(entry["sentence_vectors"].toarray(), expected)
+    summaries = dict(summarizer.summarize_batch([("doc", TEXT)], n_jobs=2, random_state=0))
+    assert summaries == dict(summarizer.summarize_batch([("doc", TEXT)], n_jobs=1, random_state=0))
+    
+    with pytest.raises(ValueError):
+        CorpusVectorizer().transform(sentences)
+
+
+def test_default_stop_words():
+    """
+    Test that the default Spanish stop words work with scikit-learn
+    """
+    pytest.importorskip("spacy")
+    np.random.seed(0)
+    summary = ExtractiveSummarizerGA(population_size=10, generations=5).summarize(TEXT)
+    assert summary
+
+
+def test_corpus_vectorizer_default_stop_words(tmp_path):
+    """
+    Test that a corpus vectorizer with the default Spanish stop words can be
+    fitted, saved and loaded
+    """
+    pytest.importorskip("spacy")
+    sentences = ExtractiveSummarizerGA()._split_into_sentences(TEXT)
+    vectorizer = CorpusVectorizer(min_df=1).fit(sentences)
+    assert "de" not in vectorizer.vectorizer.vocabulary_
+    
+    vectorizer.save(str(tmp_path))
+    loaded = CorpusVectorizer.load(str(tmp_path))
+    assert np.allclose(loaded.transform(sentences).toarray(), vectorizer.transform(sentences).toarray())
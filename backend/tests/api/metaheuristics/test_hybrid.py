@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Test the hybrid BM25 + LSI retrieval module
+"""
+
+import numpy as np
+import pytest
+from lib.api.metaheuristics.bm25 import BM25Retrieval
+from lib.api.metaheuristics.hybrid import HybridRetrieval
+from lib.api.metaheuristics.lsi import LSIModel
+from tests.api.metaheuristics.test_lsi import CORPUS
+
+
+def make_model(**kwargs) -> HybridRetrieval:
+    """
+    Hybrid model fitted on the sample corpus
+    """
+    return HybridRetrieval(
+        BM25Retrieval(), LSIModel(n_components=4, stop_words=None), **kwargs
+    ).fit(CORPUS, document_store=CORPUS, min_df=1)
+
+
+@pytest.mark.parametrize("fusion", ["rrf", "weighted"])
+def test_rerank_only_bm25_candidates(fusion):
+    """
+    Test that results are the BM25 candidates, scored with the chosen fusion
+    """
+    model = make_model(fusion=fusion, n_candidates=3)
+    query = "subvenciones para la vivienda"
+    candidates = {r["id"]: r["score"] for r in model.bm25.search(query, top_k=3) if r["score"] > 0}
+    results = model.search(query, top_k=3)
+    
+    assert {r["id"] for r in results} == set(candidates)
+    assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+    for result in results:
+        assert result["bm25_score"] == pytest.approx(candidates[result["id"]])
+        query_lsi = model.lsi.transform([" ".join(model.bm25.tokenizer.tokenize(query))])[0]
+        assert result["lsi_score"] == pytest.approx(float(model.lsi.lsi[result["id"]] @ query_lsi), abs=1e-5)
+        assert "snippet" in result
+    if fusion == "weighted":
+        assert max(r["score"] for r in results) <= 1.0 + 1e-9
+
+
+def test_rrf_scores():
+    """
+    Test reciprocal rank fusion on a hand-computed example
+    """
+    model = HybridRetrieval(rrf_k=1)
+    fused = model._fuse(np.array([3.0, 2.0, 1.0]), np.array([0.1, 0.9, 0.5]))
+    assert fused == pytest.approx([1 / 2 + 1 / 4, 1 / 3 + 1 / 2, 1 / 4 + 1 / 3])
+
+
+def test_batch_search_matches_search():
+    """
+    Test that batched hybrid search matches single-query search
+    """
+    model = make_model()
+    queries = ["subvenciones energía", "datos personales", "término inexistente"]
+    for query, results in zip(queries, model.batch_search(queries, top_k=3)):
+        expected = model.search(query, top_k=3)
+        assert [r["id"] for r in results] == [r["id"] for r in expected]
+        assert [r["score"] for r in results] == pytest.approx([r["score"] for r in expected])
+    assert model.search("término inexistente") == []
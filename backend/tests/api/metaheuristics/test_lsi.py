@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Test the LSI module and its nearest-neighbor indexes
+"""
+
+import numpy as np
+import pytest
+from lib.api.metaheuristics.ann import ExactIndex, IVFFlatIndex
+from lib.api.metaheuristics.lsi import LSIModel
+
+CORPUS = [
+    "Real Decreto por el que se regula el régimen de subvenciones públicas.",
+    "Ley Orgánica de protección de datos personales y garantía de derechos digitales.",
+    "Resolución de la Subsecretaría sobre subvenciones para energías renovables.",
+    "Orden por la que se aprueban las bases reguladoras de las ayudas a la energía.",
+    "Real Decreto-ley de medidas urgentes en materia de vivienda y alquiler.",
+    "Anuncio de licitación de contrato de obras de la Administración General del Estado.",
+    "Resolución por la que se convocan ayudas para la rehabilitación de vivienda.",
+    "Orden sobre el tratamiento de datos personales en la Administración electrónica.",
+]
+
+
+def random_vectors(n_rows: int, n_dims: int = 16, seed: int = 0) -> np.ndarray:
+    """
+    Clustered unit vectors resembling LSI document vectors.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(8, n_dims))
+    vectors = centers[rng.integers(0, 8, n_rows)] + 0.3 * rng.normal(size=(n_rows, n_dims))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(name="model")
+def fixture_model() -> LSIModel:
+    """
+    LSI model fitted on the sample corpus
+    """
+    return LSIModel(n_components=4, stop_words=None).fit(CORPUS, min_df=1)
+
+
+def test_default_stop_words():
+    """
+    Test that the default Spanish stop words are removed from the vocabulary
+    """
+    pytest.importorskip("spacy")
+    model = LSIModel(n_components=4).fit(CORPUS, min_df=1)
+    assert "de" not in model.feature_names
+    assert "subvenciones" in model.feature_names
+
+
+def test_ivf_exact_when_probing_every_list():
+    """
+    Test that the IVF index matches brute force when every list is probed
+    """
+    vectors = random_vectors(500)
+    queries = random_vectors(20, seed=1)
+    index = IVFFlatIndex(n_lists=10).build(vectors)
+    assert index.vectors is vectors
+    expected_ids, expected_scores = ExactIndex().build(vectors).search(queries, top_k=5)
+    doc_ids, scores = index.search(queries, top_k=5, n_probe=10)
+    assert np.array_equal(doc_ids, expected_ids)
+    assert scores == pytest.approx(expected_scores)
+    assert index.recall(queries, top_k=5, n_probe=10) == 1.0
+
+
+def test_ivf_recall_grows_with_n_probe():
+    """
+    Test the recall/latency knob of the IVF index
+    """
+    vectors = random_vectors(2000)
+    queries = random_vectors(50, seed=1)
+    index = IVFFlatIndex(n_lists=32, n_probe=1).build(vectors)
+    recalls = [index.recall(queries, top_k=10, n_probe=n_probe) for n_probe in (1, 4, 16)]
+    assert recalls == sorted(recalls)
+    assert recalls[-1] > 0.9
+
+
+def test_search_with_index_matches_exact(model):
+    """
+    Test that LSI search through an index agrees with the exact search
+    """
+    model.build_index(IVFFlatIndex(n_lists=2, n_probe=2))
+    for query in ["subvenciones energía", "datos personales"]:
+        expected = model.search(query, top_k=3, exact=True)
+        results = model.search(query, top_k=3)
+        assert [r["id"] for r in results] == [r["id"] for r in expected]
+        assert [r["score"] for r in results] == pytest.approx([r["score"] for r in expected])
+        
+    similar = model.find_similar_documents(2, top_k=3)
+    assert [r["id"] for r in similar] == [r["id"] for r in model.find_similar_documents(2, top_k=3, exact=True)]
+    assert 2 not in [r["id"] for r in similar]
+
+
+def test_index_shares_quantized_vectors():
+    """
+    Test that an index built on a quantized model scans the int8 codes
+    instead of keeping a dequantized copy
+    """
+    model = LSIModel(n_components=4, stop_words=None, quantize=True).fit(CORPUS, min_df=1)
+    model.build_index(IVFFlatIndex(n_lists=2, n_probe=1))
+    assert model.ann_index.vectors is model.lsi
+    assert model.ann_index.vectors.dtype == np.int8
+    
+    queries = model.transform(["subvenciones energía", "datos personales"])
+    expected_ids, expected_scores = model._nearest(queries, 3, exact=True)
+    doc_ids, scores = model.ann_index.search(queries, top_k=3, exact=True)
+    assert np.array_equal(doc_ids, expected_ids)
+    assert scores == pytest.approx(expected_scores, abs=1e-6)
+    assert model.ann_index.recall(queries, top_k=3, n_probe=2) == 1.0
+
+
+def test_streaming_fit_matches_batch_svd():
+    """
+    Test that the incremental SVD recovers the spectrum of the full matrix
+    """
+    vocabulary = sorted({word for text in CORPUS for word in text.lower().replace(".", "").split()})
+    model = LSIModel(n_components=len(CORPUS), use_idf=False, stop_words=None)
+    model.fit_stream(iter(CORPUS), batch_size=3, vocabulary=vocabulary)
+    
+    X = model.pipeline[:2].transform(CORPUS).toarray()
+    expected = np.linalg.svd(X, compute_uv=False)
+    assert model.svd.singular_values_ == pytest.approx(expected[:len(model.svd.singular_values_)])
+    assert model.get_explained_variance().sum() == pytest.approx(1.0)
+
+
+def test_streaming_fit_with_hashing():
+    """
+    Test searching a model fitted on a stream of hashed features
+    """
+    model = LSIModel(n_components=4, stop_words=None).fit_stream(
+        (text for text in CORPUS), batch_size=2, n_features=2 ** 12
+    )
+    assert model.add_documents(iter(CORPUS)).tolist() == list(range(len(CORPUS)))
+    results = model.search("alquiler de vivienda", top_k=2)
+    assert {r["id"] for r in results} & {4, 6}
+    assert "text" not in results[0]
+    assert all(term for topic in model.get_topics(3) for term, _ in topic)
+
+
+
+def test_add_documents_extends_corpus():
+    """
+    Test that added documents are appended to the model's own copy of the corpus
+    """
+    corpus = CORPUS[:4]
+    model = LSIModel(n_components=2, stop_words=None).fit(corpus, min_df=1)
+    assert model.add_documents(CORPUS[4:], batch_size=1).tolist() == list(range(4, len(CORPUS)))
+    assert model.corpus == CORPUS
+    assert corpus == CORPUS[:4]
+    for result in model.search("real decreto", top_k=len(CORPUS)):
+        assert result["text"] == CORPUS[result["id"]]
+
+
+def test_float32_dot_product_matches_cosine(model):
+    """
+    Test that float32 dot products reproduce the cosine similarities
+    """
+    assert model.lsi.dtype == np.float32
+    query_lsi = model.transform(["subvenciones para energías renovables"])
+    expected = (query_lsi @ model.lsi.astype(np.float64).T)[0]
+    expected /= np.linalg.norm(model.lsi.astype(np.float64), axis=1) * np.linalg.norm(query_lsi)
+    results = model.search("subvenciones para energías renovables", top_k=len(CORPUS))
+    assert [r["id"] for r in results] == list(np.argsort(-expected, kind="stable"))
+    assert [r["score"] for r in results] == pytest.approx(np.sort(expected)[::-1], abs=1e-6)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1024])
+def test_batch_search_matches_search(model, chunk_size):
+    """
+    Test that batched multi-query search matches single-query search
+    """
+    queries = ["subvenciones energía", "datos personales", "vivienda", "término inexistente"]
+    batch = model.batch_search(queries, top_k=3, chunk_size=chunk_size)
+    for query, results in zip(queries, batch):
+        expected = model.search(query, top_k=3)
+        assert [r["id"] for r in results] == [r["id"] for r in expected]
+        assert [r["score"] for r in results] == pytest.approx([r["score"] for r in expected])
+        
+    with pytest.raises(ValueError):
+        model.batch_search(queries, chunk_size=0)
+
+
+def test_int8_quantized_vectors(model):
+    """
+    Test that int8 document vectors approximate the float32 similarities
+    """
+    quantized = LSIModel(n_components=4, stop_words=None, quantize=True).fit(CORPUS, min_df=1)
+    assert quantized.lsi.dtype == np.int8
+    assert np.abs(quantized._document_vectors() - model.lsi).max() < 0.01
+    for query in ["subvenciones energía", "datos personales"]:
+        expected = model.search(query, top_k=len(CORPUS))
+        results = quantized.search(query, top_k=len(CORPUS))
+        assert results[0]["id"] == expected[0]["id"]
+        assert {r["id"]: r["score"] for r in results} == pytest.approx(
+            {r["id"]: r["score"] for r in expected}, abs=0.02
+        )
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+@pytest.mark.parametrize("quantize", [False, True])
+def test_save_load_roundtrip(tmp_path, mmap, quantize):
+    """
+    Test that a saved and loaded model gives the same results
+    """
+    model = LSIModel(n_components=4, stop_words=None, quantize=quantize).fit(CORPUS, min_df=1)
+    model.save(tmp_path / "model")
+    loaded = LSIModel.load(tmp_path / "model", mmap=mmap, corpus=CORPUS)
+    
+    assert loaded.transform(CORPUS) == pytest.approx(model.transform(CORPUS))
+    for query in ["subvenciones energía", "datos personales"]:
+        assert loaded.search(query, top_k=3) == model.search(query, top_k=3)
+    assert loaded.get_topics(5) == model.get_topics(5)
+    assert loaded.get_explained_variance() == pytest.approx(model.get_explained_variance())
+    
+    # Only streaming fits can be continued
+    for fitted in (model, loaded):
+        with pytest.raises(ValueError):
+            fitted.partial_fit(CORPUS[:2])
+
+
+def test_save_load_streaming_model(tmp_path):
+    """
+    Test that a loaded streaming model can keep folding in documents
+    """
+    model = LSIModel(n_components=4, stop_words=None).fit_stream(CORPUS[:4], n_features=2 ** 12)
+    model.save(tmp_path / "model")
+    loaded = LSIModel.load(tmp_path / "model")
+    
+    model.partial_fit(CORPUS[4:])
+    loaded.partial_fit(CORPUS[4:])
+    assert loaded.svd.singular_values_ == pytest.approx(model.svd.singular_values_)
+    model.add_documents(CORPUS)
+    loaded.add_documents(CORPUS)
+    assert loaded.search("vivienda") == model.search("vivienda")
+
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+@pytest.mark.parametrize("quantize", [False, True])
+def test_save_into_loaded_directory(tmp_path, mmap, quantize):
+    """
+    Test that a loaded model can be updated and saved back to its directory
+    """
+    model = LSIModel(n_components=4, stop_words=None, quantize=quantize).fit_stream(
+        CORPUS[:4], n_features=2 ** 12
+    )
+    model.save(tmp_path)
+    loaded = LSIModel.load(tmp_path, mmap=mmap)
+    loaded.save(tmp_path)
+    reloaded = LSIModel.load(tmp_path)
+    assert reloaded.transform(CORPUS) == pytest.approx(model.transform(CORPUS))
+    
+    loaded.partial_fit(CORPUS[4:])
+    loaded.add_documents(CORPUS[4:])
+    expected = loaded.search("vivienda")
+    loaded.save(tmp_path)
+    assert LSIModel.load(tmp_path, corpus=loaded.corpus).search("vivienda") == expected
+
+
+def test_topic_postings(model):
+    """
+    Test topic browsing and topic-filtered search against the document vectors
+    """
+    vectors = model._document_vectors()
+    for topic_id in range(vectors.shape[1]):
+        expected = np.argsort(-np.abs(vectors[:, topic_id]), kind="stable")[:3]
+        results = model.get_topic_documents(topic_id, top_n=3)
+        assert [abs(r["score"]) for r in results] == pytest.approx(np.abs(vectors[expected, topic_id]))
+        
+    topics = model.get_document_topics(2, threshold=0.0)
+    assert [weight for _, weight in topics] == sorted(np.abs(vectors[2]), reverse=True)
+    
+    small = LSIModel(n_components=4, stop_words=None, topic_postings_size=2).fit(CORPUS, min_df=1)
+    topic_id = small.find_topics_for_query("datos personales")[0][0]
+    results = small.search_in_topics("datos personales", topic_id, top_k=5)
+    assert {r["id"] for r in results} <= set(small.topic_doc_ids[topic_id].tolist())
+    assert len(small.get_topic_documents(topic_id, top_n=5)) == 5
+
+
+def test_topic_images_are_cached(model, tmp_path):
+    """
+    Test that topic images are rendered once per model fingerprint
+    """
+    pytest.importorskip("wordcloud")
+    paths = model.render_topic_images([0, 1], n_top_terms=5, cache_dir=tmp_path, n_jobs=2)
+    assert all(path.startswith(str(tmp_path / model.fingerprint())) for path in paths)
+    mtimes = [(tmp_path / path).stat().st_mtime_ns for path in paths]
+    
+    loaded_paths = LSIModel(n_components=4, stop_words=None).fit(CORPUS, min_df=1).render_topic_images(
+        [0, 1], n_top_terms=5, cache_dir=tmp_path
+    )
+    assert loaded_paths == paths
+    assert [(tmp_path / path).stat().st_mtime_ns for path in paths] == mtimes
+    
+    model.visualize_topics(output_dir=tmp_path / "out", n_top_terms=5, cache_dir=tmp_path, dpi=50)
+    assert (tmp_path / "out" / "lsi_topics.png").exists()
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Test the stop words module
+"""
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from lib.language.stop_words import resolve_stop_words
+
+
+@pytest.mark.parametrize("stop_words", [None, "english", ["de", "la"]])
+def test_passthrough(stop_words):
+    """
+    Test that values accepted by scikit-learn are returned unchanged
+    """
+    assert resolve_stop_words(stop_words) == stop_words
+
+
+def test_spanish():
+    """
+    Test that 'spanish' becomes a list scikit-learn accepts
+    """
+    pytest.importorskip("spacy")
+    stop_words = resolve_stop_words("spanish")
+    assert {"de", "la", "que", "el"} <= set(stop_words)
+    vectorizer = TfidfVectorizer(stop_words=stop_words).fit(["El régimen de las subvenciones"])
+    assert list(vectorizer.get_feature_names_out()) == ["régimen", "subvenciones"]
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Test the tokenizer module
+"""
+
+import pytest
+from lib.language.tokenizer import Tokenizer
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Real Decreto 1234/2024, de 3 de diciembre.", ["real", "decreto", "1234", "2024", "de", "de", "diciembre"]),
+    ("artículo 22.2.c) de la Ley", ["artículo", "22", "de", "la", "ley"]),
+    ("  ", []),
+])
+def test_tokenize(text, expected):
+    """
+    Test that text is lowercased and split into terms of two or more characters
+    """
+    assert Tokenizer().tokenize(text) == expected
+
+
+def test_fold_accents():
+    """
+    Test that accent folding removes accents from vowels but keeps the ñ
+    """
+    tokenizer = Tokenizer(fold_accents=True)
+    assert tokenizer.tokenize("Energía, PÚBLICAS y año") == ["energia", "publicas", "año"]
+    assert tokenizer.normalize_token("Energía") == "energia"
+
+
+def test_iter_spans():
+    """
+    Test that spans point to the original text
+    """
+    text = "Ley Orgánica 3/2018"
+    spans = list(Tokenizer(fold_accents=True).iter_spans(text))
+    assert [term for term, _, _ in spans] == ["ley", "organica", "2018"]
+    assert [text[start:end] for _, start, end in spans] == ["Ley", "Orgánica", "2018"]
+
+
+def test_encode():
+    """
+    Test that terms are mapped to IDs, skipping or adding unknown terms
+    """
+    tokenizer = Tokenizer()
+    vocabulary = {"ley": 0}
+    assert list(tokenizer.encode("Ley de la ley", vocabulary)) == [0, 0]
+    assert list(tokenizer.encode("Ley de la ley", vocabulary, add_terms=True)) == [0, 1, 2, 0]
+    assert vocabulary == {"ley": 0, "de": 1, "la": 2}
+
+
+def test_stem():
+    """
+    Test Spanish stemming when nltk is available
+    """
+    pytest.importorskip("nltk")
+    tokenizer = Tokenizer(stem=True)
+    assert tokenizer.tokenize("subvenciones") == tokenizer.tokenize("subvención")
+
+
+def test_stem_before_folding():
+    """
+    Test that accented suffixes are still stemmed when accents are folded
+    """
+    pytest.importorskip("nltk")
+    tokenizer = Tokenizer(fold_accents=True, stem=True)
+    assert tokenizer.tokenize("regulación") == tokenizer.tokenize("regulaciones")
+    assert tokenizer.tokenize("Constitución") == tokenizer.tokenize("constituciones")
@@ -1,4 +1,6 @@
 import os
+import hashlib
+from collections import OrderedDict
 import xml.etree.ElementTree as ET
 from typing import List, Tuple
 from datetime import datetime
@@ -224,6 +226,25 @@ def train_summarization_range(
 # ------------------------------------------
 # 3) Metaheuristic Extractive Summarizer (GA)
 # ------------------------------------------
+# Sentence tokenizer, loaded (and downloaded if missing) once per process
+_SENT_TOKENIZE = None
+
+def _load_sent_tokenize():
+    global _SENT_TOKENIZE
+    if _SENT_TOKENIZE is None:
+        import nltk
+        for resource in ('punkt', 'punkt_tab'):
+            try:
+                nltk.data.find(f'tokenizers/{resource}')
+            except LookupError:
+                nltk.download(resource, quiet=True)
+        from nltk.tokenize import sent_tokenize
+        _SENT_TOKENIZE = sent_tokenize
+    return _SENT_TOKENIZE
+
+# Maximum number of preprocessed documents kept by each summarizer
+DOCUMENT_CACHE_SIZE = 128
+
 # (Igual que antes)
 class ExtractiveSummarizerGA:
     def __init__(self,
@@ -238,6 +259,27 @@ class ExtractiveSummarizerGA:
         self.cx_rate = crossover_rate
         self.mut_rate = mutation_rate
         self.vectorizer = TfidfVectorizer()
+        # LRU cache of (sentences, sparse tf-idf matrix) keyed by content hash
+        self._cache = OrderedDict()
+
+    def _preprocess(self, text: str, vectorize: bool = True):
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        entry = self._cache.get(key)
+        if entry is None:
+            entry = self._cache[key] = {'sentences': _load_sent_tokenize()(text)}
+            if len(self._cache) > DOCUMENT_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        if vectorize:
+            self._vectorize(entry)
+        return entry
+
+    def _vectorize(self, entry: dict):
+        # sparse tf-idf matrix of a _preprocess entry, created on first use
+        if 'X' not in entry:
+            entry['X'] = self.vectorizer.fit_transform(entry['sentences'])
+        return entry['X']
 
     def _initialize_population(self, n_sentences: int) -> List[np.ndarray]:
         pop = []
@@ -258,13 +300,13 @@ class ExtractiveSummarizerGA:
         return coverage - 0.5 * red
 
     def summarize(self, text: str) -> str:
-        import nltk; nltk.download('punkt', quiet=True); nltk.download('punkt_tab', quiet=True)
-        from nltk.tokenize import sent_tokenize
-        sentences = sent_tokenize(text)
+        entry = self._preprocess(text, vectorize=False)
+        sentences = entry['sentences']
         n = len(sentences)
         if n <= self.summary_size:
             return text
-        X = self.vectorizer.fit_transform(sentences).toarray()
+        # densify per call: the dense matrix is too large to cache
+        X = self._vectorize(entry).toarray()
         doc_vec = X.mean(axis=0)
         pop = self._initialize_population(n)
         for gen in range(self.generations):
@@ -1,6 +1,9 @@
 import os
+import hashlib
+from collections import OrderedDict
 import xml.etree.ElementTree as ET
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, List, Tuple
 
 import torch
 from torch.utils.data import Dataset, DataLoader
@@ -106,6 +109,49 @@ def generate_boe(model: GPT2LMHeadModel, tokenizer: GPT2TokenizerFast, prompt: s
 # ------------------------------------------
 # 2) Extractive Summarization with Metaheuristic
 # ------------------------------------------
+def iter_boe_documents(xml_dir: str) -> Iterator[Tuple[str, str]]:
+    # (document ID, body text) of every XML document of a folder, e.g. one day of the BOE
+    for fn in sorted(os.listdir(xml_dir)):
+        if not fn.endswith('.xml'):
+            continue
+        root = ET.parse(os.path.join(xml_dir, fn)).getroot()
+        paragraphs = [p.text for p in root.findall('.//texto//p') if p.text]
+        yield fn[:-len('.xml')], " ".join(paragraphs)
+
+# Summarizer of the worker processes of summarize_batch
+_WORKER_SUMMARIZER = None
+
+def _init_worker(summarizer):
+    global _WORKER_SUMMARIZER
+    # the documents of a batch are all different, so workers do not cache them
+    summarizer._cache = None
+    _WORKER_SUMMARIZER = summarizer
+
+def _summarize_document(text: str, seed: int) -> str:
+    # every document gets its own seed, so results do not depend on the scheduling
+    random.seed(seed)
+    np.random.seed(seed)
+    return _WORKER_SUMMARIZER.summarize(text)
+
+# Sentence tokenizer, loaded (and downloaded if missing) once per process
+_SENT_TOKENIZE = None
+
+def _load_sent_tokenize():
+    global _SENT_TOKENIZE
+    if _SENT_TOKENIZE is None:
+        import nltk
+        for resource in ('punkt',):
+            try:
+                nltk.data.find(f'tokenizers/{resource}')
+            except LookupError:
+                nltk.download(resource, quiet=True)
+        from nltk.tokenize import sent_tokenize
+        _SENT_TOKENIZE = sent_tokenize
+    return _SENT_TOKENIZE
+
+# Maximum number of preprocessed documents kept by each summarizer
+DOCUMENT_CACHE_SIZE = 128
+
 class ExtractiveSummarizerGA:
     def __init__(self,
                  population_size: int = 50,
@@ -119,6 +165,34 @@ class ExtractiveSummarizerGA:
         self.cx_rate = crossover_rate
         self.mut_rate = mutation_rate
         self.vectorizer = TfidfVectorizer()
+        # LRU cache of (sentences, sparse tf-idf matrix) keyed by content hash
+        self._cache = OrderedDict()
+
+    def __getstate__(self):
+        # worker processes of summarize_batch start with an empty cache
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        return state
+
+    def _preprocess(self, text: str, vectorize: bool = True):
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        cache = self._cache if self._cache is not None else OrderedDict()
+        entry = cache.get(key)
+        if entry is None:
+            entry = cache[key] = {'sentences': _load_sent_tokenize()(text)}
+            if len(cache) > DOCUMENT_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        if vectorize:
+            self._vectorize(entry)
+        return entry
+
+    def _vectorize(self, entry: dict):
+        # sparse tf-idf matrix of a _preprocess entry, created on first use
+        if 'X' not in entry:
+            entry['X'] = self.vectorizer.fit_transform(entry['sentences'])
+        return entry['X']
 
     def _initialize_population(self, n_sentences: int) -> List[np.ndarray]:
         pop = []
@@ -144,14 +218,14 @@ class ExtractiveSummarizerGA:
 
     def summarize(self, text: str) -> str:
         # split into sentences
-        import nltk; nltk.download('punkt', quiet=True)
-        from nltk.tokenize import sent_tokenize
-        sentences = sent_tokenize(text)
+        entry = self._preprocess(text, vectorize=False)
+        sentences = entry['sentences']
         n = len(sentences)
         if n <= self.summary_size:
             return text
         # tf-idf vectors
-        X = self.vectorizer.fit_transform(sentences).toarray()
+        # densify per call: the dense matrix is too large to cache
+        X = self._vectorize(entry).toarray()
         # document vector
         doc_vec = X.mean(axis=0)
         # population
@@ -203,6 +277,27 @@ class ExtractiveSummarizerGA:
         summary = " ".join([s for bit, s in zip(best, sentences) if bit==1])
         return summary
 
+    def summarize_batch(self, documents: Iterable[Tuple[str, str]], n_jobs: int = None, random_state: int = None) -> Iterator[Tuple[str, str]]:
+        # summarize (doc_id, text) pairs in a process pool, yielding (doc_id, summary) as they complete.
+        # document i uses the i-th seed spawned from random_state
+        seeds = np.random.SeedSequence(random_state)
+        n_jobs = n_jobs or os.cpu_count() or 1
+        documents = iter(documents)
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(self,)) as executor:
+            pending = {}
+            while True:
+                # at most 2 documents in flight per worker
+                for doc_id, text in documents:
+                    seed = int(seeds.spawn(1)[0].generate_state(1)[0])
+                    pending[executor.submit(_summarize_document, text, seed)] = doc_id
+                    if len(pending) >= 2 * n_jobs:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+
 # ------------------------------------------
 # 3) Example usage
 # ------------------------------------------
@@ -226,3 +321,7 @@ if __name__ == '__main__':
     summarizer = ExtractiveSummarizerGA(population_size=60, generations=40, summary_size=5)
     summary = summarizer.summarize(text)
     print("--- Resumen extractivo (GA) ---\n", summary)
+
+    # 3.3 Resumir todos los documentos del directorio en paralelo
+    for doc_id, summary in summarizer.summarize_batch(iter_boe_documents(xml_dir), random_state=42):
+        print(f"--- {doc_id} ---\n{summary}\n")